@@ -0,0 +1,162 @@
+"""
+Adaptive Policy Test - Learned retry strategy selection
+
+This test shows how the agentic AI system now:
+1. Starts from the static ErrorType -> strategy mapping
+2. Learns which strategy actually fixes a (error type, task kind) context
+3. Persists what it learned and can bootstrap from the metrics log
+4. Spends fewer model calls per accepted answer than the static policy
+5. Credits retries after a rate limit the same way online and from the log, when asked to at startup
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from backends.registry import set_backend
+from backends.stub import StubBackend
+import correction.adaptive_policy as adaptive_policy
+from correction.adaptive_policy import AdaptiveCorrectionPolicy, credit_step, get_adaptive_policy, set_adaptive_policy
+from main import run_agentic_workflow_async
+from metrics.log_store import JSONLLogStore, set_log_store
+from metrics.logger import CallRollup, MetricsLogger
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import ErrorType
+
+set_log_store(None)
+
+
+def test_learns_and_persists():
+    """Test that recorded outcomes override the static prior and survive a reload."""
+    print("=" * 70)
+    print("TEST 1: Learn + Persist")
+    print("=" * 70)
+    
+    task = "Calculate 17 * 23"
+    path = os.path.join(tempfile.mkdtemp(), "policy.json")
+    policy = AdaptiveCorrectionPolicy(path=path, seed=0)
+    cold = policy.strategy_for(ErrorType.SEMANTIC, task)
+    print(f"Cold-start choice: {cold}")
+    
+    for _ in range(20):
+        policy.record_outcome(task, ErrorType.SEMANTIC, "retry_reasoning", accepted=False, model_calls=2)
+        policy.record_outcome(task, ErrorType.SEMANTIC, "retry_grounding", accepted=True, model_calls=2)
+    policy.save()
+    
+    reloaded = AdaptiveCorrectionPolicy(path=path, seed=0)
+    choices = [reloaded.strategy_for(ErrorType.SEMANTIC, task) for _ in range(20)]
+    print(f"Choices after learning: {sorted(set(choices))} (grounding {choices.count('retry_grounding')}/20)")
+    assert choices.count("retry_grounding") >= 12, "The strategy that works should win most draws"
+    assert "retry_reasoning" not in choices, "The strategy that always fails should be abandoned"
+    print("✅ PASSED: Policy learns and persists!\n")
+
+
+def test_bootstraps_from_metrics_log():
+    """Test that retries replayed from a step log become policy statistics."""
+    print("=" * 70)
+    print("TEST 2: Bootstrap From Metrics Log")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, run_id="run-a")
+    steps = [("semantic", None, False), ("semantic", "retry_reasoning", False), ("none", "retry_grounding", True)]
+    for step, (error_type, strategy, ok) in enumerate(steps, start=1):
+        store.append({"kind": "step", "step": step, "error_type": error_type, "strategy": strategy,
+                      "is_valid": ok, "model_calls": 2, "task_features": "math/short"}, task_id=0)
+    store.close()
+    
+    policy = AdaptiveCorrectionPolicy(path=None)
+    learned = policy.learn_from_log(path)
+    print(f"Learned {learned} outcomes: {json.dumps(policy.stats)}")
+    assert learned == 2
+    assert policy.stats["semantic|math/short"]["retry_grounding"]["successes"] == 1
+    print("✅ PASSED: Logged outcomes seed the policy!\n")
+
+
+def _run_tasks(policy_mode, n_tasks=20):
+    # Only the grounding hint fixes these tasks; the static policy keeps asking for reasoning
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            if "Agent's output:\n4\n" in prompt:
+                return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+            return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Wrong number."})
+        return "4" if "Only state facts" in prompt else "5"
+    
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    rollup = CallRollup()
+    accepted = 0
+    for i in range(n_tasks):
+        logger = MetricsLogger(task_id=i)
+        # Duplicate detection would also escape the loop by escalating; measure the policy alone
+        state = asyncio.run(run_agentic_workflow_async(f"Calculate 2+2 (#{i})", logger=logger, verbose=False,
+                                                       policy_mode=policy_mode, dedup=False))
+        accepted += state.validation_log[-1].is_valid
+        for call in logger.calls:
+            rollup.add(call)
+    return rollup.summary(accepted)
+
+
+def test_fewer_calls_per_accepted_answer():
+    """Test the success metric: adaptive spends fewer model calls per accepted answer."""
+    print("=" * 70)
+    print("TEST 3: Calls per Accepted Answer")
+    print("=" * 70)
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_adaptive_policy(AdaptiveCorrectionPolicy(path=None, seed=1))
+    static = _run_tasks("static")
+    adaptive = _run_tasks("adaptive")
+    set_adaptive_policy(None)
+    set_scheduler(previous_scheduler)
+    
+    print(f"Static:   {static['accepted']} accepted, {static['calls_per_accepted']} calls/accepted")
+    print(f"Adaptive: {adaptive['accepted']} accepted, {adaptive['calls_per_accepted']:.1f} calls/accepted")
+    assert adaptive["accepted"] > static["accepted"]
+    assert static["calls_per_accepted"] is None or adaptive["calls_per_accepted"] < static["calls_per_accepted"]
+    print("✅ PASSED: Learned strategies save model calls!\n")
+
+
+
+def test_rate_limited_steps_and_startup_learning():
+    """Test that a rate-limited step is skipped, not a new baseline, and that the flag replays the log."""
+    print("=" * 70)
+    print("TEST 4: Crediting Around Rate Limits + Learn at Startup")
+    print("=" * 70)
+    
+    # Online rule: the retry after a 429 is still credited to the error it was chosen for
+    assert credit_step(ErrorType.SEMANTIC, ErrorType.RATE_LIMIT, "retry_grounding") == (None, ErrorType.SEMANTIC)
+    assert credit_step(ErrorType.SEMANTIC, ErrorType.NONE, "retry_grounding") == (ErrorType.SEMANTIC, ErrorType.NONE)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, run_id="run-a")
+    loops = {0: [("semantic", None, False), ("rate_limit", "retry_grounding", False), ("none", "retry_grounding", True)],
+             1: [("rate_limit", None, False), ("none", "retry_reasoning", True)]}
+    for task_id, steps in loops.items():
+        for step, (error_type, strategy, ok) in enumerate(steps, start=1):
+            store.append({"kind": "step", "step": step, "error_type": error_type, "strategy": strategy,
+                          "is_valid": ok, "model_calls": 2, "task_features": "math/short"}, task_id=task_id)
+    store.close()
+    
+    saved = (adaptive_policy.ADAPTIVE_LEARN_FROM_LOG, adaptive_policy.LOG_DB_PATH, adaptive_policy.ADAPTIVE_POLICY_PATH)
+    adaptive_policy.ADAPTIVE_LEARN_FROM_LOG, adaptive_policy.LOG_DB_PATH, adaptive_policy.ADAPTIVE_POLICY_PATH = True, path, None
+    set_adaptive_policy(None)
+    try:
+        policy = get_adaptive_policy()
+    finally:
+        adaptive_policy.ADAPTIVE_LEARN_FROM_LOG, adaptive_policy.LOG_DB_PATH, adaptive_policy.ADAPTIVE_POLICY_PATH = saved
+        set_adaptive_policy(None)
+    print(f"Learned at startup: {json.dumps(policy.stats)}")
+    assert policy.stats == {"semantic|math/short": {"retry_grounding": {"trials": 1, "successes": 1, "calls": 2}}}, \
+        "Only the accepted retry after the 429 is credited, to the error before the 429"
+    print("✅ PASSED: Offline and online crediting agree!\n")
+
+
+if __name__ == "__main__":
+    test_learns_and_persists()
+    test_bootstraps_from_metrics_log()
+    test_fewer_calls_per_accepted_answer()
+    test_rate_limited_steps_and_startup_learning()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,90 @@
+import re
+from typing import List, Optional
+
+# Cheap, locally checkable output constraints. The streaming executor runs them on the
+# partial text after every chunk and aborts the generation on the first violation.
+# check() returns None when the text is fine so far, or a short violation message.
+
+# Executor results that were cut off by a constraint carry this tag (like [EXECUTION_ERROR])
+CONSTRAINT_VIOLATION_TAG = "[CONSTRAINT_VIOLATION]"
+
+DEFAULT_REFUSAL_PATTERNS = [
+    r"\bI('m| am) sorry\b",
+    r"\bI can(no|')t (help|assist|comply|do that)\b",
+    r"\bAs an AI( language model)?\b",
+]
+
+class MaxLengthConstraint:
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+
+    def check(self, text: str, final: bool = False) -> Optional[str]:
+        if len(text) > self.max_chars:
+            return f"Output exceeds the {self.max_chars}-character limit."
+        return None
+
+class RefusalConstraint:
+    """Refusals show up in the opening sentence, so only the first `window` characters are scanned."""
+
+    def __init__(self, patterns: List[str] = None, window: int = 200):
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in (patterns or DEFAULT_REFUSAL_PATTERNS)]
+        self.window = window
+
+    def check(self, text: str, final: bool = False) -> Optional[str]:
+        head = text[:self.window]
+        for pattern in self.patterns:
+            if pattern.search(head):
+                return "Output is a refusal instead of an answer to the task."
+        return None
+
+class JSONFormatConstraint:
+    """The output must be a JSON object/array (optionally inside a ```json fence)."""
+
+    def check(self, text: str, final: bool = False) -> Optional[str]:
+        stripped = text.lstrip()
+        if stripped.startswith("```"):
+            stripped = stripped.split("\n", 1)[1].lstrip() if "\n" in stripped else ""
+        if not stripped:
+            return "Output is empty, expected JSON." if final else None
+        if stripped[0] not in "{[":
+            return "Output must be JSON, but it does not start with '{' or '['."
+        return None
+
+class ForbiddenPatternConstraint:
+    def __init__(self, pattern: str, message: str = None):
+        self.pattern = re.compile(pattern)
+        self.message = message or f"Output contains forbidden pattern: {pattern}"
+
+    def check(self, text: str, final: bool = False) -> Optional[str]:
+        if self.pattern.search(text):
+            return self.message
+        return None
+
+def build_constraints(spec: dict) -> list:
+    """
+    Build constraints from a task's declarative spec, e.g.
+    {"max_chars": 500, "json": true, "no_refusal": true, "forbidden": ["TODO"]}
+    """
+    if not spec:
+        return []
+    constraints = []
+    if spec.get("max_chars"):
+        constraints.append(MaxLengthConstraint(int(spec["max_chars"])))
+    if spec.get("json"):
+        constraints.append(JSONFormatConstraint())
+    if spec.get("no_refusal"):
+        constraints.append(RefusalConstraint())
+    for pattern in spec.get("forbidden", []):
+        constraints.append(ForbiddenPatternConstraint(pattern))
+    return constraints
+
+def check_constraints(text: str, constraints: list, final: bool = False) -> Optional[str]:
+    """First violation message among `constraints`, or None."""
+    for constraint in constraints:
+        violation = constraint.check(text, final)
+        if violation:
+            return violation
+    return None
+
+def format_violation(violation: str) -> str:
+    return f"{CONSTRAINT_VIOLATION_TAG} {violation}"
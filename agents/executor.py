@@ -1,33 +1,223 @@
-import re
-from config import client, MODEL_NAME
+from agents.constraints import CONSTRAINT_VIOLATION_TAG, check_constraints, format_violation
+from config import DELTA_MIN_CHARS, TOOL_MAX_ROUNDS
+from environment.tool_interace import ToolInterface, format_tool_results, parse_tool_calls
+from utils.llm import generate, generate_async, stream, stream_async
+from utils.patching import PatchError, apply_patch
+from utils.rate_limiter import is_rate_limit_error, extract_retry_delay
+
+# Extra instructions appended to the prompt for each correction strategy chosen by CorrectionPolicy
+STRATEGY_HINTS = {
+    "retry_tool_fix": "Fix any syntax errors, tool misuse or API misuse in your answer.",
+    "retry_grounding": "Only state facts that are supported by the task. Do not invent information.",
+    "retry_format_fix": "Follow the required output format, length and style rules exactly.",
+    "retry_reasoning": "Think through the problem step by step and double-check your logic.",
+    "retry_standard": "Carefully re-read the task and answer it again.",
+}
+
+# Tags the executor puts in front of a failed attempt instead of an answer
+ERROR_TAGS = ("[RATE_LIMIT_429]", "[EXECUTION_ERROR]", CONSTRAINT_VIOLATION_TAG)
 
 class ExecutorAgent:
-    def execute(self, task: str, feedback: str = None) -> str:
+    def __init__(self, tools: ToolInterface = None):
+        # With `tools`, non-streaming executions may request tool calls (see _run_tools)
+        self.tools = tools
+        # Delta retries (see _delta_prompt): totals, and the outcome of the latest attempt
+        self.delta_stats = {"patches_tried": 0, "patches_applied": 0, "fallbacks": 0,
+                            "patch_output_tokens": 0, "output_tokens_saved": 0}
+        self.last_delta = None
+
+    def _build_prompt(self, task: str, feedback: str = None, strategy: str = None, offer_tools: bool = True) -> str:
         prompt = "You are a precise execution agent. Solve the task perfectly.\n\n"
+
+        if offer_tools and self.tools is not None and self.tools.tools:
+            prompt += ("You may call tools. To do so, reply with one or more lines of the form\n"
+                       '<tool>{"name": "<tool name>", "args": {...}}</tool>\n'
+                       "and nothing else; you will get the results back. Available tools:\n"
+                       f"{self.tools.describe()}\n\n")
         
         if feedback:
             prompt += f"PREVIOUS ATTEMPT FAILED!\nFeedback: {feedback}\nFIX THE ERROR NOW.\n\n"
+
+        if strategy in STRATEGY_HINTS:
+            prompt += f"Correction strategy: {STRATEGY_HINTS[strategy]}\n\n"
         
         prompt += f"Task: {task}"
+        return prompt
+
+    def _handle_error(self, e: Exception) -> str:
+        error_str = str(e)
+        
+        # Detect rate limiting errors (429) that outlasted the scheduler's own retries
+        if is_rate_limit_error(error_str):
+            delay = extract_retry_delay(error_str)
+            if delay is not None:
+                return f"[RATE_LIMIT_429] Error: {error_str[:100]} | Retry after {delay} seconds"
+            else:
+                return f"[RATE_LIMIT_429] Error: {error_str[:100]} | Retry after 60 seconds (default)"
+        
+        # Generic execution error
+        return f"[EXECUTION_ERROR] {error_str[:150]}"
+
+    def _generation_config(self, temperature: float = None) -> dict:
+        return {"temperature": temperature} if temperature is not None else None
+
+    def _wants_delta(self, previous: str, feedback: str) -> bool:
+        # Error tags are not worth patching; other answers may well start with "[" (JSON arrays)
+        return bool(previous and feedback) and len(previous) >= DELTA_MIN_CHARS and not previous.startswith(ERROR_TAGS)
+
+    def _delta_prompt(self, task: str, previous: str, feedback: str, strategy: str = None) -> str:
+        prompt = ("You are a precise execution agent. Your previous answer to the task below was rejected.\n"
+                  "Fix it by editing it - do not rewrite the parts that are fine.\n\n"
+                  f"Task: {task}\n\nFeedback: {feedback}\n\n")
+        if strategy in STRATEGY_HINTS:
+            prompt += f"Correction strategy: {STRATEGY_HINTS[strategy]}\n\n"
+        prompt += (f"Previous answer:\n<<<\n{previous}\n>>>\n\n"
+                   'Reply with JSON only: {"edits": [{"find": "<exact text from the previous answer>", '
+                   '"replace": "<new text>"}]}\n'
+                   'Copy every "find" exactly and make it long enough to occur only once. '
+                   'If the answer needs a complete rewrite, reply {"rewrite": true}.')
+        return prompt
+
+    def _apply_delta(self, previous: str, response) -> str:
+        """The patched answer, or None when the patch does not apply (the caller regenerates)."""
+        stats = self.delta_stats
+        stats["patches_tried"] += 1
+        stats["patch_output_tokens"] += response.output_tokens
+        try:
+            text = apply_patch(previous, response.text).strip()
+        except PatchError as e:
+            stats["fallbacks"] += 1
+            stats["output_tokens_saved"] -= response.output_tokens
+            self.last_delta = {"applied": False, "error": str(e), "output_tokens_saved": -response.output_tokens}
+            return None
+        # A full answer would cost about as many tokens per character as the patch did
+        tokens_per_char = response.output_tokens / max(1, len(response.text))
+        saved = round(len(text) * tokens_per_char) - response.output_tokens
+        stats["patches_applied"] += 1
+        stats["output_tokens_saved"] += saved
+        self.last_delta = {"applied": True, "output_tokens_saved": saved}
+        return text
+
+    def _tool_prompt(self, prompt: str, reply: str, results) -> str:
+        return (f"{prompt}\n\nYour previous reply:\n{reply}\n\nTool results:\n{format_tool_results(results)}\n\n"
+                "Use these results to give your final answer (or call more tools).")
+
+    async def _run_tools(self, prompt: str, text: str, config: dict, use_cache: bool) -> str:
+        """
+        Serve up to TOOL_MAX_ROUNDS rounds of tool requests: the calls of a round run
+        concurrently and their results go back to the model in a follow-up prompt.
+        """
+        for _ in range(TOOL_MAX_ROUNDS):
+            calls = parse_tool_calls(text)
+            if not calls:
+                break
+            results = await self.tools.call_many_async(calls)
+            prompt = self._tool_prompt(prompt, text, results)
+            text = (await generate_async(prompt, config=config, use_cache=use_cache, phase="execute")).text.strip()
+        return text
+
+    def execute(self, task: str, feedback: str = None, strategy: str = None, use_cache: bool = True,
+                temperature: float = None, previous: str = None) -> str:
+        """
+        With `previous` (the rejected output) and feedback, a long output is corrected with
+        a delta: the model returns edits that are applied locally, and the answer is only
+        regenerated in full when they do not apply.
+        """
+        prompt = self._build_prompt(task, feedback, strategy)
+        config = self._generation_config(temperature)
+        self.last_delta = None
+
+        try:
+            if self._wants_delta(previous, feedback):
+                response = generate(self._delta_prompt(task, previous, feedback, strategy), config=config,
+                                    use_cache=use_cache, phase="execute")
+                text = self._apply_delta(previous, response)
+                if text is not None:
+                    return text
+            text = generate(prompt, config=config, use_cache=use_cache, phase="execute").text.strip()
+            for _ in range(TOOL_MAX_ROUNDS if self.tools is not None else 0):
+                calls = parse_tool_calls(text)
+                if not calls:
+                    break
+                results = [self.tools.call(call.name, call.args) for call in calls]
+                prompt = self._tool_prompt(prompt, text, results)
+                text = generate(prompt, config=config, use_cache=use_cache, phase="execute").text.strip()
+            return text
+        except Exception as e:
+            return self._handle_error(e)
+
+    async def execute_async(self, task: str, feedback: str = None, strategy: str = None, use_cache: bool = True,
+                            temperature: float = None, previous: str = None) -> str:
+        """Same as execute(), but awaits the SDK's async client so many tasks can run at once."""
+        prompt = self._build_prompt(task, feedback, strategy)
+        config = self._generation_config(temperature)
+        self.last_delta = None
 
         try:
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt
-            )
-            return response.text.strip()
+            if self._wants_delta(previous, feedback):
+                response = await generate_async(self._delta_prompt(task, previous, feedback, strategy), config=config,
+                                                use_cache=use_cache, phase="execute")
+                text = self._apply_delta(previous, response)
+                if text is not None:
+                    return text
+            response = await generate_async(prompt, config=config, use_cache=use_cache, phase="execute")
+            text = response.text.strip()
+            if self.tools is not None:
+                text = await self._run_tools(prompt, text, config, use_cache)
+            return text
         except Exception as e:
-            error_str = str(e)
-            
-            # Detect rate limiting errors (429)
-            if "429" in error_str or "Resource Exhausted" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                # Try to extract retry_delay from error message
-                delay_match = re.search(r'retry in (\d+\.\d+|\d+) second', error_str)
-                if delay_match:
-                    delay = float(delay_match.group(1))
-                    return f"[RATE_LIMIT_429] Error: {error_str[:100]} | Retry after {delay} seconds"
-                else:
-                    return f"[RATE_LIMIT_429] Error: {error_str[:100]} | Retry after 60 seconds (default)"
-            
-            # Generic execution error
-            return f"[EXECUTION_ERROR] {error_str[:150]}"
\ No newline at end of file
+            return self._handle_error(e)
+
+    def execute_stream(self, task: str, feedback: str = None, strategy: str = None,
+                       constraints: list = None, use_cache: bool = True, temperature: float = None) -> str:
+        """
+        Streaming execute(): `constraints` are checked on the partial text after every chunk
+        and the generation is cancelled on the first violation, returning a
+        [CONSTRAINT_VIOLATION] result instead of paying for the rest of the output.
+        """
+        prompt = self._build_prompt(task, feedback, strategy, offer_tools=False)
+        constraints = constraints or []
+        text = ""
+
+        try:
+            chunks = stream(prompt, config=self._generation_config(temperature), use_cache=use_cache, phase="execute")
+            try:
+                for chunk in chunks:
+                    text += chunk
+                    violation = check_constraints(text, constraints)
+                    if violation:
+                        return format_violation(violation)
+            finally:
+                chunks.close()
+        except Exception as e:
+            return self._handle_error(e)
+
+        violation = check_constraints(text, constraints, final=True)
+        if violation:
+            return format_violation(violation)
+        return text.strip()
+
+    async def execute_stream_async(self, task: str, feedback: str = None, strategy: str = None,
+                                   constraints: list = None, use_cache: bool = True, temperature: float = None) -> str:
+        """Async version of execute_stream()."""
+        prompt = self._build_prompt(task, feedback, strategy, offer_tools=False)
+        constraints = constraints or []
+        text = ""
+
+        try:
+            chunks = stream_async(prompt, config=self._generation_config(temperature), use_cache=use_cache, phase="execute")
+            try:
+                async for chunk in chunks:
+                    text += chunk
+                    violation = check_constraints(text, constraints)
+                    if violation:
+                        return format_violation(violation)
+            finally:
+                await chunks.aclose()
+        except Exception as e:
+            return self._handle_error(e)
+
+        violation = check_constraints(text, constraints, final=True)
+        if violation:
+            return format_violation(violation)
+        return text.strip()
@@ -0,0 +1,156 @@
+import json
+import re
+from typing import List, Optional
+from utils.helpers import clean_json_string
+from utils.types import ValidationResult, ErrorType
+
+# Deterministic validators that run before the LLM judge. Each check() returns a
+# definitive ValidationResult (reject, or accept with high confidence) or None to pass
+# the case on to the next tier. Every definitive answer saves one validator model call.
+
+def _reject(error_type: ErrorType, feedback: str, tier: str) -> ValidationResult:
+    return ValidationResult(
+        is_valid=False,
+        score=1.0,
+        error_type=error_type,
+        feedback=feedback,
+        retry_delay_seconds=0.0,
+        validated_by=tier
+    )
+
+def _accept(feedback: str, tier: str) -> ValidationResult:
+    return ValidationResult(
+        is_valid=True,
+        score=0.0,
+        error_type=ErrorType.NONE,
+        feedback=feedback,
+        retry_delay_seconds=0.0,
+        validated_by=tier
+    )
+
+class EmptyOutputValidator:
+    name = "empty"
+
+    def check(self, task: str, result: str) -> Optional[ValidationResult]:
+        if not result or not result.strip():
+            return _reject(ErrorType.CONSTRAINT, "Output is empty.", self.name)
+        return None
+
+class LengthValidator:
+    name = "length"
+
+    def __init__(self, min_chars: int = 0, max_chars: int = None):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+
+    def check(self, task: str, result: str) -> Optional[ValidationResult]:
+        length = len(result.strip())
+        if length < self.min_chars:
+            return _reject(ErrorType.CONSTRAINT, f"Output is {length} characters, minimum is {self.min_chars}.", self.name)
+        if self.max_chars is not None and length > self.max_chars:
+            return _reject(ErrorType.CONSTRAINT, f"Output is {length} characters, maximum is {self.max_chars}.", self.name)
+        return None
+
+class JSONValidator:
+    """Output must parse as JSON (code fences allowed) and contain `required_keys`."""
+    name = "json"
+
+    def __init__(self, required_keys: List[str] = None):
+        self.required_keys = required_keys or []
+
+    def check(self, task: str, result: str) -> Optional[ValidationResult]:
+        try:
+            data = json.loads(clean_json_string(result))
+        except json.JSONDecodeError as e:
+            return _reject(ErrorType.CONSTRAINT, f"Output is not valid JSON: {e}", self.name)
+
+        missing = [key for key in self.required_keys if not isinstance(data, dict) or key not in data]
+        if missing:
+            return _reject(ErrorType.CONSTRAINT, f"JSON output is missing required keys: {', '.join(missing)}", self.name)
+        return None
+
+class KeywordValidator:
+    name = "keywords"
+
+    def __init__(self, keywords: List[str], case_sensitive: bool = False):
+        self.keywords = keywords
+        self.case_sensitive = case_sensitive
+
+    def check(self, task: str, result: str) -> Optional[ValidationResult]:
+        haystack = result if self.case_sensitive else result.lower()
+        missing = [k for k in self.keywords if (k if self.case_sensitive else k.lower()) not in haystack]
+        if missing:
+            return _reject(ErrorType.CONSTRAINT, f"Output is missing required keywords: {', '.join(missing)}", self.name)
+        return None
+
+class NumericAnswerValidator:
+    """
+    For tasks with a checkable numeric answer. Only an output with exactly one distinct
+    number is decided locally: a match with `expected` is accepted, anything else rejected
+    as a semantic error. No number, or several (units, years, intermediate steps), is
+    ambiguous and goes to the LLM judge.
+    """
+    name = "numeric"
+    _NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+    def __init__(self, expected: float, tolerance: float = 1e-6):
+        self.expected = float(expected)
+        self.tolerance = tolerance
+
+    def check(self, task: str, result: str) -> Optional[ValidationResult]:
+        candidates = {}
+        for number in self._NUMBER.findall(result):
+            try:
+                candidates.setdefault(float(number.replace(",", "")), number)
+            except ValueError:
+                return None
+        if len(candidates) != 1:
+            return None
+        value, number = next(iter(candidates.items()))
+        if abs(value - self.expected) <= self.tolerance:
+            return _accept(f"Numeric answer {number} matches the expected value.", self.name)
+        return _reject(ErrorType.SEMANTIC, f"Numeric answer {number} is wrong.", self.name)
+
+class ValidatorChain:
+    """Runs local validators in order and counts how many LLM judge calls each one saved."""
+
+    def __init__(self, validators: list = None):
+        self.validators = validators if validators is not None else [EmptyOutputValidator()]
+        self.stats = {v.name: {"checked": 0, "rejected": 0, "accepted": 0} for v in self.validators}
+        self.stats["llm"] = {"checked": 0, "rejected": 0, "accepted": 0}
+
+    def run(self, task: str, result: str) -> Optional[ValidationResult]:
+        for validator in self.validators:
+            tier = self.stats[validator.name]
+            tier["checked"] += 1
+            verdict = validator.check(task, result)
+            if verdict is not None:
+                tier["accepted" if verdict.is_valid else "rejected"] += 1
+                return verdict
+        self.stats["llm"]["checked"] += 1
+        return None
+
+    def record_llm_verdict(self, validation: ValidationResult):
+        self.stats["llm"]["accepted" if validation.is_valid else "rejected"] += 1
+
+    def calls_saved(self) -> int:
+        return sum(s["rejected"] + s["accepted"] for name, s in self.stats.items() if name != "llm")
+
+def build_local_validators(spec: dict = None) -> ValidatorChain:
+    """
+    Build the pre-validator chain from a task's declarative spec, e.g.
+    {"json": {"required_keys": ["name"]}, "max_chars": 800, "keywords": ["total"], "numeric_answer": 55}
+    The empty-output check always runs first.
+    """
+    spec = spec or {}
+    validators = [EmptyOutputValidator()]
+    if spec.get("min_chars") or spec.get("max_chars"):
+        validators.append(LengthValidator(int(spec.get("min_chars", 0)), spec.get("max_chars")))
+    if spec.get("json"):
+        options = spec["json"] if isinstance(spec["json"], dict) else {}
+        validators.append(JSONValidator(options.get("required_keys")))
+    if spec.get("keywords"):
+        validators.append(KeywordValidator(spec["keywords"]))
+    if spec.get("numeric_answer") is not None:
+        validators.append(NumericAnswerValidator(spec["numeric_answer"], float(spec.get("tolerance", 1e-6))))
+    return ValidatorChain(validators)
@@ -1,10 +1,182 @@
-from config import client, MODEL_NAME
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+from config import PLAN_MAX_STEPS, PLAN_CACHE_SIZE
+from utils.helpers import clean_json_string
+from utils.llm import generate, generate_async
+
+# Structured-output config for step graphs: {"steps": [{"id", "task", "depends_on"}]}
+PLAN_RESPONSE_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": {
+            "steps": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "id": {"type": "STRING"},
+                        "task": {"type": "STRING"},
+                        "depends_on": {"type": "ARRAY", "items": {"type": "STRING"}},
+                    },
+                    "required": ["id", "task", "depends_on"],
+                },
+            },
+        },
+        "required": ["steps"],
+    },
+}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_WHITESPACE = re.compile(r"\s+")
+
+@dataclass
+class PlanStep:
+    id: str
+    task: str
+    depends_on: List[str] = field(default_factory=list)
+
+@dataclass
+class StepGraph:
+    steps: List[PlanStep]       # topologically ordered
+
+    def step(self, step_id: str) -> PlanStep:
+        return next(s for s in self.steps if s.id == step_id)
+
+def parse_step_graph(text: str, max_steps: int = PLAN_MAX_STEPS) -> Optional[StepGraph]:
+    """
+    Parse and check a planner reply. Unknown dependencies are dropped; a reply that is
+    not JSON, has duplicate ids, too many steps or a cycle gives None.
+    """
+    try:
+        data = json.loads(clean_json_string(text))
+    except json.JSONDecodeError:
+        return None
+    raw_steps = data.get("steps") if isinstance(data, dict) else data
+    if not isinstance(raw_steps, list) or not raw_steps or len(raw_steps) > max_steps:
+        return None
+    steps = {}
+    for raw in raw_steps:
+        if not isinstance(raw, dict) or not str(raw.get("task", "")).strip():
+            return None
+        step_id = str(raw.get("id") or f"s{len(steps) + 1}")
+        if step_id in steps:
+            return None
+        depends_on = raw.get("depends_on") or []
+        steps[step_id] = PlanStep(step_id, str(raw["task"]).strip(),
+                                  [str(d) for d in depends_on] if isinstance(depends_on, list) else [])
+    for step in steps.values():
+        step.depends_on = [d for d in dict.fromkeys(step.depends_on) if d in steps and d != step.id]
+
+    # Kahn's algorithm: topological order, or None on a cycle
+    ordered, done = [], set()
+    while len(ordered) < len(steps):
+        ready = [s for s in steps.values() if s.id not in done and all(d in done for d in s.depends_on)]
+        if not ready:
+            return None
+        for step in ready:
+            ordered.append(step)
+            done.add(step.id)
+    return StepGraph(ordered)
+
+def task_template(task: str):
+    """(template, numbers): the normalized task with every number replaced by <n>, and those numbers."""
+    normalized = _WHITESPACE.sub(" ", task.strip().lower())
+    return _NUMBER.sub("<n>", normalized), _NUMBER.findall(normalized)
+
+class PlanCache:
+    """
+    LRU of step graphs keyed on the task template, so "Compare 3 and 5" reuses the plan
+    made for "Compare 4 and 9". Numbers of the original task are stored as <argN>
+    placeholders in the step texts and filled in from the new task on a hit.
+    """
+    def __init__(self, max_entries: int = PLAN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, task: str) -> Optional[StepGraph]:
+        template, values = task_template(task)
+        with self._lock:
+            entry = self._entries.get(template)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(template)
+            self.hits += 1
+        fill = lambda text: re.sub(r"<arg(\d+)>", lambda m: values[int(m.group(1))], text)
+        return StepGraph([PlanStep(s.id, fill(s.task), list(s.depends_on)) for s in entry.steps])
+
+    def put(self, task: str, graph: StepGraph):
+        template, values = task_template(task)
+        index = {}
+        for i, value in enumerate(values):
+            index.setdefault(value, i)
+        generalize = lambda text: _NUMBER.sub(lambda m: f"<arg{index[m.group(0)]}>" if m.group(0) in index
+                                              else m.group(0), text)
+        stored = StepGraph([PlanStep(s.id, generalize(s.task), list(s.depends_on)) for s in graph.steps])
+        with self._lock:
+            self._entries[template] = stored
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries)}
 
 class PlannerAgent:
-    def create_plan(self, task: str) -> str:
+    def __init__(self, cache: "PlanCache" = None):
+        self.cache = cache if cache is not None else get_plan_cache()
+
+    def create_plan(self, task: str, use_cache: bool = True) -> str:
         prompt = f"Create a short 3-step plan to solve this task:\n\n{task}"
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt
+        response = generate(prompt, use_cache=use_cache, phase="plan")
+        return response.text.strip()
+
+    def _graph_prompt(self, task: str) -> str:
+        return (
+            "Split the task below into at most "
+            f"{PLAN_MAX_STEPS} self-contained steps that together produce the full answer.\n"
+            "Make steps independent wherever possible so they can run in parallel; list in "
+            "`depends_on` only the ids of steps whose result a step really needs.\n"
+            "Do not add a final combining step - that is done separately. A simple task is one step.\n"
+            'Reply with JSON only: {"steps": [{"id": "s1", "task": "...", "depends_on": []}, ...]}\n\n'
+            f"Task: {task}"
         )
-        return response.text.strip()
\ No newline at end of file
+
+    async def create_step_graph_async(self, task: str, use_cache: bool = True):
+        """
+        Structured plan for `task` as (StepGraph or None, from_cache). Plans are memoized per
+        task template (see PlanCache), so repeated templates skip the planning call.
+        """
+        if use_cache:
+            cached = self.cache.get(task)
+            if cached is not None:
+                return cached, True
+        response = await generate_async(self._graph_prompt(task), config=PLAN_RESPONSE_CONFIG,
+                                        use_cache=use_cache, phase="plan")
+        graph = parse_step_graph(response.text)
+        if graph is not None:
+            self.cache.put(task, graph)
+        return graph, False
+
+_plan_cache = None
+
+def get_plan_cache() -> PlanCache:
+    """Return the process-wide PlanCache, creating it on first use."""
+    global _plan_cache
+    if _plan_cache is None:
+        _plan_cache = PlanCache()
+    return _plan_cache
+
+def set_plan_cache(cache: Optional[PlanCache]):
+    global _plan_cache
+    _plan_cache = cache
\ No newline at end of file
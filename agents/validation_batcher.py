@@ -0,0 +1,70 @@
+import asyncio
+from typing import List, Tuple
+from config import VALIDATOR_BATCH_SIZE, VALIDATOR_BATCH_WAIT_MS
+from agents.local_validators import ValidatorChain
+from agents.validator import ValidatorAgent
+from utils.types import ValidationResult
+
+class ValidationBatcher:
+    """
+    Micro-batching front end for ValidatorAgent shared by concurrent workflows.
+    validate() resolves prechecks and local validators immediately; cases that need the
+    LLM judge are queued and sent together via judge_batch_async() once `max_batch`
+    items are waiting or `max_wait_ms` has passed since the first one, whichever comes first.
+    """
+
+    def __init__(self, validator: ValidatorAgent = None, max_batch: int = VALIDATOR_BATCH_SIZE,
+                 max_wait_ms: float = VALIDATOR_BATCH_WAIT_MS):
+        self.validator = validator or ValidatorAgent()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches_sent = 0
+        self.items_judged = 0
+        self._queue: List[Tuple[str, str, asyncio.Future]] = []
+        self._timer = None
+
+    async def validate(self, task: str, result: str, local_validators: ValidatorChain = None) -> ValidationResult:
+        verdict = self.validator.local_verdict(task, result, local_validators)
+        if verdict is not None:
+            return verdict
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((task, result, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        validation = await future
+        if local_validators is not None:
+            local_validators.record_llm_verdict(validation)
+        return validation
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        self.batches_sent += 1
+        self.items_judged += len(batch)
+        try:
+            verdicts = await self.validator.judge_batch_async([(task, result) for task, result, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), verdict in zip(batch, verdicts):
+            if not future.done():
+                future.set_result(verdict)
+
+    def stats(self) -> dict:
+        return {
+            "batches_sent": self.batches_sent,
+            "items_judged": self.items_judged,
+            "avg_batch_size": self.items_judged / self.batches_sent if self.batches_sent else 0.0,
+        }
@@ -0,0 +1,102 @@
+import random
+from collections import deque
+from typing import Optional
+from config import ACCEPTANCE_THRESHOLD, CASCADE_AUDIT_RATE, CASCADE_BAND, CASCADE_MODEL
+from utils.helpers import percentile
+from utils.types import ValidationResult
+
+# Two-tier LLM judge used by ValidatorAgent when a cascade is attached.
+# 1. Every output is first scored by CASCADE_MODEL with a short prompt ("fast" tier).
+# 2. The verdict stands unless its score lies within `band` of the acceptance threshold,
+#    or its JSON could not be parsed (or the call failed); then the full validator prompt
+#    runs on the main model ("strong" tier) and its verdict is used instead.
+# 3. A small `audit_rate` of confident fast verdicts is escalated too, so the agreement of
+#    the fast tier outside the band can be measured while tuning the band.
+
+ESCALATION_REASONS = ("uncertain", "malformed", "audit")
+
+class JudgeCascade:
+    def __init__(self, model: str = CASCADE_MODEL, band: float = CASCADE_BAND,
+                 audit_rate: float = CASCADE_AUDIT_RATE, threshold: float = ACCEPTANCE_THRESHOLD, seed: int = 0):
+        self.model = model
+        self.band = band
+        self.audit_rate = audit_rate
+        self.threshold = threshold
+        self.judged = 0
+        self.fast_decided = 0
+        self.escalated = {reason: 0 for reason in ESCALATION_REASONS}
+        # Escalations with a parsed fast verdict: did both tiers reach the same accept/reject decision?
+        self.agreement = {reason: {"compared": 0, "agreed": 0, "same_error_type": 0, "score_diff": 0.0}
+                          for reason in ("uncertain", "audit")}
+        self.latencies = {"fast": deque(maxlen=1024), "strong": deque(maxlen=1024)}
+        self._rng = random.Random(seed)
+
+    def escalation_reason(self, fast: Optional[ValidationResult]) -> Optional[str]:
+        """Why the strong tier must judge this case, or None if the fast verdict stands."""
+        if fast is None:
+            return "malformed"
+        if abs(fast.score - self.threshold) < self.band:
+            return "uncertain"
+        if self.audit_rate and self._rng.random() < self.audit_rate:
+            return "audit"
+        return None
+
+    def record(self, fast: Optional[ValidationResult], fast_latency: float, reason: Optional[str] = None,
+               strong: ValidationResult = None, strong_latency: float = 0.0):
+        self.judged += 1
+        self.latencies["fast"].append(fast_latency)
+        if reason is None:
+            self.fast_decided += 1
+            return
+        self.escalated[reason] += 1
+        if strong is None:
+            return
+        self.latencies["strong"].append(strong_latency)
+        if fast is not None and reason in self.agreement:
+            agreement = self.agreement[reason]
+            agreement["compared"] += 1
+            agreement["agreed"] += fast.is_valid == strong.is_valid
+            agreement["same_error_type"] += fast.error_type == strong.error_type
+            agreement["score_diff"] += abs(fast.score - strong.score)
+
+    def stats(self) -> dict:
+        escalations = sum(self.escalated.values())
+        fast = list(self.latencies["fast"])
+        strong = list(self.latencies["strong"])
+        return {
+            "model": self.model,
+            "band": self.band,
+            "judged": self.judged,
+            "fast_decided": self.fast_decided,
+            "escalated": dict(self.escalated),
+            "escalation_rate": escalations / self.judged if self.judged else 0.0,
+            "strong_calls_saved": self.fast_decided,
+            "agreement": {
+                reason: {
+                    "compared": a["compared"],
+                    "verdict_agreement": a["agreed"] / a["compared"] if a["compared"] else None,
+                    "error_type_agreement": a["same_error_type"] / a["compared"] if a["compared"] else None,
+                    "mean_score_diff": a["score_diff"] / a["compared"] if a["compared"] else None,
+                }
+                for reason, a in self.agreement.items()
+            },
+            "latency": {
+                "fast_p50": percentile(fast, 50),
+                "fast_p95": percentile(fast, 95),
+                "strong_p50": percentile(strong, 50),
+                "strong_p95": percentile(strong, 95),
+            },
+        }
+
+# Process-wide cascade, shared by concurrent workflows so its statistics cover the whole run
+_cascade = None
+
+def get_judge_cascade() -> JudgeCascade:
+    global _cascade
+    if _cascade is None:
+        _cascade = JudgeCascade()
+    return _cascade
+
+def set_judge_cascade(cascade: Optional[JudgeCascade]):
+    global _cascade
+    _cascade = cascade
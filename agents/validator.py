@@ -1,29 +1,87 @@
+import asyncio
 import json
-import re
-from config import client, MODEL_NAME
+import time
+from typing import Dict, List, Optional, Tuple
+from agents.constraints import CONSTRAINT_VIOLATION_TAG
+from agents.local_validators import ValidatorChain
+from agents.validation_cascade import JudgeCascade
+from config import ACCEPTANCE_THRESHOLD, INITIAL_RATE_LIMIT_DELAY, VALIDATOR_REASK_LIMIT
+from metrics.events import emit
+from utils.llm import generate, generate_async
+from utils.rate_limiter import is_rate_limit_error, extract_retry_delay
 from utils.types import ValidationResult, ErrorType
-from utils.helpers import clean_json_string
+from utils.helpers import JSONRepairError, parse_json_lenient
+
+_ERROR_TYPE_VALUES = ["none", "semantic", "tool", "constraint", "hallucination"]
+
+# Structured-output config for single verdicts: {"score", "error_type", "reasoning"}
+VERDICT_RESPONSE_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "OBJECT",
+        "properties": {
+            "score": {"type": "NUMBER"},
+            "error_type": {"type": "STRING", "enum": _ERROR_TYPE_VALUES},
+            "reasoning": {"type": "STRING"},
+        },
+        "required": ["score", "error_type", "reasoning"],
+    },
+}
+
+# Structured-output config for batched judging: a JSON array of verdicts keyed by item id
+BATCH_RESPONSE_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {
+                "id": {"type": "STRING"},
+                "score": {"type": "NUMBER"},
+                "error_type": {"type": "STRING", "enum": _ERROR_TYPE_VALUES},
+                "reasoning": {"type": "STRING"},
+            },
+            "required": ["id", "score", "error_type", "reasoning"],
+        },
+    },
+}
+
+def _rubric(subject: str) -> str:
+    # Scoring scale and error types shared by the single and the batched judge prompts
+    return f"""1. Carefully compare the output against {subject} task requirements.
+2. Assign a failure score:
+   - 0.0 = perfect / no issues
+   - 0.1–0.3 = minor issues
+   - 0.4–0.7 = significant problems
+   - 0.8–1.0 = complete failure or irrelevant
+3. Classify the primary error type (choose exactly one):
+   - "none"              → no detectable error
+   - "semantic"          → logical, factual, or reasoning mistake
+   - "tool"              → tool misuse, syntax error, API misuse
+   - "constraint"        → violates output format, length, style, or rules
+   - "hallucination"     → invented facts or information not supported by task
+"""
 
 class ValidatorAgent:
-    def __init__(self):
-        # We use the shared client from config.py
-        pass
+    def __init__(self, cascade: JudgeCascade = None):
+        # With a cascade, a cheap judge scores first (see agents.validation_cascade)
+        self.cascade = cascade
+        # Judge replies: parsed as-is, repaired by the tolerant parser, re-asked, or given up on
+        self.parse_stats = {"replies": 0, "clean": 0, "repaired": 0, "failures": 0, "reasks": 0,
+                            "reask_recovered": 0, "repairs": {}}
+        # The cascade's fast tier is counted apart (never re-asked: a malformed reply escalates)
+        self.fast_parse_stats = {"replies": 0, "clean": 0, "repaired": 0, "failures": 0, "repairs": {}}
 
     def _extract_retry_delay(self, error_str: str) -> float:
         """Extract retry delay in seconds from error messages."""
         # Look for patterns like "retry in 51.630 seconds" or "retry in 60 seconds"
-        delay_match = re.search(r'retry in (\d+\.\d+|\d+) second', error_str, re.IGNORECASE)
-        if delay_match:
-            return float(delay_match.group(1))
-        return 60.0  # default to 60 seconds if not found
+        delay = extract_retry_delay(error_str)
+        if delay is not None:
+            return delay
+        return INITIAL_RATE_LIMIT_DELAY  # default to 60 seconds if not found
 
-    def validate(self, task: str, result: str) -> ValidationResult:
-        """
-        Use Gemini to evaluate the agent's output and return structured validation.
-        Returns JSON-parsed ValidationResult with score, error_type, feedback.
-        Detects rate limiting errors and returns appropriate retry delay.
-        """
-        
+    def _precheck(self, result: str) -> Optional[ValidationResult]:
+        """Short-circuit executor outputs that already carry an error tag (no model call needed)."""
         # First, check if the result itself indicates a rate limit error
         if "[RATE_LIMIT_429]" in result:
             retry_delay = self._extract_retry_delay(result)
@@ -32,9 +90,21 @@ class ValidatorAgent:
                 score=1.0,
                 error_type=ErrorType.RATE_LIMIT,
                 feedback=f"API rate limited. Please wait {retry_delay:.1f} seconds before retrying.",
-                retry_delay_seconds=retry_delay
+                retry_delay_seconds=retry_delay,
+                validated_by="precheck"
             )
         
+        # Output was cut off by a local constraint check during streaming
+        if result.startswith(CONSTRAINT_VIOLATION_TAG):
+            return ValidationResult(
+                is_valid=False,
+                score=1.0,
+                error_type=ErrorType.CONSTRAINT,
+                feedback=result[len(CONSTRAINT_VIOLATION_TAG):].strip(),
+                retry_delay_seconds=0.0,
+                validated_by="precheck"
+            )
+
         # Check for other execution errors
         if "[EXECUTION_ERROR]" in result:
             return ValidationResult(
@@ -42,10 +112,20 @@ class ValidatorAgent:
                 score=1.0,
                 error_type=ErrorType.TOOL,
                 feedback=result,
-                retry_delay_seconds=0.0
+                retry_delay_seconds=0.0,
+                validated_by="precheck"
             )
+        return None
+
+    def local_verdict(self, task: str, result: str, local_validators: ValidatorChain = None) -> Optional[ValidationResult]:
+        """Verdict from the error-tag precheck or the local validator chain, or None if the LLM judge is needed."""
+        verdict = self._precheck(result)
+        if verdict is None and local_validators is not None:
+            verdict = local_validators.run(task, result)
+        return verdict
 
-        prompt = f"""
+    def _build_prompt(self, task: str, result: str) -> str:
+        return f"""
 You are a strict and precise QA Validator for an autonomous agent system.
 
 Task description:
@@ -55,19 +135,7 @@ Agent's output:
 {result}
 
 Your job:
-1. Carefully compare the output against the task requirements.
-2. Assign a failure score:
-   - 0.0 = perfect / no issues
-   - 0.1–0.3 = minor issues
-   - 0.4–0.7 = significant problems
-   - 0.8–1.0 = complete failure or irrelevant
-3. Classify the primary error type (choose exactly one):
-   - "none"              → no detectable error
-   - "semantic"          → logical, factual, or reasoning mistake
-   - "tool"              → tool misuse, syntax error, API misuse
-   - "constraint"        → violates output format, length, style, or rules
-   - "hallucination"     → invented facts or information not supported by task
-
+{_rubric("the")}
 Return **ONLY** valid JSON with these exact keys (no markdown, no extra text):
 {{
   "score": <float between 0.0 and 1.0>,
@@ -76,37 +144,196 @@ Return **ONLY** valid JSON with these exact keys (no markdown, no extra text):
 }}
 """
 
-        try:
-            # For google-genai library, pass config directly to the request
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt
-            )
+    def _build_fast_prompt(self, task: str, result: str) -> str:
+        # Cascade first tier: the same verdict JSON from a much shorter rubric
+        return f"""
+You are a QA Validator. Score how badly the output fails the task (0.0 = perfect, 1.0 = complete failure)
+and name the main error type: none, semantic, tool, constraint or hallucination.
 
-            # Clean and parse the response
-            cleaned = clean_json_string(response.text)
-            data = json.loads(cleaned)
+Task description:
+{task}
 
-            # Safely extract and normalize
-            score = float(data.get("score", 1.0))
-            error_type_str = data.get("error_type", "none").lower().strip()
+Agent's output:
+{result}
+
+Return ONLY JSON: {{"score": <float>, "error_type": "<type>", "reasoning": "<one sentence>"}}
+"""
+
+    def _reask_prompt(self, prompt: str, reply: str, error: Exception) -> str:
+        return (f"{prompt}\nYour previous reply could not be used ({error}):\n{reply[:500]}\n\n"
+                f"Reply again with ONLY the JSON object described above, nothing else.\n")
 
+    def _record_parse(self, repairs: List[str] = None, failed: bool = False, stats: dict = None):
+        stats = stats if stats is not None else self.parse_stats
+        stats["replies"] += 1
+        if failed:
+            stats["failures"] += 1
+        elif repairs:
+            stats["repaired"] += 1
+            for repair in repairs:
+                stats["repairs"][repair] = stats["repairs"].get(repair, 0) + 1
+        else:
+            stats["clean"] += 1
+
+    def _parse_response(self, text: str, validated_by: str = "llm", stats: dict = None) -> ValidationResult:
+        """Verdict from a judge reply, repairing near-JSON; JSONRepairError if it cannot be used."""
+        try:
+            data, repairs = parse_json_lenient(text, opening="{")
+            if isinstance(data, list) and len(data) == 1:
+                data = data[0]
+                repairs.append("unwrapped_list")
+            if not isinstance(data, dict):
+                raise JSONRepairError(f"Expected a JSON object, got {type(data).__name__}")
+            validation = self._verdict_from_dict(data, validated_by=validated_by, repairs=repairs)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._record_parse(failed=True, stats=stats)
+            raise e if isinstance(e, JSONRepairError) else JSONRepairError(f"Unusable verdict: {e}")
+        self._record_parse(repairs, stats=stats)
+        return validation
+
+    def _judge(self, task: str, result: str, use_cache: bool) -> ValidationResult:
+        """Full validator call with a schema-constrained reply; an unusable reply re-asks the judge only."""
+        prompt = self._build_prompt(task, result)
+        response = generate(prompt, config=VERDICT_RESPONSE_CONFIG, use_cache=use_cache, phase="validate")
+        for reask in range(VALIDATOR_REASK_LIMIT + 1):
             try:
-                error_type = ErrorType(error_type_str)
-            except ValueError:
-                error_type = ErrorType.SEMANTIC  # fallback
+                validation = self._parse_response(response.text)
+            except JSONRepairError as e:
+                if reask == VALIDATOR_REASK_LIMIT:
+                    raise
+                self.parse_stats["reasks"] += 1
+                emit("validation.reask", error=str(e)[:200])
+                response = generate(self._reask_prompt(prompt, response.text, e), config=VERDICT_RESPONSE_CONFIG,
+                                    use_cache=False, phase="validate")
+                continue
+            self.parse_stats["reask_recovered"] += reask > 0
+            return validation
 
-            reasoning = data.get("reasoning", "No reasoning provided").strip()
+    async def _judge_async(self, task: str, result: str, use_cache: bool) -> ValidationResult:
+        prompt = self._build_prompt(task, result)
+        response = await generate_async(prompt, config=VERDICT_RESPONSE_CONFIG, use_cache=use_cache, phase="validate")
+        for reask in range(VALIDATOR_REASK_LIMIT + 1):
+            try:
+                validation = self._parse_response(response.text)
+            except JSONRepairError as e:
+                if reask == VALIDATOR_REASK_LIMIT:
+                    raise
+                self.parse_stats["reasks"] += 1
+                emit("validation.reask", error=str(e)[:200])
+                response = await generate_async(self._reask_prompt(prompt, response.text, e),
+                                                config=VERDICT_RESPONSE_CONFIG, use_cache=False, phase="validate")
+                continue
+            self.parse_stats["reask_recovered"] += reask > 0
+            return validation
 
-            return ValidationResult(
-                is_valid=(score < 0.2),
-                score=score,
-                error_type=error_type,
-                feedback=reasoning,
-                retry_delay_seconds=0.0
-            )
+    def _parse_fast(self, text: str) -> Optional[ValidationResult]:
+        """Fast-tier verdict, or None when its JSON is malformed (which escalates)."""
+        try:
+            verdict = self._parse_response(text, validated_by="llm_fast", stats=self.fast_parse_stats)
+        except (ValueError, TypeError, AttributeError):
+            return None
+        return verdict if 0.0 <= verdict.score <= 1.0 else None
+
+    def _cascade_outcome(self, fast: Optional[ValidationResult], fast_latency: float) -> Optional[str]:
+        reason = self.cascade.escalation_reason(fast)
+        if reason is None:
+            self.cascade.record(fast, fast_latency)
+        else:
+            emit("validation.escalated", reason=reason, fast_score=fast.score if fast is not None else None)
+        return reason
+
+    def _fast_verdict(self, task: str, result: str, use_cache: bool) -> Tuple[Optional[ValidationResult], float, Optional[str]]:
+        """Cascade first tier: (verdict, latency, escalation reason or None if the verdict stands)."""
+        start = time.perf_counter()
+        try:
+            fast = self._parse_fast(generate(self._build_fast_prompt(task, result), model=self.cascade.model,
+                                             config=VERDICT_RESPONSE_CONFIG, use_cache=use_cache,
+                                             phase="validate_fast").text)
+        except Exception:
+            fast = None     # cheap tier unavailable: same as a malformed verdict
+        fast_latency = time.perf_counter() - start
+        return fast, fast_latency, self._cascade_outcome(fast, fast_latency)
 
-        except json.JSONDecodeError as e:
+    async def _fast_verdict_async(self, task: str, result: str,
+                                  use_cache: bool) -> Tuple[Optional[ValidationResult], float, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            response = await generate_async(self._build_fast_prompt(task, result), model=self.cascade.model,
+                                            config=VERDICT_RESPONSE_CONFIG, use_cache=use_cache,
+                                            phase="validate_fast")
+            fast = self._parse_fast(response.text)
+        except Exception:
+            fast = None
+        fast_latency = time.perf_counter() - start
+        return fast, fast_latency, self._cascade_outcome(fast, fast_latency)
+
+    def _judge_cascade(self, task: str, result: str, use_cache: bool) -> ValidationResult:
+        fast, fast_latency, reason = self._fast_verdict(task, result, use_cache)
+        if reason is None:
+            return fast
+        start = time.perf_counter()
+        try:
+            validation = self._judge(task, result, use_cache)
+        except Exception:
+            self.cascade.record(fast, fast_latency, reason)
+            raise
+        self.cascade.record(fast, fast_latency, reason, validation, time.perf_counter() - start)
+        return validation
+
+    async def _judge_cascade_async(self, task: str, result: str, use_cache: bool) -> ValidationResult:
+        fast, fast_latency, reason = await self._fast_verdict_async(task, result, use_cache)
+        if reason is None:
+            return fast
+        start = time.perf_counter()
+        try:
+            validation = await self._judge_async(task, result, use_cache)
+        except Exception:
+            self.cascade.record(fast, fast_latency, reason)
+            raise
+        self.cascade.record(fast, fast_latency, reason, validation, time.perf_counter() - start)
+        return validation
+
+    def _coerce_score(self, value, repairs: list) -> float:
+        # "0.3", "30%" and 0/1 booleans are all seen in practice
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        repairs.append("coerced_types")
+        if isinstance(value, str) and value.strip().endswith("%"):
+            return float(value.strip()[:-1]) / 100.0
+        return float(value)
+
+    def _verdict_from_dict(self, data: dict, validated_by: str = "llm", repairs: list = None) -> ValidationResult:
+        # Safely extract and normalize (type coercions are appended to `repairs`)
+        repairs = repairs if repairs is not None else []
+        score = self._coerce_score(data.get("score", 1.0), repairs)
+        raw_error_type = data.get("error_type", "none")
+        if not isinstance(raw_error_type, str):
+            repairs.append("coerced_types")
+            raw_error_type = "none" if raw_error_type is None else str(raw_error_type)
+        error_type_str = raw_error_type.lower().strip()
+
+        try:
+            error_type = ErrorType(error_type_str)
+        except ValueError:
+            error_type = ErrorType.SEMANTIC  # fallback
+
+        reasoning = data.get("reasoning", "No reasoning provided")
+        if not isinstance(reasoning, str):
+            repairs.append("coerced_types")
+            reasoning = " ".join(map(str, reasoning)) if isinstance(reasoning, list) else str(reasoning)
+        reasoning = reasoning.strip()
+
+        return ValidationResult(
+            is_valid=(score < ACCEPTANCE_THRESHOLD),
+            score=score,
+            error_type=error_type,
+            feedback=reasoning,
+            retry_delay_seconds=0.0,
+            validated_by=validated_by
+        )
+
+    def _handle_error(self, e: Exception) -> ValidationResult:
+        if isinstance(e, (json.JSONDecodeError, JSONRepairError)):
             return ValidationResult(
                 is_valid=False,
                 score=1.0,
@@ -115,24 +342,205 @@ Return **ONLY** valid JSON with these exact keys (no markdown, no extra text):
                 retry_delay_seconds=0.0
             )
 
-        except Exception as e:
-            error_str = str(e)
-            
-            # Detect rate limiting in validator's own API call
-            if "429" in error_str or "Resource Exhausted" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                retry_delay = self._extract_retry_delay(error_str)
-                return ValidationResult(
-                    is_valid=False,
-                    score=1.0,
-                    error_type=ErrorType.RATE_LIMIT,
-                    feedback=f"Validator rate limited. Please wait {retry_delay:.1f} seconds before retrying.",
-                    retry_delay_seconds=retry_delay
-                )
-            
+        error_str = str(e)
+        
+        # Detect rate limiting in validator's own API call
+        if is_rate_limit_error(error_str):
+            retry_delay = self._extract_retry_delay(error_str)
             return ValidationResult(
                 is_valid=False,
                 score=1.0,
-                error_type=ErrorType.TOOL,
-                feedback=f"Validator crashed: {type(e).__name__}: {str(e)[:100]}",
-                retry_delay_seconds=0.0
-            )
\ No newline at end of file
+                error_type=ErrorType.RATE_LIMIT,
+                feedback=f"Validator rate limited. Please wait {retry_delay:.1f} seconds before retrying.",
+                retry_delay_seconds=retry_delay
+            )
+        
+        return ValidationResult(
+            is_valid=False,
+            score=1.0,
+            error_type=ErrorType.TOOL,
+            feedback=f"Validator crashed: {type(e).__name__}: {str(e)[:100]}",
+            retry_delay_seconds=0.0
+        )
+
+    def validate(self, task: str, result: str, use_cache: bool = True,
+                 local_validators: ValidatorChain = None) -> ValidationResult:
+        """
+        Use Gemini to evaluate the agent's output and return structured validation.
+        Returns JSON-parsed ValidationResult with score, error_type, feedback.
+        Detects rate limiting errors and returns appropriate retry delay.
+        `local_validators` run first and can decide the case without a model call.
+        With a cascade, the cheap judge decides unless its verdict is uncertain or malformed.
+        """
+        precheck = self.local_verdict(task, result, local_validators)
+        if precheck is not None:
+            return precheck
+
+        try:
+            if self.cascade is not None:
+                validation = self._judge_cascade(task, result, use_cache)
+            else:
+                validation = self._judge(task, result, use_cache)
+        except Exception as e:
+            return self._handle_error(e)
+
+        if local_validators is not None:
+            local_validators.record_llm_verdict(validation)
+        return validation
+
+    async def validate_async(self, task: str, result: str, use_cache: bool = True,
+                             local_validators: ValidatorChain = None) -> ValidationResult:
+        """Same as validate(), but awaits the SDK's async client."""
+        precheck = self.local_verdict(task, result, local_validators)
+        if precheck is not None:
+            return precheck
+
+        try:
+            if self.cascade is not None:
+                validation = await self._judge_cascade_async(task, result, use_cache)
+            else:
+                validation = await self._judge_async(task, result, use_cache)
+        except Exception as e:
+            return self._handle_error(e)
+
+        if local_validators is not None:
+            local_validators.record_llm_verdict(validation)
+        return validation
+
+    def _build_batch_prompt(self, items: List[Tuple[str, str, str]]) -> str:
+        blocks = "\n".join(
+            f"### Item {item_id}\nTask description:\n{task}\n\nAgent's output:\n{result}\n"
+            for item_id, task, result in items
+        )
+        return f"""
+You are a strict and precise QA Validator for an autonomous agent system.
+You will judge {len(items)} independent items. Judge each one on its own.
+
+{blocks}
+For EACH item:
+{_rubric("its")}
+Return **ONLY** a valid JSON array with one object per item (no markdown, no extra text):
+[
+  {{"id": "<item id>", "score": <float between 0.0 and 1.0>, "error_type": "<one of the five strings above>", "reasoning": "<very short 1-sentence explanation>"}}
+]
+"""
+
+    def _parse_batch_response(self, text: str) -> Dict[str, ValidationResult]:
+        """Map item id -> verdict; items that are missing, malformed or duplicated are left out."""
+        try:
+            data, repairs = parse_json_lenient(text, opening="[")
+        except JSONRepairError:
+            self._record_parse(failed=True)
+            return {}
+        if not isinstance(data, list):
+            self._record_parse(failed=True)
+            return {}
+        self._record_parse(repairs)
+
+        verdicts = {}
+        duplicated = set()
+        for entry in data:
+            if not isinstance(entry, dict) or "id" not in entry or "score" not in entry:
+                continue
+            item_id = str(entry["id"])
+            if item_id in verdicts or item_id in duplicated:
+                # Two verdicts for one item: neither can be trusted
+                verdicts.pop(item_id, None)
+                duplicated.add(item_id)
+                continue
+            try:
+                verdicts[item_id] = self._verdict_from_dict(entry, validated_by="llm_batch")
+            except (TypeError, ValueError, AttributeError):
+                continue
+        return verdicts
+
+    async def _judge_one_async(self, task: str, result: str, use_cache: bool) -> Tuple[ValidationResult, bool]:
+        """Full judge for one item: (verdict, judged), where judged is False if the call failed."""
+        try:
+            return await self._judge_async(task, result, use_cache), True
+        except Exception as e:
+            return self._handle_error(e), False
+
+    async def _judge_many_async(self, pairs: List[Tuple[str, str]], use_cache: bool) -> List[Tuple[ValidationResult, bool]]:
+        """
+        Full judge for many items in one request with a JSON-array response schema, verdicts
+        mapped back by id. Items whose verdict is missing or unparsable are judged one by one.
+        """
+        if len(pairs) < 2:
+            return [await self._judge_one_async(task, result, use_cache) for task, result in pairs]
+
+        items = [(str(i), task, result) for i, (task, result) in enumerate(pairs)]
+        try:
+            # Batches are practically never repeated, so they skip the response cache
+            response = await generate_async(self._build_batch_prompt(items), config=BATCH_RESPONSE_CONFIG,
+                                            use_cache=False, phase="validate")
+            verdicts = {item_id: (verdict, True) for item_id, verdict in self._parse_batch_response(response.text).items()}
+        except Exception as e:
+            failure = self._handle_error(e)
+            if failure.error_type == ErrorType.RATE_LIMIT:
+                return [(failure, False) for _ in pairs]
+            verdicts = {}
+
+        missing = [(item_id, task, result) for item_id, task, result in items if item_id not in verdicts]
+        fallbacks = await asyncio.gather(*(self._judge_one_async(task, result, use_cache)
+                                           for _, task, result in missing))
+        for (item_id, _, _), outcome in zip(missing, fallbacks):
+            verdicts[item_id] = outcome
+        return [verdicts[item_id] for item_id, _, _ in items]
+
+    async def judge_batch_async(self, pairs: List[Tuple[str, str]], use_cache: bool = True) -> List[ValidationResult]:
+        """
+        The verdicts validate_async() would give each (task, result) pair, with fewer requests:
+        error-tag prechecks and (with a cascade) the cheap judge run per item first, and only
+        the items still undecided share one full-judge request (local validators are the
+        caller's job, see validate_batch_async).
+        """
+        results = [self._precheck(result) for _, result in pairs]
+        pending = [i for i, verdict in enumerate(results) if verdict is None]
+        escalated = {}
+        if self.cascade is not None and pending:
+            outcomes = await asyncio.gather(*(self._fast_verdict_async(*pairs[i], use_cache) for i in pending))
+            for i, (fast, fast_latency, reason) in zip(pending, outcomes):
+                if reason is None:
+                    results[i] = fast
+                else:
+                    escalated[i] = (fast, fast_latency, reason)
+            pending = [i for i in pending if i in escalated]
+
+        start = time.perf_counter()
+        judged = await self._judge_many_async([pairs[i] for i in pending], use_cache)
+        strong_latency = time.perf_counter() - start
+        for i, (verdict, ok) in zip(pending, judged):
+            results[i] = verdict
+            if i in escalated:
+                fast, fast_latency, reason = escalated[i]
+                if ok:
+                    self.cascade.record(fast, fast_latency, reason, verdict, strong_latency)
+                else:
+                    self.cascade.record(fast, fast_latency, reason)
+        return results
+
+    async def validate_batch_async(self, pairs: List[Tuple[str, str]], use_cache: bool = True,
+                                   local_validators: List[ValidatorChain] = None) -> List[ValidationResult]:
+        """
+        Validate many (task, result) pairs with one model request. Prechecks and each
+        pair's local validators (aligned with `pairs`) run first; only undecided pairs
+        are sent to the judge.
+        """
+        results = [None] * len(pairs)
+        chains = local_validators or [None] * len(pairs)
+        pending = []
+        for i, (task, result) in enumerate(pairs):
+            verdict = self.local_verdict(task, result, chains[i])
+            if verdict is not None:
+                results[i] = verdict
+            else:
+                pending.append(i)
+
+        judged = await self.judge_batch_async([pairs[i] for i in pending], use_cache=use_cache)
+        for i, verdict in zip(pending, judged):
+            results[i] = verdict
+            chain = chains[i]
+            if chain is not None:
+                chain.record_llm_verdict(verdict)
+        return results
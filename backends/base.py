@@ -0,0 +1,22 @@
+from typing import AsyncIterator, Iterator, Protocol
+from utils.types import LLMResponse
+
+class ModelBackend(Protocol):
+    """
+    What the agents need from a model provider. Backends are looked up by name in
+    backends.registry, so the rest of the system never imports a provider SDK directly.
+    """
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        ...
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        ...
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        """Yield the response text chunk by chunk."""
+        ...
+
+    def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        """Async generator version of stream(); closing it cancels the request."""
+        ...
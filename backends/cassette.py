@@ -0,0 +1,297 @@
+import asyncio
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from config import (CASSETTE_LATENCY, CASSETTE_MODE, CASSETTE_PATH, CASSETTE_RECORD_BACKEND, CASSETTE_SPEED,
+                    CASSETTE_STRICT)
+from utils.cache import ResponseCache
+from utils.rate_limiter import RateLimitScheduler
+from utils.types import LLMResponse
+
+# Record/replay of model traffic, for load tests and profiling without spending quota.
+# 1. RecordingBackend wraps a real backend and stores every request/response pair
+#    (text, token usage, latency, time to first chunk, stream chunking, errors) in a
+#    Cassette: gzipped JSON lines keyed like the response cache on (model, prompt, config).
+# 2. ReplayBackend serves a cassette deterministically: repeats of the same request get
+#    the recorded responses in recorded order. Latency is "real", "scaled" (divided by
+#    `speed`) or "zero". In strict mode an unrecorded request raises UnrecordedRequestError;
+#    otherwise it goes to a fallback backend.
+
+CASSETTE_VERSION = 1
+
+class UnrecordedRequestError(LookupError):
+    pass
+
+class RecordedError(Exception):
+    """A provider error captured while recording, raised again on replay (same message, e.g. a 429)."""
+    pass
+
+@dataclass(slots=True)
+class Interaction:
+    model: str
+    text: str = ""
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    latency: float = 0.0                # seconds until the full response (or the error)
+    first_chunk: Optional[float] = None # seconds to the first streamed chunk
+    chunks: Optional[List[int]] = None  # streamed chunk lengths
+    error: Optional[str] = None         # "ExceptionType: message" of a failed call
+    prompt_preview: str = ""
+
+    def response(self) -> LLMResponse:
+        return LLMResponse(text=self.text, model=self.model, prompt_tokens=self.prompt_tokens,
+                           output_tokens=self.output_tokens, total_tokens=self.total_tokens)
+
+class Cassette:
+    """Recorded interactions per request key; load() / save() a gzipped JSON-lines file."""
+    def __init__(self, path: str = None):
+        self.path = path
+        self.interactions: Dict[str, List[Interaction]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt: str, config: dict = None) -> str:
+        return ResponseCache.make_key(model, prompt, config)
+
+    def add(self, key: str, interaction: Interaction):
+        with self._lock:
+            self.interactions.setdefault(key, []).append(interaction)
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self.interactions.values())
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("cassette") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('cassette')} in {path}")
+            for line in f:
+                record = json.loads(line)
+                key = record.pop("key")
+                cassette.interactions.setdefault(key, []).append(Interaction(**record))
+        return cassette
+
+    def save(self, path: str = None):
+        """Write the whole cassette (to a temp file first, so a crash never leaves half a cassette)."""
+        path = path or self.path
+        tmp = f"{path}.tmp"
+        with self._lock, gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(json.dumps({"cassette": CASSETTE_VERSION, "created": time.time(), "interactions": len(self)}) + "\n")
+            for key, items in self.interactions.items():
+                for interaction in items:
+                    # Defaults are left out to keep the file small
+                    record = {k: v for k, v in asdict(interaction).items()
+                              if v is not None and v != "" and (v != 0 or k == "first_chunk")}
+                    record["key"] = key
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+
+def _preview(prompt: str) -> str:
+    return prompt[:120]
+
+class RecordingBackend:
+    """Passes every call through to `inner` and records it in `cassette` (call cassette.save() at the end)."""
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def _record(self, model, prompt, config, start, response: LLMResponse = None, error: Exception = None,
+                first_chunk=None, chunks=None):
+        interaction = Interaction(model=model, latency=time.perf_counter() - start, first_chunk=first_chunk,
+                                  chunks=chunks, prompt_preview=_preview(prompt))
+        if response is not None:
+            interaction.text = response.text
+            interaction.prompt_tokens = response.prompt_tokens
+            interaction.output_tokens = response.output_tokens
+            interaction.total_tokens = response.total_tokens
+        if error is not None:
+            interaction.error = f"{type(error).__name__}: {error}"
+        self.cassette.add(Cassette.key(model, prompt, config), interaction)
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        start = time.perf_counter()
+        try:
+            response = self.inner.generate(model, prompt, config)
+        except Exception as e:
+            self._record(model, prompt, config, start, error=e)
+            raise
+        self._record(model, prompt, config, start, response)
+        return response
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        start = time.perf_counter()
+        try:
+            response = await self.inner.generate_async(model, prompt, config)
+        except asyncio.CancelledError:
+            raise       # abandoned (deadline, losing hedge): nothing to replay
+        except Exception as e:
+            self._record(model, prompt, config, start, error=e)
+            raise
+        self._record(model, prompt, config, start, response)
+        return response
+
+    def _streamed(self, model, prompt, config, start, chunks, first_chunk):
+        text = "".join(chunks)
+        # Streams report no usage; estimate it like the stub backend does
+        response = LLMResponse(text=text, model=model, prompt_tokens=len(prompt) // 4 + 1,
+                               output_tokens=len(text) // 4 + 1,
+                               total_tokens=len(prompt) // 4 + len(text) // 4 + 2)
+        self._record(model, prompt, config, start, response, first_chunk=first_chunk,
+                     chunks=[len(chunk) for chunk in chunks])
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        start = time.perf_counter()
+        chunks, first_chunk = [], None
+        try:
+            for chunk in self.inner.stream(model, prompt, config):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # A stream the caller closed early (constraint abort) is recorded up to that point
+            self._streamed(model, prompt, config, start, chunks, first_chunk)
+
+    async def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        chunks, first_chunk = [], None
+        try:
+            async for chunk in self.inner.stream_async(model, prompt, config):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            self._streamed(model, prompt, config, start, chunks, first_chunk)
+
+class ReplayBackend:
+    """Serves a Cassette; `latency` is "real", "scaled" (recorded / `speed`) or "zero"."""
+    def __init__(self, cassette: Cassette, latency: str = CASSETTE_LATENCY, speed: float = CASSETTE_SPEED,
+                 strict: bool = CASSETTE_STRICT, fallback=None):
+        if latency not in ("real", "scaled", "zero"):
+            raise ValueError(f"Unknown replay latency mode '{latency}'")
+        self.cassette = cassette
+        self.latency = latency
+        self.speed = speed
+        self.strict = strict
+        self.fallback = fallback
+        self.stats = {"hits": 0, "misses": 0, "recorded_seconds": 0.0, "replayed_seconds": 0.0}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _delay(self, seconds: float) -> float:
+        if self.latency == "zero" or not seconds:
+            return 0.0
+        return seconds if self.latency == "real" else seconds / self.speed
+
+    def _next(self, model: str, prompt: str, config: dict) -> Optional[Interaction]:
+        key = Cassette.key(model, prompt, config)
+        with self._lock:
+            items = self.cassette.interactions.get(key)
+            if not items:
+                self.stats["misses"] += 1
+                if self.strict or self.fallback is None:
+                    raise UnrecordedRequestError(f"No recorded response for {model} prompt {_preview(prompt)!r}")
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            interaction = items[cursor % len(items)]     # repeats cycle through the recorded responses
+            self.stats["hits"] += 1
+            self.stats["recorded_seconds"] += interaction.latency
+            self.stats["replayed_seconds"] += self._delay(interaction.latency)
+        return interaction
+
+    def _result(self, interaction: Interaction) -> LLMResponse:
+        if interaction.error is not None:
+            raise RecordedError(interaction.error)
+        return interaction.response()
+
+    def _chunks(self, interaction: Interaction) -> List[str]:
+        text, lengths = interaction.text, interaction.chunks or [16] * (len(interaction.text) // 16 + 1)
+        chunks, offset = [], 0
+        for length in lengths:
+            chunks.append(text[offset:offset + length])
+            offset += length
+        if offset < len(text):
+            chunks.append(text[offset:])
+        return [chunk for chunk in chunks if chunk]
+
+    def _chunk_delays(self, interaction: Interaction, count: int) -> List[float]:
+        """Recorded time to first chunk, then the rest of the latency spread over the remaining chunks."""
+        first = interaction.first_chunk if interaction.first_chunk is not None else interaction.latency
+        rest = max(0.0, interaction.latency - first) / max(1, count - 1)
+        return [self._delay(first)] + [self._delay(rest)] * (count - 1)
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        interaction = self._next(model, prompt, config)
+        if interaction is None:
+            return self.fallback.generate(model, prompt, config)
+        time.sleep(self._delay(interaction.latency))
+        return self._result(interaction)
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        interaction = self._next(model, prompt, config)
+        if interaction is None:
+            return await self.fallback.generate_async(model, prompt, config)
+        await asyncio.sleep(self._delay(interaction.latency))
+        return self._result(interaction)
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        interaction = self._next(model, prompt, config)
+        if interaction is None:
+            yield from self.fallback.stream(model, prompt, config)
+            return
+        if interaction.error is not None:
+            time.sleep(self._delay(interaction.latency))
+            raise RecordedError(interaction.error)
+        chunks = self._chunks(interaction)
+        for chunk, delay in zip(chunks, self._chunk_delays(interaction, len(chunks))):
+            time.sleep(delay)
+            yield chunk
+
+    async def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        interaction = self._next(model, prompt, config)
+        if interaction is None:
+            async for chunk in self.fallback.stream_async(model, prompt, config):
+                yield chunk
+            return
+        if interaction.error is not None:
+            await asyncio.sleep(self._delay(interaction.latency))
+            raise RecordedError(interaction.error)
+        chunks = self._chunks(interaction)
+        for chunk, delay in zip(chunks, self._chunk_delays(interaction, len(chunks))):
+            await asyncio.sleep(delay)
+            yield chunk
+
+    def speedup(self) -> float:
+        """Recorded model time / replayed model time (inf at zero latency)."""
+        if not self.stats["replayed_seconds"]:
+            return float("inf") if self.stats["recorded_seconds"] else 1.0
+        return self.stats["recorded_seconds"] / self.stats["replayed_seconds"]
+
+def replay_scheduler(latency: str, speed: float) -> RateLimitScheduler:
+    """Quotas matching a replay: scaled by `speed` (unlimited at zero latency) so pacing does not hide the speedup."""
+    scheduler = RateLimitScheduler()
+    factor = 1.0 if latency == "real" else (10**9 if latency == "zero" else speed)
+    for model, quota in scheduler.quotas.items():
+        scheduler.quotas[model] = {"rpm": quota["rpm"] * factor, "tpm": quota["tpm"] * factor}
+    scheduler.default_quota = {"rpm": scheduler.default_quota["rpm"] * factor,
+                               "tpm": scheduler.default_quota["tpm"] * factor}
+    return scheduler
+
+def cassette_backend_from_config():
+    """Backend for MODEL_BACKEND=cassette: record through CASSETTE_RECORD_BACKEND or replay CASSETTE_PATH."""
+    if CASSETTE_MODE == "record":
+        from backends.registry import create_backend
+        cassette = Cassette(CASSETTE_PATH)
+        atexit.register(cassette.save)
+        return RecordingBackend(create_backend(CASSETTE_RECORD_BACKEND), cassette)
+    return ReplayBackend(Cassette.load(CASSETTE_PATH))
@@ -0,0 +1,61 @@
+import threading
+from typing import AsyncIterator, Iterator
+from config import GOOGLE_API_KEY
+from utils.types import LLMResponse
+
+def _to_llm_response(response, model: str) -> LLMResponse:
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    total_tokens = getattr(usage, "total_token_count", None) or (prompt_tokens + output_tokens)
+    return LLMResponse(
+        text=response.text or "",
+        model=model,
+        prompt_tokens=prompt_tokens,
+        output_tokens=output_tokens,
+        total_tokens=total_tokens,
+    )
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Build the shared genai.Client on first use (the SDK import is the slow part of startup)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not GOOGLE_API_KEY:
+                    raise ValueError("GOOGLE_API_KEY not found. Please set it in your .env file.")
+                from google import genai
+                _client = genai.Client(api_key=GOOGLE_API_KEY)
+    return _client
+
+class GeminiBackend:
+    """Google Gemini through the google-genai SDK."""
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        response = get_client().models.generate_content(model=model, contents=prompt, config=config)
+        return _to_llm_response(response, model)
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        response = await get_client().aio.models.generate_content(model=model, contents=prompt, config=config)
+        return _to_llm_response(response, model)
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        stream = get_client().models.generate_content_stream(model=model, contents=prompt, config=config)
+        try:
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            stream.close()
+
+    async def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        stream = await get_client().aio.models.generate_content_stream(model=model, contents=prompt, config=config)
+        try:
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            await stream.aclose()
@@ -0,0 +1,51 @@
+import threading
+from typing import Callable, Dict, Union
+from config import MODEL_BACKEND
+from backends.base import ModelBackend
+
+_factories: Dict[str, Callable[[], ModelBackend]] = {}
+_backend = None
+_backend_lock = threading.Lock()
+
+def register_backend(name: str, factory: Callable[[], ModelBackend]):
+    """Make a backend selectable by name (config.MODEL_BACKEND / the MODEL_BACKEND env var)."""
+    _factories[name] = factory
+
+def available_backends() -> list:
+    return sorted(_factories)
+
+def create_backend(name: str) -> ModelBackend:
+    if name not in _factories:
+        raise ValueError(f"Unknown model backend '{name}'. Available: {', '.join(available_backends())}")
+    return _factories[name]()
+
+def get_backend() -> ModelBackend:
+    """Return the process-wide backend, building the configured one on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(MODEL_BACKEND)
+    return _backend
+
+def set_backend(backend: Union[str, ModelBackend]):
+    """Swap the process-wide backend, by registered name or instance."""
+    global _backend
+    _backend = create_backend(backend) if isinstance(backend, str) else backend
+
+# Built-in backends. Factories import lazily so selecting "stub" never loads the Gemini SDK.
+def _gemini_factory() -> ModelBackend:
+    from backends.gemini import GeminiBackend
+    return GeminiBackend()
+
+def _stub_factory() -> ModelBackend:
+    from backends.stub import StubBackend
+    return StubBackend()
+
+def _cassette_factory() -> ModelBackend:
+    from backends.cassette import cassette_backend_from_config
+    return cassette_backend_from_config()
+
+register_backend("gemini", _gemini_factory)
+register_backend("stub", _stub_factory)
+register_backend("cassette", _cassette_factory)
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import re
+from typing import AsyncIterator, Callable, Iterator
+from utils.types import LLMResponse
+
+_BATCH_ITEM_ID = re.compile(r"^### Item (\S+)$", re.MULTILINE)
+
+def default_stub_responder(prompt: str) -> str:
+    """Validator prompts get a perfect verdict; everything else gets a stable fake answer."""
+    if "QA Validator" in prompt:
+        verdict = {"score": 0.0, "error_type": "none", "reasoning": "Stub backend accepts every output."}
+        item_ids = _BATCH_ITEM_ID.findall(prompt)
+        if item_ids:
+            return json.dumps([dict(verdict, id=item_id) for item_id in item_ids])
+        return json.dumps(verdict)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"Stub answer {digest}"
+
+class StubBackend:
+    """
+    Deterministic offline backend: the same prompt always gets the same answer and no
+    network, SDK or API key is needed. Pass `responder` to script the replies.
+    """
+
+    def __init__(self, responder: Callable[[str], str] = default_stub_responder, chunk_size: int = 16):
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        self.calls += 1
+        text = self.responder(prompt)
+        prompt_tokens = len(prompt) // 4 + 1
+        output_tokens = len(text) // 4 + 1
+        return LLMResponse(
+            text=text,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            output_tokens=output_tokens,
+            total_tokens=prompt_tokens + output_tokens,
+        )
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        return self.generate(model, prompt, config)
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        text = self.generate(model, prompt, config).text
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i:i + self.chunk_size]
+
+    async def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        for chunk in self.stream(model, prompt, config):
+            yield chunk
@@ -0,0 +1,142 @@
+"""
+Batch Judge Test - Several (task, output) pairs judged by one validator request
+
+This test shows how the agentic AI system now:
+1. Parses the judge's reply array and maps verdicts back to items by id, in any order
+2. Falls back to single-item validation for items whose id is missing or duplicated
+3. Runs each pair's local validators first, and tolerates pairs without a chain
+4. Gives the verdicts single-item validation would: prechecks and the cascade's cheap tier run per item
+"""
+
+import asyncio
+import json
+import re
+from agents.local_validators import build_local_validators
+from agents.validation_cascade import JudgeCascade
+from agents.validator import ValidatorAgent
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+ITEM_ID = re.compile(r"^### Item (\S+)$", re.MULTILINE)
+
+
+def _batch_responder(drop=(), duplicate=()):
+    """Judge replies: a reversed verdict array for batches (minus `drop`, twice for `duplicate`), else one verdict."""
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        ids = ITEM_ID.findall(prompt)
+        if not ids:
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "single"})
+        entries = []
+        for item_id in reversed(ids):
+            if item_id in drop:
+                continue
+            entries.append({"id": item_id, "score": 0.9, "error_type": "semantic", "reasoning": f"batch {item_id}"})
+            if item_id in duplicate:
+                entries.append({"id": item_id, "score": 0.0, "error_type": "none", "reasoning": "contradiction"})
+        return "Here you go:\n" + json.dumps(entries) + "\nDone."
+    return responder, prompts
+
+
+def _setup(responder):
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    return previous_scheduler
+
+
+def test_parse_reply_array():
+    """Test that the reply array is extracted and matched to items by id."""
+    print("=" * 70)
+    print("TEST 1: Reply Array Parsing")
+    print("=" * 70)
+
+    validator = ValidatorAgent()
+    text = ('Sure: [{"id": "1", "score": 0.2, "error_type": "constraint", "reasoning": "Too long."}, '
+            '{"id": 0, "score": "0.0", "error_type": "none", "reasoning": "Fine."}, '
+            '{"score": 0.5}, "junk"]')
+    verdicts = validator._parse_batch_response(text)
+    print(f"Verdicts: { {k: (v.score, v.error_type.value, v.validated_by) for k, v in verdicts.items()} }")
+    assert set(verdicts) == {"0", "1"}
+    assert verdicts["0"].is_valid and verdicts["0"].validated_by == "llm_batch"
+    assert not verdicts["1"].is_valid and verdicts["1"].feedback == "Too long."
+    assert validator._parse_batch_response("no array here") == {}
+    print("✅ PASSED: Verdicts are matched by id!\n")
+
+
+def test_missing_and_duplicated_ids_fall_back():
+    """Test that only items without a usable batch verdict are judged again on their own."""
+    print("=" * 70)
+    print("TEST 2: Per-Item Fallback")
+    print("=" * 70)
+
+    responder, prompts = _batch_responder(drop={"1"}, duplicate={"2"})
+    previous_scheduler = _setup(responder)
+    pairs = [(f"Task {i}", f"Output {i}") for i in range(4)]
+    verdicts = asyncio.run(ValidatorAgent().judge_batch_async(pairs))
+    print(f"Feedback: {[v.feedback for v in verdicts]}, {len(prompts)} requests")
+    assert [v.feedback for v in verdicts] == ["batch 0", "single", "single", "batch 3"]
+    assert len(prompts) == 3, "One batch request plus one fallback per missing or duplicated id"
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: A bad entry costs only its own re-judge!\n")
+
+
+def test_local_validators_per_pair():
+    """Test that per-pair chains run first, record the LLM verdict, and may be None."""
+    print("=" * 70)
+    print("TEST 3: Local Validators Per Pair")
+    print("=" * 70)
+
+    responder, prompts = _batch_responder()
+    previous_scheduler = _setup(responder)
+    chain = build_local_validators({"max_chars": 20})
+    pairs = [("Task A", "x" * 50), ("Task B", "Output B"), ("Task C", "Output C")]
+    verdicts = asyncio.run(ValidatorAgent().validate_batch_async(pairs, local_validators=[chain, chain, None]))
+    print(f"Tiers: {[v.validated_by for v in verdicts]}, chain stats: {chain.stats}")
+    assert [v.validated_by for v in verdicts] == ["length", "llm_batch", "llm_batch"]
+    assert len(prompts) == 1 and ITEM_ID.findall(prompts[0]) == ["0", "1"]
+    assert chain.stats["llm"] == {"checked": 1, "rejected": 1, "accepted": 0}
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Only undecided pairs reach the batch judge!\n")
+
+
+
+def test_prechecks_and_cascade_per_item():
+    """Test that tagged outputs and confident cheap verdicts never reach the batch request."""
+    print("=" * 70)
+    print("TEST 4: Prechecks + Cascade Before Batching")
+    print("=" * 70)
+
+    batch_responder, prompts = _batch_responder()
+
+    def responder(prompt):
+        if "Score how badly" in prompt:
+            # Cheap tier: confident on "Output 0", uncertain (inside the band) on the rest
+            return json.dumps({"score": 0.0 if "Output 0" in prompt else 0.25, "error_type": "none", "reasoning": "fast"})
+        return batch_responder(prompt)
+
+    previous_scheduler = _setup(responder)
+    cascade = JudgeCascade(model="fast-judge", band=0.15, audit_rate=0.0)
+    pairs = [("Task 0", "Output 0"), ("Task 1", "Output 1"), ("Task 2", "Output 2"),
+             ("Task 3", "[EXECUTION_ERROR] boom")]
+    verdicts = asyncio.run(ValidatorAgent(cascade=cascade).judge_batch_async(pairs))
+    print(f"Tiers: {[v.validated_by for v in verdicts]}, cascade: {cascade.escalated}")
+    assert [v.validated_by for v in verdicts] == ["llm_fast", "llm_batch", "llm_batch", "precheck"]
+    assert len(prompts) == 1 and ITEM_ID.findall(prompts[0]) == ["0", "1"], "Only the escalated items are batched"
+    assert cascade.fast_decided == 1 and cascade.escalated["uncertain"] == 2
+    assert cascade.agreement["uncertain"]["compared"] == 2, "Batched strong verdicts are compared with the fast ones"
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Batched and single-item verdicts agree!\n")
+
+
+if __name__ == "__main__":
+    test_parse_reply_array()
+    test_missing_and_duplicated_ids_fall_back()
+    test_local_validators_per_pair()
+    test_prechecks_and_cascade_per_item()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
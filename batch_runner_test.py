@@ -0,0 +1,134 @@
+"""
+Batch Runner Test - Many correction loops under one concurrency limit
+
+This test shows how the agentic AI system now:
+1. Keeps at most `concurrency` workflows in flight and consumes the task list lazily
+2. Yields results in completion order, each with its own task id and MetricsLogger
+3. Reports a task whose workflow raises as failed while the rest of the batch runs to the end
+"""
+
+import asyncio
+import json
+import re
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_batch
+from metrics.log_store import set_log_store
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+DELAY = re.compile(r"wait (\d+)ms")
+
+
+class TimedStub(StubBackend):
+    """Executor calls take the "wait <n>ms" of their task; tracks how many run at once."""
+    def __init__(self):
+        super().__init__(responder=self._respond)
+        self.running = 0
+        self.max_running = 0
+
+    @staticmethod
+    def _respond(prompt):
+        if "QA Validator" in prompt:
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Fine."})
+        return "Done: " + prompt.rsplit("Task: ", 1)[1].split("\n", 1)[0]
+
+    async def generate_async(self, model, prompt, config=None):
+        if "QA Validator" in prompt:
+            return self.generate(model, prompt, config)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(int(DELAY.search(prompt).group(1)) / 1000)
+            return self.generate(model, prompt, config)
+        finally:
+            self.running -= 1
+
+
+def _collect(tasks, concurrency):
+    backend = TimedStub()
+    set_backend(backend)
+
+    async def run():
+        return [item async for item in run_batch(tasks, concurrency=concurrency, validator_batch_size=1)]
+    return asyncio.run(run()), backend
+
+
+def _setup():
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    return previous_scheduler
+
+
+def test_concurrency_limit():
+    """Test that no more than `concurrency` workflows run at once and every task finishes."""
+    print("=" * 70)
+    print("TEST 1: Concurrency Limit")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+    pulled = []
+
+    def tasks():
+        for i in range(6):
+            pulled.append(i)
+            yield f"Task {i}: wait 30ms"
+
+    results, backend = _collect(tasks(), concurrency=2)
+    print(f"Finished {sorted(task_id for task_id, _, _ in results)}, at most {backend.max_running} in flight")
+    assert sorted(task_id for task_id, _, _ in results) == list(range(6)) and pulled == list(range(6))
+    assert backend.max_running == 2
+    for task_id, state, logger in results:
+        assert state.current_result == f"Done: Task {task_id}: wait 30ms" and logger.task_id == task_id
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: The batch stays within its concurrency limit!\n")
+
+
+def test_completion_order():
+    """Test that a fast task is yielded before a slow one that started earlier."""
+    print("=" * 70)
+    print("TEST 2: Completion Order")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+    results, _ = _collect(["Slow: wait 200ms", "Fast: wait 10ms", "Medium: wait 80ms"], concurrency=3)
+    order = [task_id for task_id, _, _ in results]
+    print(f"Yield order: {order}")
+    assert order == [1, 2, 0]
+    assert [state.current_result for _, state, _ in results] == [
+        "Done: Fast: wait 10ms", "Done: Medium: wait 80ms", "Done: Slow: wait 200ms"]
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Results stream back as they finish!\n")
+
+
+def test_failing_task_does_not_abort_batch():
+    """Test that a task whose workflow raises is yielded as failed and its siblings still finish."""
+    print("=" * 70)
+    print("TEST 3: Failing Task")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+    tasks = ["Task 0: wait 50ms", {"task": "Task 1: wait 10ms", "constraints": {"max_chars": "many"}},
+             "Task 2: wait 50ms"]
+    results, _ = _collect(tasks, concurrency=3)
+    by_id = {task_id: (state, logger) for task_id, state, logger in results}
+    failed_state, failed_logger = by_id[1]
+    print(f"Failed task: {failed_state.current_result!r}, summary error {failed_logger.summary['error']}")
+    assert sorted(by_id) == [0, 1, 2]
+    assert failed_state.current_result.startswith("[EXECUTION_ERROR] ValueError")
+    assert failed_state.attempt_count == 0 and failed_logger.summary["error"]["type"] == "ValueError"
+    for task_id in (0, 2):
+        state, logger = by_id[task_id]
+        assert state.validation_log[-1].is_valid and "error" not in logger.summary
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: One broken task no longer aborts the batch!\n")
+
+
+if __name__ == "__main__":
+    test_concurrency_limit()
+    test_completion_order()
+    test_failing_task_does_not_abort_batch()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
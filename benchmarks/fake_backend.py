@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Iterator, List, Optional
+from utils.types import LLMResponse
+
+_TASK_PATTERN = re.compile(r"Task(?: description)?:\s*(.*?)(?:\n\n|\Z)", re.DOTALL)
+_BATCH_ITEM_PATTERN = re.compile(r"### Item (\S+)\nTask description:\n(.*?)\n\nAgent's output:", re.DOTALL)
+
+class LatencyModel:
+    """
+    Simulated network latency in seconds.
+    kind: "constant" (median), "uniform" (median ± spread), "lognormal" (median, sigma = spread).
+    tail_prob / tail_seconds add occasional slow outliers on top.
+    """
+
+    def __init__(self, kind: str = "lognormal", median: float = 0.02, spread: float = 0.5,
+                 tail_prob: float = 0.0, tail_seconds: float = 1.0):
+        self.kind = kind
+        self.median = median
+        self.spread = spread
+        self.tail_prob = tail_prob
+        self.tail_seconds = tail_seconds
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            delay = self.median
+        elif self.kind == "uniform":
+            delay = rng.uniform(max(0.0, self.median - self.spread), self.median + self.spread)
+        else:
+            delay = rng.lognormvariate(0.0, self.spread) * self.median
+        if self.tail_prob and rng.random() < self.tail_prob:
+            delay += self.tail_seconds
+        return delay
+
+class FakeBackend:
+    """
+    Offline ModelBackend for load tests. Executor prompts get a fresh answer per attempt;
+    validator prompts are scored from `score_script` (the n-th validation of a task gets
+    the n-th score, the last score repeats). `rate_limit_rate` of calls raise a 429 whose
+    message carries a `retry_after` hint, like the real API.
+    """
+
+    def __init__(self, latency: LatencyModel = None, validator_latency: LatencyModel = None,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.05,
+                 score_script: List[float] = None, seed: int = 0):
+        self.latency = latency or LatencyModel()
+        self.validator_latency = validator_latency or self.latency
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.score_script = score_script or [0.8, 0.4, 0.1]
+        self.calls = 0
+        self.executor_calls = 0
+        self.validator_calls = 0
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._validations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _task_key(prompt: str) -> str:
+        match = _TASK_PATTERN.search(prompt)
+        text = match.group(1).strip() if match else prompt
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+    def _scripted_verdict(self, key: str) -> dict:
+        n = self._validations.get(key, 0)
+        self._validations[key] = n + 1
+        score = self.score_script[min(n, len(self.score_script) - 1)]
+        return {
+            "score": score,
+            "error_type": "none" if score < 0.2 else "semantic",
+            "reasoning": f"Scripted verdict #{n + 1}.",
+        }
+
+    def _plan_call(self, prompt: str):
+        """Decide (delay, text or None for a 429) for one call under the lock."""
+        with self._lock:
+            self.calls += 1
+            is_validation = "QA Validator" in prompt
+            model = self.validator_latency if is_validation else self.latency
+            delay = model.sample(self._rng)
+
+            if self.rate_limit_rate and self._rng.random() < self.rate_limit_rate:
+                self.rate_limited += 1
+                return delay, None
+
+            key = self._task_key(prompt)
+            if is_validation and "### Item" in prompt:
+                self.validator_calls += 1
+                verdicts = []
+                for item_id, task in _BATCH_ITEM_PATTERN.findall(prompt):
+                    task_key = hashlib.sha1(task.strip().encode("utf-8")).hexdigest()[:10]
+                    verdicts.append(dict(self._scripted_verdict(task_key), id=item_id))
+                text = json.dumps(verdicts)
+            elif is_validation:
+                self.validator_calls += 1
+                text = json.dumps(self._scripted_verdict(key))
+            else:
+                self.executor_calls += 1
+                text = f"Answer for {key} (call {self.executor_calls})"
+            return delay, text
+
+    def _response(self, model: str, prompt: str, text: Optional[str]) -> LLMResponse:
+        if text is None:
+            raise RuntimeError(f"429 RESOURCE_EXHAUSTED. Please retry in {self.retry_after} seconds.")
+        prompt_tokens = len(prompt) // 4 + 1
+        output_tokens = len(text) // 4 + 1
+        return LLMResponse(text=text, model=model, prompt_tokens=prompt_tokens,
+                           output_tokens=output_tokens, total_tokens=prompt_tokens + output_tokens)
+
+    def generate(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        delay, text = self._plan_call(prompt)
+        time.sleep(delay)
+        return self._response(model, prompt, text)
+
+    async def generate_async(self, model: str, prompt: str, config: dict = None) -> LLMResponse:
+        delay, text = self._plan_call(prompt)
+        await asyncio.sleep(delay)
+        return self._response(model, prompt, text)
+
+    def stream(self, model: str, prompt: str, config: dict = None) -> Iterator[str]:
+        text = self.generate(model, prompt, config).text
+        for i in range(0, len(text), 16):
+            yield text[i:i + 16]
+
+    async def stream_async(self, model: str, prompt: str, config: dict = None) -> AsyncIterator[str]:
+        # Latency is spread evenly over the chunks so an early abort saves simulated time
+        delay, text = self._plan_call(prompt)
+        text = self._response(model, prompt, text).text
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        for chunk in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            yield chunk
@@ -0,0 +1,139 @@
+"""
+Memory benchmark for AgentState / ValidationResult.
+
+Builds many finished workflow states the way a batch run holds them (several verdicts per
+state; judge feedback drawn from a pool of recurring messages, but parsed into fresh
+string objects) and reports bytes per state for:
+  legacy   - the previous plain dataclasses (per-instance __dict__, no interning)
+  compact  - slotted dataclasses with interned tier names
+  ring-N   - compact plus a bounded validation/history ring buffer (AgentState.create)
+It also times the binary codec (utils.state_codec) against pickle and the JSON checkpoint format.
+
+    python -m benchmarks.memory_benchmark --states 100000 --attempts 5 --ring 2 --output memory_results.json
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Optional
+from utils.checkpoint import encode_checkpoint
+from utils.state_codec import dumps_states, loads_states
+from utils.types import AgentState, ErrorType, ValidationResult
+
+@dataclass
+class LegacyValidationResult:
+    is_valid: bool
+    score: float
+    error_type: ErrorType
+    feedback: str
+    retry_delay_seconds: float = 0.0
+    validated_by: str = "llm"
+
+@dataclass
+class LegacyAgentState:
+    task: str
+    history: List[dict] = field(default_factory=list)
+    attempt_count: int = 0
+    current_result: Optional[str] = None
+    validation_log: List[LegacyValidationResult] = field(default_factory=list)
+
+FEEDBACK = [
+    "The answer contains a factual error about the date; verify the timeline and correct it.",
+    "Output exceeds the requested length. Keep it under 100 words.",
+    "The calculation in step 2 is wrong; recompute the total.",
+    "Response is not valid JSON. Return only a JSON object.",
+    "The answer cites a source that is not in the task. Remove invented references.",
+    "Looks correct.",
+]
+ERRORS = [ErrorType.SEMANTIC, ErrorType.CONSTRAINT, ErrorType.SEMANTIC, ErrorType.TOOL, ErrorType.HALLUCINATION,
+          ErrorType.NONE]
+
+def _fresh(text: str) -> str:
+    # A new string object with the same contents, like one parsed out of a judge response
+    return (text + " ")[:-1]
+
+def build_states(n: int, attempts: int, validation_cls, state_factory) -> list:
+    states = []
+    for i in range(n):
+        state = state_factory(f"Task #{i}: summarise the quarterly report for region {i % 97}")
+        for attempt in range(1, attempts + 1):
+            last = attempt == attempts
+            k = 5 if last else (i + attempt) % 5
+            state.validation_log.append(validation_cls(last, 0.05 if last else 0.6, ERRORS[k], _fresh(FEEDBACK[k]),
+                                                       0.0, _fresh("llm")))
+            state.history.append({"attempt": attempt, "strategy": "retry_reasoning" if attempt > 1 else None,
+                                  "temperature": None, "duplicate": False})
+        state.attempt_count = attempts
+        state.current_result = f"Region {i % 97} revenue grew {i % 13}% quarter over quarter. " * 3
+        states.append(state)
+    return states
+
+def measure(label: str, n: int, attempts: int, validation_cls, state_factory) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    states = build_states(n, attempts, validation_cls, state_factory)
+    build_seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    row = {"representation": label, "states": n, "bytes_per_state": current / n, "total_mb": current / 2**20,
+           "build_seconds": build_seconds}
+    print(f"{label:>10} | {row['bytes_per_state']:8.0f} B/state | {row['total_mb']:8.1f} MB total | "
+          f"built in {build_seconds:.2f}s")
+    del states
+    return row
+
+def measure_codecs(n: int, attempts: int) -> list:
+    states = build_states(n, attempts, ValidationResult, lambda task: AgentState(task=task))
+    rows = []
+    codecs = [
+        ("marshal (state_codec)", lambda: dumps_states(states), loads_states),
+        ("pickle", lambda: pickle.dumps(states, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("json+zlib (checkpoint)", lambda: [encode_checkpoint(s) for s in states], None),
+    ]
+    for label, dump, load in codecs:
+        start = time.perf_counter()
+        data = dump()
+        dump_seconds = time.perf_counter() - start
+        size = sum(len(d) for d in data) if isinstance(data, list) else len(data)
+        load_seconds = None
+        if load is not None:
+            start = time.perf_counter()
+            restored = load(data)
+            load_seconds = time.perf_counter() - start
+            assert restored[-1].validation_log[-1] == states[-1].validation_log[-1]
+        rows.append({"codec": label, "bytes_per_state": size / n, "dump_us_per_state": 1e6 * dump_seconds / n,
+                     "load_us_per_state": 1e6 * load_seconds / n if load_seconds is not None else None})
+        print(f"{label:>24} | {size / n:7.0f} B/state | dump {1e6 * dump_seconds / n:6.1f} us | "
+              + (f"load {1e6 * load_seconds / n:6.1f} us" if load_seconds is not None else "load n/a"))
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Memory per AgentState and state codec throughput")
+    parser.add_argument("--states", type=int, default=100_000)
+    parser.add_argument("--attempts", type=int, default=5, help="verdicts per state")
+    parser.add_argument("--ring", type=int, default=2, help="ring buffer size for the bounded variant")
+    parser.add_argument("--output", default="memory_results.json")
+    args = parser.parse_args(argv)
+
+    print(f"🧠 {args.states} states x {args.attempts} verdicts\n")
+    memory = [
+        measure("legacy", args.states, args.attempts, LegacyValidationResult, lambda task: LegacyAgentState(task=task)),
+        measure("compact", args.states, args.attempts, ValidationResult, lambda task: AgentState(task=task)),
+        measure(f"ring-{args.ring}", args.states, args.attempts, ValidationResult,
+                lambda task: AgentState.create(task, log_limit=args.ring)),
+    ]
+    print()
+    codecs = measure_codecs(min(args.states, 20_000), args.attempts)
+
+    with open(args.output, "w") as f:
+        json.dump({"config": vars(args), "memory": memory, "codecs": codecs}, f, indent=4)
+    print(f"\n📄 Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
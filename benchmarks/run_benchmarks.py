@@ -0,0 +1,174 @@
+"""
+Offline benchmark suite for the self-correction loop.
+
+Drives run_agentic_workflow_async against FakeBackend (simulated latency, injected 429s,
+scripted validator scores) at several concurrency levels and reports end-to-end latency
+percentiles, model calls per task, attempts-to-accept histograms and throughput.
+
+    python -m benchmarks.run_benchmarks --tasks 100 --concurrency 1,8,32 --output bench_results.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json      # exit 1 on regression
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections import Counter
+from backends.registry import set_backend
+from benchmarks.fake_backend import FakeBackend, LatencyModel
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.helpers import percentile
+from utils.rate_limiter import RateLimitScheduler, set_scheduler
+
+# Metric -> True if higher is better. Only these are compared against the baseline.
+REGRESSION_METRICS = {
+    "tasks_per_sec": True,
+    "latency_p95": False,
+    "calls_per_task": False,
+    "calls_per_accepted": False,
+}
+
+async def _run_level(tasks, concurrency: int, backend: FakeBackend) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    attempts = Counter()
+    accepted = 0
+
+    async def _one(task_id: int, task: str):
+        nonlocal accepted
+        async with semaphore:
+            start = time.perf_counter()
+            state = await run_agentic_workflow_async(task, logger=MetricsLogger(task_id=task_id), verbose=False)
+            latencies.append(time.perf_counter() - start)
+            attempts[state.attempt_count] += 1
+            if state.validation_log and state.validation_log[-1].is_valid:
+                accepted += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(i, t) for i, t in enumerate(tasks)))
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "tasks": len(tasks),
+        "accepted": accepted,
+        "wall_seconds": wall,
+        "tasks_per_sec": len(tasks) / wall if wall > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "calls_per_task": backend.calls / len(tasks),
+        "calls_per_accepted": backend.calls / accepted if accepted else None,
+        "executor_calls": backend.executor_calls,
+        "validator_calls": backend.validator_calls,
+        "rate_limited_calls": backend.rate_limited,
+        "attempts_histogram": {str(k): attempts[k] for k in sorted(attempts)},
+    }
+
+def run_suite(num_tasks: int, levels, latency_ms: float, rate_limit_rate: float,
+              score_script, seed: int) -> dict:
+    # Benchmark the loop itself: no cache hits, no log files, no quota pacing beyond injected 429s
+    set_response_cache(None)
+    set_log_store(None)
+    tasks = [f"Benchmark task #{i}: summarise item {i}" for i in range(num_tasks)]
+    results = []
+
+    for concurrency in levels:
+        set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+        backend = FakeBackend(
+            latency=LatencyModel("lognormal", median=latency_ms / 1000.0, spread=0.5),
+            rate_limit_rate=rate_limit_rate,
+            score_script=score_script,
+            seed=seed,
+        )
+        set_backend(backend)
+        level = asyncio.run(_run_level(tasks, concurrency, backend))
+        results.append(level)
+        print(f"concurrency={concurrency:>3} | {level['tasks_per_sec']:8.1f} tasks/s | "
+              f"p50 {level['latency_p50'] * 1000:7.1f}ms p95 {level['latency_p95'] * 1000:7.1f}ms "
+              f"p99 {level['latency_p99'] * 1000:7.1f}ms | {level['calls_per_task']:.2f} calls/task | "
+              f"attempts {level['attempts_histogram']}")
+
+    return {
+        "config": {
+            "tasks": num_tasks,
+            "latency_ms": latency_ms,
+            "rate_limit_rate": rate_limit_rate,
+            "score_script": score_script,
+            "seed": seed,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "levels": results,
+    }
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return human-readable regressions (relative change worse than `tolerance`)."""
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            new, old = level.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(
+                    f"concurrency={level['concurrency']} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})"
+                )
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the self-correction loop")
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="median simulated call latency")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="fraction of calls that get a 429")
+    parser.add_argument("--scores", default="0.8,0.4,0.1", help="scripted validator scores per attempt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="compare against this stored report")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also store this report as the new baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(
+        num_tasks=args.tasks,
+        levels=[int(c) for c in args.concurrency.split(",")],
+        latency_ms=args.latency_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        score_script=[float(s) for s in args.scores.split(",")],
+        seed=args.seed,
+    )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"📌 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Call Accounting Test - Every model request is counted once, with its tokens
+
+This test shows how the agentic AI system now:
+1. Records cache hits without counting them as requests or tokens
+2. Counts each 429 as a request that used no tokens, then the retry that answered
+3. Records circuit-breaker rejections without counting a request
+4. Counts a hedged call as two requests with one answer's tokens
+5. Records an aborted stream as one request with the tokens streamed so far
+"""
+
+import asyncio
+import contextvars
+from contextlib import contextmanager
+import backends.registry as backend_registry
+import utils.cache as response_cache
+from backends.registry import set_backend
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger, summarize_calls
+from utils.cache import ResponseCache, set_response_cache
+from utils.llm import generate, generate_async, set_call_recorder, stream_async, track_calls
+from utils.rate_limiter import RateLimitScheduler, estimate_tokens, get_scheduler, set_scheduler
+from utils.resilience import CircuitBreaker, CircuitOpenError, ResilienceManager, get_resilience, set_resilience
+from utils.types import LLMResponse
+
+set_log_store(None)
+
+
+@contextmanager
+def _restored_globals():
+    """Put the process-wide backend, response cache, resilience manager and scheduler back afterwards."""
+    # Read the module globals directly: the getters would build a backend or cache that was never used
+    saved = (backend_registry._backend, response_cache._cache, response_cache._cache_enabled,
+             get_resilience(), get_scheduler())
+    try:
+        set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}, jitter=0.0))
+        yield
+    finally:
+        backend_registry._backend, response_cache._cache, response_cache._cache_enabled = saved[:3]
+        set_resilience(saved[3])
+        set_scheduler(saved[4])
+
+
+def _answer(model):
+    return LLMResponse(text="answer", model=model, prompt_tokens=10, output_tokens=5, total_tokens=15)
+
+
+class ScriptedBackend:
+    """Replies by prompt: "busy" is rejected once with a short retry hint, "down" always fails, "slow" hangs its first request."""
+    def __init__(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self.busy_rejected = False
+
+    def generate(self, model, prompt, config=None):
+        self.calls += 1
+        if prompt == "down":
+            raise ConnectionError("503 Service Unavailable")
+        if prompt == "busy" and not self.busy_rejected:
+            self.busy_rejected = True
+            raise RuntimeError("429 RESOURCE_EXHAUSTED: Please retry in 0.01 seconds")
+        return _answer(model)
+
+    async def generate_async(self, model, prompt, config=None):
+        self.calls += 1
+        if prompt == "slow":
+            self.slow_calls += 1
+            await asyncio.sleep(10 if self.slow_calls == 1 else 0.01)
+        return _answer(model)
+
+    async def stream_async(self, model, prompt, config=None):
+        self.calls += 1
+        for _ in range(50):
+            yield "abcd"
+
+
+def test_cached_rate_limited_and_circuit_open():
+    """Test the counter and per-phase totals for cache hits, a 429 retry and a circuit rejection."""
+    print("=" * 70)
+    print("TEST 1: Cached, Rate-Limited and Circuit-Open Calls")
+    print("=" * 70)
+
+    with _restored_globals():
+        set_resilience(ResilienceManager(hedging=False, fallbacks={},
+                                         breaker_factory=lambda: CircuitBreaker(min_calls=1, open_seconds=60)))
+        set_response_cache(ResponseCache(db_path=None))
+        backend = ScriptedBackend()
+        set_backend(backend)
+        logger = MetricsLogger()
+
+        def run():
+            # A copied context keeps this test's counter and recorder out of the other tests
+            counter = track_calls()
+            set_call_recorder(logger)
+            generate("busy", phase="execute")          # 429, then the retry answers
+            generate("busy", phase="execute")          # cache hit
+            for expected in (ConnectionError, CircuitOpenError):
+                try:
+                    generate("down", model="flaky", phase="plan")
+                    assert False, f"Should have raised {expected.__name__}"
+                except expected:
+                    pass
+            return counter.calls
+
+        counted = contextvars.copy_context().run(run)
+
+    summary = summarize_calls(logger.calls)
+    phases = summary["phases"]
+    print(f"Records: {[(c.phase, c.cached, c.error) for c in logger.calls]}")
+    print(f"Counter: {counted}, backend requests: {backend.calls}, phases: {phases}")
+    assert [(c.phase, c.cached, c.error) for c in logger.calls] == [
+        ("execute", False, "rate_limit"), ("execute", False, None), ("execute", True, None),
+        ("plan", False, "ConnectionError"), ("plan", False, "circuit_open")]
+    assert counted == backend.calls == 3, "The 429, its retry and the failed request reached the provider"
+    assert phases["execute"]["calls"] == 2 and phases["execute"]["cache_hits"] == 1
+    assert phases["execute"]["rate_limited"] == 1
+    assert phases["execute"]["prompt_tokens"] == 10 and phases["execute"]["output_tokens"] == 5, \
+        "Only the answered request carries tokens; the cache hit and the 429 add none"
+    assert phases["plan"]["calls"] == 1 and phases["plan"]["circuit_open"] == 1
+    assert summary["model_calls"] == 3 and summary["total_tokens"] == 15
+    print("✅ PASSED: Cache hits and rejections are recorded but not billed!\n")
+
+
+def test_hedged_and_aborted_stream():
+    """Test that a hedge counts twice with one answer's tokens and an aborted stream counts its partial text."""
+    print("=" * 70)
+    print("TEST 2: Hedged Calls + Aborted Streams")
+    print("=" * 70)
+
+    with _restored_globals():
+        manager = ResilienceManager(deadlines={}, hedge_min_delay=0.05)
+        for _ in range(20):
+            manager.record("m", "validate", latency=0.01)
+        set_resilience(manager)
+        set_response_cache(None)
+        backend = ScriptedBackend()
+        set_backend(backend)
+        logger = MetricsLogger()
+
+        async def run():
+            counter = track_calls()
+            set_call_recorder(logger)
+            await generate_async("slow", model="m", phase="validate")
+            chunks = stream_async("long", model="m", phase="execute")
+            async for _ in chunks:
+                break               # e.g. a constraint violation in the first chunk
+            await chunks.aclose()
+            return counter.calls
+
+        counted = asyncio.run(run())
+
+    summary = summarize_calls(logger.calls)
+    phases = summary["phases"]
+    print(f"Records: {[(c.phase, c.hedged, c.error, c.output_tokens) for c in logger.calls]}")
+    print(f"Counter: {counted}, backend requests: {backend.calls}, phases: {phases}")
+    hedged, aborted = logger.calls
+    assert hedged.hedged and hedged.error is None
+    assert aborted.error == "aborted" and aborted.output_tokens == estimate_tokens("abcd")
+    assert counted == backend.calls == 3, "The hung request, its hedge and the stream"
+    assert phases["validate"]["calls"] == 2 and phases["validate"]["hedged"] == 1
+    assert phases["validate"]["prompt_tokens"] == 10 and phases["validate"]["output_tokens"] == 5, \
+        "Only the winning answer's tokens are counted"
+    assert phases["execute"]["calls"] == 1
+    assert phases["execute"]["prompt_tokens"] == estimate_tokens("long")
+    assert summary["model_calls"] == 3
+    assert summary["total_tokens"] == 15 + estimate_tokens("long") + estimate_tokens("abcd")
+    print("✅ PASSED: Hedges and aborted streams are counted as sent!\n")
+
+
+if __name__ == "__main__":
+    test_cached_rate_limited_and_circuit_open()
+    test_hedged_and_aborted_stream()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
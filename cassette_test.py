@@ -0,0 +1,192 @@
+"""
+Cassette Test - Record/replay backend for load testing the loop at accelerated speed
+
+This test shows how the agentic AI system now:
+1. Records every model request/response with latency and token usage into a cassette
+2. Saves and loads the cassette as compact gzipped JSON lines
+3. Replays a whole correction loop with identical results at scaled or zero latency
+4. Fails on unrecorded prompts in strict mode (or falls back to another backend)
+5. Replays streaming chunking and recorded provider errors
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from backends.cassette import (Cassette, RecordedError, RecordingBackend, ReplayBackend, UnrecordedRequestError,
+                               replay_scheduler)
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+MODEL_LATENCY = 0.05
+
+
+def _responder(prompt):
+    if "QA Validator" in prompt:
+        if "Agent's output:\nParis is in Germany\n" in prompt:
+            return json.dumps({"score": 0.8, "error_type": "semantic", "reasoning": "Wrong country."})
+        return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+    if prompt == "fail":
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+    return "Paris is in France" if "Wrong country." in prompt else "Paris is in Germany"
+
+
+class SlowStub(StubBackend):
+    """Stub backend with a provider-like latency."""
+    def generate(self, model, prompt, config=None):
+        time.sleep(MODEL_LATENCY)
+        return super().generate(model, prompt, config)
+
+    async def generate_async(self, model, prompt, config=None):
+        await asyncio.sleep(MODEL_LATENCY)
+        return super().generate(model, prompt, config)
+
+
+def _run(backend):
+    set_response_cache(None)
+    set_backend(backend)
+    logger = MetricsLogger()
+    start = time.perf_counter()
+    state = asyncio.run(run_agentic_workflow_async("Where is Paris?", logger=logger, verbose=False))
+    return state, logger, time.perf_counter() - start
+
+
+def _record(tmp):
+    cassette = Cassette(os.path.join(tmp, "run.jsonl.gz"))
+    state, logger, elapsed = _run(RecordingBackend(SlowStub(responder=_responder), cassette))
+    cassette.save()
+    return state, logger, elapsed, cassette
+
+
+def test_record_and_roundtrip():
+    """Test that a workflow run is recorded with timing and usage and survives save/load."""
+    print("=" * 70)
+    print("TEST 1: Record + Save/Load")
+    print("=" * 70)
+
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    with tempfile.TemporaryDirectory() as tmp:
+        state, logger, elapsed, cassette = _record(tmp)
+        size = os.path.getsize(cassette.path)
+        loaded = Cassette.load(cassette.path)
+    print(f"Recorded {len(cassette)} calls in {elapsed:.2f}s, {size} bytes on disk")
+    assert state.attempt_count == 2 and len(cassette) == len(logger.calls) == 4
+    assert len(loaded) == len(cassette) and loaded.interactions.keys() == cassette.interactions.keys()
+    for key, items in cassette.interactions.items():
+        for original, restored in zip(items, loaded.interactions[key]):
+            assert restored == original
+            assert restored.latency >= MODEL_LATENCY and restored.total_tokens > 0
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Traffic is recorded and reloads losslessly!\n")
+
+
+def test_replay_speed():
+    """Test that replay reproduces the run at scaled and zero latency."""
+    print("=" * 70)
+    print("TEST 2: Accelerated Replay")
+    print("=" * 70)
+
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    with tempfile.TemporaryDirectory() as tmp:
+        recorded, recorded_logger, recorded_elapsed, cassette = _record(tmp)
+        cassette = Cassette.load(cassette.path)
+
+    for latency in ("scaled", "zero"):
+        replay = ReplayBackend(cassette, latency=latency, speed=100)
+        set_scheduler(replay_scheduler(latency, 100))
+        state, logger, elapsed = _run(replay)
+        print(f"{latency:>6}: {elapsed:.3f}s wall (recorded {recorded_elapsed:.3f}s), "
+              f"model time {replay.speedup():.0f}x faster, stats {replay.stats}")
+        assert state.current_result == recorded.current_result == "Paris is in France"
+        assert state.attempt_count == recorded.attempt_count
+        assert [v.score for v in state.validation_log] == [v.score for v in recorded.validation_log]
+        assert [c.total_tokens for c in logger.calls] == [c.total_tokens for c in recorded_logger.calls]
+        assert replay.stats["hits"] == 4 and replay.stats["misses"] == 0
+        assert elapsed < recorded_elapsed
+    assert replay.speedup() == float("inf")
+    assert ReplayBackend(cassette, latency="scaled", speed=100)._delay(MODEL_LATENCY) == MODEL_LATENCY / 100
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: The loop replays identically at hundreds of times real speed!\n")
+
+
+def test_strict_and_fallback():
+    """Test unrecorded prompts in strict and non-strict mode."""
+    print("=" * 70)
+    print("TEST 3: Strict Mode + Fallback")
+    print("=" * 70)
+
+    cassette = Cassette()
+    recorder = RecordingBackend(StubBackend(responder=_responder), cassette)
+    recorder.generate("m", "Where is Paris?")
+
+    strict = ReplayBackend(cassette, latency="zero")
+    assert strict.generate("m", "Where is Paris?").text == "Paris is in Germany"
+    try:
+        strict.generate("m", "Where is Rome?")
+        assert False, "An unrecorded prompt must fail in strict mode"
+    except UnrecordedRequestError as e:
+        print(f"Strict: {e}")
+
+    fallback = StubBackend()
+    lenient = ReplayBackend(cassette, latency="zero", strict=False, fallback=fallback)
+    response = lenient.generate("m", "Where is Rome?")
+    print(f"Fallback: {response.text!r}, stats {lenient.stats}")
+    assert response.text.startswith("Stub answer") and fallback.calls == 1
+    assert lenient.stats == {"hits": 0, "misses": 1, "recorded_seconds": 0.0, "replayed_seconds": 0.0}
+    print("✅ PASSED: Unrecorded prompts are caught or routed to the fallback!\n")
+
+
+def test_streams_and_errors():
+    """Test that chunking, early-closed streams and provider errors replay as recorded."""
+    print("=" * 70)
+    print("TEST 4: Streams + Recorded Errors")
+    print("=" * 70)
+
+    cassette = Cassette()
+    recorder = RecordingBackend(StubBackend(responder=lambda p: "x" * 40, chunk_size=16), cassette)
+    recorded_chunks = list(recorder.stream("m", "stream me"))
+    partial = recorder.stream("m", "stop early")
+    next(partial)
+    partial.close()
+    failing = RecordingBackend(StubBackend(responder=_responder), cassette)
+    try:
+        asyncio.run(failing.generate_async("m", "fail"))
+        assert False
+    except RuntimeError:
+        pass
+
+    replay = ReplayBackend(cassette, latency="zero")
+    replayed_chunks = list(replay.stream("m", "stream me"))
+    print(f"Chunks: recorded {[len(c) for c in recorded_chunks]}, replayed {[len(c) for c in replayed_chunks]}")
+    assert replayed_chunks == recorded_chunks
+    assert list(replay.stream("m", "stop early")) == ["x" * 16], "A closed stream is recorded up to the close"
+
+    async def consume():
+        return [chunk async for chunk in replay.stream_async("m", "stream me")]
+    assert asyncio.run(consume()) == recorded_chunks, "Repeats cycle through the recordings"
+
+    try:
+        asyncio.run(replay.generate_async("m", "fail"))
+        assert False, "A recorded error must be raised again"
+    except RecordedError as e:
+        print(f"Replayed error: {e}")
+        assert str(e) == "RuntimeError: 429 RESOURCE_EXHAUSTED"
+    print("✅ PASSED: Streams and failures replay faithfully!\n")
+
+
+if __name__ == "__main__":
+    test_record_and_roundtrip()
+    test_replay_speed()
+    test_strict_and_fallback()
+    test_streams_and_errors()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
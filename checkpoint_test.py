@@ -0,0 +1,170 @@
+"""
+Checkpoint Test - Snapshot and resume of AgentState
+
+This test shows how the agentic AI system now:
+1. Serializes AgentState (and the next feedback/strategy) into a compact snapshot
+2. Saves a snapshot after every attempt at a small fraction of the attempt time
+3. Resumes a killed workflow after its last attempt without repeating any model call
+4. Skips tasks that had already finished
+5. Keeps the dedup fingerprints across a resume, so a repeated failure is still not re-judged
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.checkpoint import CheckpointStore, checkpoint_key, decode_checkpoint, encode_checkpoint
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import AgentState, ErrorType, ValidationResult
+
+set_log_store(None)
+
+
+def test_snapshot_roundtrip():
+    """Test that a snapshot restores the state exactly and stays small."""
+    print("=" * 70)
+    print("TEST 1: Snapshot Round Trip")
+    print("=" * 70)
+    
+    state = AgentState(task="Summarize the report in 3 bullets", attempt_count=3, current_result="- a\n- b")
+    for i in range(3):
+        state.validation_log.append(ValidationResult(False, 0.6, ErrorType.CONSTRAINT, "Use exactly 3 bullets. " * 5))
+        state.history.append({"attempt": i + 1, "strategy": "retry_format_fix", "temperature": None, "duplicate": False})
+    progress = {"feedback": "Use exactly 3 bullets.", "strategy": "retry_format_fix", "temperature": 0.7,
+                "last_error": "constraint"}
+    
+    blob = encode_checkpoint(state, progress)
+    restored, restored_progress = decode_checkpoint(blob)
+    print(f"Snapshot: {len(blob)} bytes")
+    assert restored == state
+    assert restored_progress == progress
+    assert len(blob) < 400, "Snapshots should be compact"
+    
+    store = CheckpointStore(":memory:")
+    for _ in range(200):
+        store.save("task", state, progress)
+    stats = store.stats()
+    print(f"Stats: {stats}")
+    assert stats["avg_save_ms"] < 5.0, "A snapshot should cost a few milliseconds at most"
+    print("✅ PASSED: Snapshots are exact and cheap!\n")
+
+
+class KilledStore(CheckpointStore):
+    """Dies right after persisting the first attempt, like a process killed mid-batch."""
+    def save(self, key, state, progress=None, status="running"):
+        super().save(key, state, progress, status)
+        raise KeyboardInterrupt("killed")
+
+
+def test_resume_after_kill():
+    """Test that a killed task resumes without repeating calls and a finished task is skipped."""
+    print("=" * 70)
+    print("TEST 2: Resume After Kill")
+    print("=" * 70)
+    
+    # The first answer is wrong; the validator's feedback makes the retry right
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            if "Agent's output:\n4\n" in prompt:
+                return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+            return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Wrong number."})
+        return "4" if "Wrong number." in prompt else "5"
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    backend = StubBackend(responder=responder)
+    set_backend(backend)
+    db_path = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+    task = "Calculate 2+2"
+    key = checkpoint_key(0, task)
+    
+    def run(store):
+        return asyncio.run(run_agentic_workflow_async(task, logger=MetricsLogger(task_id=0), verbose=False,
+                                                      checkpoint=store, checkpoint_id=key))
+    
+    try:
+        run(KilledStore(db_path))
+        raise AssertionError("The first run should have been killed")
+    except KeyboardInterrupt:
+        pass
+    calls_before = backend.calls
+    print(f"Killed after attempt 1 ({calls_before} model calls)")
+    
+    store = CheckpointStore(db_path)
+    state = run(store)
+    resumed_calls = backend.calls - calls_before
+    print(f"Resumed: {state.attempt_count} attempts, {resumed_calls} new model calls, result {state.current_result!r}")
+    assert state.attempt_count == 2 and state.validation_log[-1].is_valid
+    assert len(state.validation_log) == 2
+    assert resumed_calls == 2, "Only attempt 2 (execute + judge) should reach the model"
+    assert store.counts() == {"accept": 1}
+    
+    calls_before = backend.calls
+    state = run(store)
+    print(f"Third run: {backend.calls - calls_before} model calls, stats {store.stats()}")
+    assert backend.calls == calls_before, "A finished task must not call the model again"
+    assert state.current_result == "4"
+    assert store.stats()["resumed"] == 1 and store.stats()["skipped"] == 1
+    store.close()
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Killed work resumes, finished work is skipped!\n")
+
+
+def test_resume_keeps_fingerprints():
+    """Test that a resumed loop still recognises an output that repeats a failure from before the kill."""
+    print("=" * 70)
+    print("TEST 3: Dedup Survives A Resume")
+    print("=" * 70)
+    
+    answers = ["5", "5", "4"]
+    judged = []
+    
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            output = prompt.split("Agent's output:\n", 1)[1].split("\n", 1)[0]
+            judged.append(output)
+            if output == "4":
+                return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+            return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Wrong number."})
+        return answers.pop(0)
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    db_path = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+    task = "Calculate 2+2"
+    key = checkpoint_key(0, task)
+    
+    def run(store):
+        return asyncio.run(run_agentic_workflow_async(task, logger=MetricsLogger(task_id=0), verbose=False,
+                                                      checkpoint=store, checkpoint_id=key, dedup=True))
+    
+    try:
+        run(KilledStore(db_path))
+        raise AssertionError("The first run should have been killed")
+    except KeyboardInterrupt:
+        pass
+    store = CheckpointStore(db_path)
+    state = run(store)
+    tiers = [v.validated_by for v in state.validation_log]
+    print(f"Resumed: {state.attempt_count} attempts, tiers {tiers}, judged {judged}")
+    assert state.attempt_count == 3 and state.current_result == "4"
+    assert tiers[1] == "duplicate" and judged == ["5", "4"], "The repeat of attempt 1 must not be judged again"
+    store.close()
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: A resumed loop remembers what already failed!\n")
+
+
+if __name__ == "__main__":
+    test_snapshot_roundtrip()
+    test_resume_after_kill()
+    test_resume_keeps_fingerprints()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
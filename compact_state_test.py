@@ -0,0 +1,70 @@
+"""
+Compact State Test - Slotted, interned and bounded agent states
+
+This test shows how the agentic AI system now:
+1. Stores verdicts and states without a per-instance __dict__
+2. Shares repeated tier names between verdicts (free-form feedback is left alone)
+3. Bounds validation/history with a ring buffer on request
+4. Ships states between processes with a fast binary codec
+"""
+
+import pickle
+from utils.state_codec import dumps_state, dumps_states, loads_state, loads_states
+from utils.types import AgentState, ERROR_CODES, ErrorType, RingLog, ValidationResult
+
+
+def test_compact_representation():
+    """Test slots, interned tier names, error codes and the ring buffer."""
+    print("=" * 70)
+    print("TEST 1: Compact Representation")
+    print("=" * 70)
+    
+    a = ValidationResult(False, 0.7, ErrorType.CONSTRAINT, "".join(["Too ", "long."]), 0.0, "".join(["len", "gth"]))
+    b = ValidationResult(False, 0.6, ErrorType.CONSTRAINT, "".join(["Too ", "lo", "ng."]), 0.0, "".join(["le", "ngth"]))
+    assert not hasattr(a, "__dict__") and not hasattr(AgentState(task="t"), "__dict__")
+    assert a.validated_by is b.validated_by, "Equal tier names should be stored once"
+    assert a.feedback == b.feedback and a.feedback is not b.feedback, "Feedback must not be interned"
+    assert a.error_code == ERROR_CODES[ErrorType.CONSTRAINT]
+    
+    state = AgentState.create("Summarize", log_limit=3)
+    for attempt in range(1, 8):
+        state.attempt_count = attempt
+        state.validation_log.append(ValidationResult(False, attempt / 10, ErrorType.SEMANTIC, f"Attempt {attempt}"))
+        state.history.append({"attempt": attempt})
+    print(f"Kept: {[v.feedback for v in state.validation_log]}, history {list(state.history)}")
+    assert [v.score for v in state.validation_log] == [0.5, 0.6, 0.7]
+    assert state.validation_log[-1].feedback == "Attempt 7" and len(state.history) == 3
+    assert isinstance(pickle.loads(pickle.dumps(state)).validation_log, RingLog)
+    print("✅ PASSED: States are slotted, interned and bounded!\n")
+
+
+def test_binary_codec():
+    """Test that states survive the binary codec, alone and in bulk."""
+    print("=" * 70)
+    print("TEST 2: Binary Codec")
+    print("=" * 70)
+    
+    states = []
+    for i in range(50):
+        state = AgentState(task=f"Task {i}", attempt_count=2, current_result=f"Answer {i}")
+        state.validation_log.append(ValidationResult(False, 0.8, ErrorType.RATE_LIMIT, "Rate limited.", 12.5, "precheck"))
+        state.validation_log.append(ValidationResult(True, 0.05, ErrorType.NONE, "Correct."))
+        state.history.append({"attempt": 1, "strategy": None, "temperature": None, "duplicate": False})
+        states.append(state)
+    
+    one = dumps_state(states[0])
+    assert loads_state(one) == states[0]
+    bulk = dumps_states(states)
+    print(f"One state: {len(one)} bytes; {len(states)} states: {len(bulk)} bytes "
+          f"(pickle: {len(pickle.dumps(states))} bytes)")
+    assert loads_states(bulk) == states
+    assert len(bulk) < len(one) * len(states), "Repeated strings should be shared in bulk"
+    bounded = loads_state(one, log_limit=1)
+    assert len(bounded.validation_log) == 1 and bounded.validation_log[0].is_valid
+    print("✅ PASSED: Binary codec round-trips states!\n")
+
+
+if __name__ == "__main__":
+    test_compact_representation()
+    test_binary_codec()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
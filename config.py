@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from google import genai
 
 load_dotenv()
 
@@ -13,13 +12,145 @@ MODEL_NAME = "gemini-2.5-flash"             # ← this is the correct, working n
 RATE_LIMIT_BASE_DELAY = 5.0                 # Base delay in seconds when rate limited
 RATE_LIMIT_BACKOFF_MULTIPLIER = 1.5         # Exponential backoff multiplier for consecutive rate limits
 INITIAL_RATE_LIMIT_DELAY = 60.0             # Default delay if not specified in error
+RATE_LIMIT_JITTER = 0.2                     # Up to +20% random jitter on every scheduler wait
+RATE_LIMIT_MAX_WAITS = 3                    # 429s absorbed by the scheduler before a call gives up
+ESTIMATED_OUTPUT_TOKENS = 512               # Output tokens reserved per call until usage is known
 
-# Securely load the Google API Key
+# Per-model quotas enforced by the shared rate-limit scheduler (requests / tokens per minute)
+MODEL_QUOTAS = {
+    "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+}
+DEFAULT_MODEL_QUOTA = {"rpm": 10, "tpm": 250_000}
+
+# Per-model pricing (USD per million tokens) used for cost accounting in MetricsLogger
+MODEL_PRICING = {
+    "gemini-2.5-flash": {"input_per_million": 0.30, "output_per_million": 2.50},
+    "gemini-2.5-flash-lite": {"input_per_million": 0.10, "output_per_million": 0.40},
+}
+
+# Securely load the Google API Key (only checked when the Gemini backend builds its client)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found. Please set it in your .env file.")
 
-# Shared client
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# Model Backend: "gemini" (default) or "stub" (deterministic, offline); see backends/registry.py
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+
+# Cassette backend (MODEL_BACKEND=cassette): record real traffic once, replay it for load tests
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassette.jsonl.gz")
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "replay")                   # "record" or "replay"
+CASSETTE_RECORD_BACKEND = os.getenv("CASSETTE_RECORD_BACKEND", "gemini")  # Backend that record mode wraps
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "scaled")             # Replay latency: "real", "scaled" or "zero"
+CASSETTE_SPEED = float(os.getenv("CASSETTE_SPEED", "100"))              # Speed-up factor for "scaled"
+CASSETTE_STRICT = True                      # Unrecorded requests raise instead of going to the stub backend
+
+def __getattr__(name):
+    # Backwards compatible `from config import client`, built lazily on first access
+    if name == "client":
+        from backends.gemini import get_client
+        return get_client()
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
+
+# Streaming Execution: stream executor output and abort early on local constraint violations
+EXECUTOR_STREAMING = False
+
+# Batched Validation: concurrent workflows share one judge request per micro-batch
+VALIDATOR_BATCH_SIZE = 1                    # Max (task, output) pairs per judge request (1 = off)
+VALIDATOR_BATCH_WAIT_MS = 5.0               # Max time the first queued pair waits for company
+
+# Validator Output (schema-constrained verdict JSON; near-JSON replies are repaired locally)
+VALIDATOR_REASK_LIMIT = 1                   # Re-asks of the judge alone when a reply is still unusable
+
+# Validation Cascade (cheap judge first; the full validator only for uncertain or malformed verdicts)
+CASCADE_ENABLED = False
+CASCADE_MODEL = "gemini-2.5-flash-lite"     # Cheap first-tier judge (short prompt)
+CASCADE_BAND = 0.15                         # Escalate when |score - ACCEPTANCE_THRESHOLD| < band
+CASCADE_AUDIT_RATE = 0.0                    # Share of confident cheap verdicts re-judged anyway, to measure agreement
+
+# Speculative (best-of-N) Execution
+SPECULATIVE_MODE = False
+SPECULATIVE_N = 3                           # Candidates fired concurrently per attempt
+SPECULATIVE_MAX_CALLS = 18                  # Model-call budget per task across all rounds
+SPECULATIVE_CANCEL_LOSERS = True            # Cancel remaining candidates once one is accepted
+SPECULATIVE_TEMPERATURES = [None, 0.7, 1.0] # Per-candidate temperature (None = model default)
+
+# Resilience (per-call deadlines, hedged requests, circuit breaker)
+PHASE_DEADLINES = {"execute": 120.0, "validate": 60.0, "validate_fast": 30.0, "plan": 60.0}  # Seconds before a call is abandoned
+HEDGE_ENABLED = True
+HEDGE_PERCENTILE = 95                       # Send one duplicate once a call outlives this latency percentile
+HEDGE_MIN_SAMPLES = 20                      # Successful calls observed before hedging starts
+HEDGE_MIN_DELAY = 1.0                       # Never hedge earlier than this (seconds)
+BREAKER_ERROR_THRESHOLD = 0.5               # Error rate over the window that opens the circuit
+BREAKER_WINDOW = 20                         # Recent calls considered per model
+BREAKER_MIN_CALLS = 5                       # Calls needed in the window before the breaker can open
+BREAKER_OPEN_SECONDS = 30.0                 # Time open before half-open probing
+BREAKER_HALF_OPEN_PROBES = 1                # Concurrent probe calls allowed while half-open
+FALLBACK_MODELS = {"gemini-2.5-flash": "gemini-2.5-flash-lite"}  # Used while a model's circuit is open
+
+# Correction Policy ("static" = fixed ErrorType -> strategy map, "adaptive" = learned per task context)
+POLICY_MODE = "static"
+ADAPTIVE_POLICY_PATH = "policy_stats.json"  # Persisted per-context strategy outcomes
+ADAPTIVE_PRIOR_STRENGTH = 2.0               # Pseudo-successes given to the static mapping's strategy
+ADAPTIVE_CALLS_PER_ATTEMPT = 2.0            # Assumed model calls per attempt before a strategy has data
+ADAPTIVE_LEARN_FROM_LOG = False             # Seed a policy without saved stats from the retries in LOG_DB_PATH
+
+# Duplicate Attempt Detection (a retry that repeats a failed output reuses its verdict)
+DEDUP_ENABLED = True
+DEDUP_SIMILARITY = 0.9                      # Estimated Jaccard similarity that counts as a near-duplicate
+DEDUP_SHINGLE_SIZE = 5                      # Characters per shingle
+DEDUP_SKETCH_SIZE = 128                     # MinHash (bottom-k) sketch size
+ESCALATION_TEMPERATURES = [0.7, 1.0, 1.3]   # Executor temperature after the 1st, 2nd, 3rd+ duplicate
+
+# Convergence-aware Termination (stop a loop whose ε is no longer heading below the threshold)
+TERMINATION_EARLY_STOP = False
+TERMINATION_WINDOW = 3                      # Judged attempts the plateau and trend checks look at
+TERMINATION_MIN_IMPROVEMENT = 0.05          # Best ε must drop at least this much within the window
+TERMINATION_GOOD_ENOUGH_MARGIN = None       # Accept a best ε within this of the threshold near the end (None = off)
+TERMINATION_GOOD_ENOUGH_REMAINING = 1       # Attempts left at which a good-enough result is taken
+TERMINATION_AUDIT_RATE = 0.0                # Share of early stops ignored, to measure how often the loop would still succeed
+
+# Response Cache (content-addressed on model + prompt + generation config)
+CACHE_ENABLED = True
+CACHE_MAX_ENTRIES = 2048                    # In-memory LRU size
+CACHE_TTL_SECONDS = 7 * 24 * 3600           # Entries older than this are ignored (None = never expire)
+CACHE_DB_PATH = "llm_cache.sqlite"          # Persistent disk tier (None = memory only)
+
+# Experiment Log Store (append-only JSONL: one record per step, model call and run summary)
+LOG_STORE_ENABLED = True
+LOG_DB_PATH = "experiment_logs.jsonl"
+LOG_FLUSH_RECORDS = 64                      # Buffered records before a write
+LOG_FSYNC_INTERVAL = 1.0                    # Background flush period: max seconds a record stays buffered
+LOG_MAX_BYTES = 50 * 1024 * 1024            # Rotate to .1, .2, ... past this size (None = never)
+LOG_BACKUP_COUNT = 5                        # Rotated files kept
+LOG_LATENCY_SAMPLES = 2048                  # Per-phase latency reservoir for run-wide percentiles
+METRICS_SUMMARY_PATH = "experiment_summary.json"
+
+# Plan-then-Execute (planner step graph run as concurrent per-step correction loops + a merge step)
+PLAN_MODE = False
+PLAN_MAX_STEPS = 6                          # Larger plans are rejected (the task runs as one step)
+PLAN_CACHE_SIZE = 256                       # Step graphs memoized per normalized task template
+
+# Delta Correction (a retry of a long output returns edits to apply to it instead of a full answer)
+DELTA_MODE = False
+DELTA_MIN_CHARS = 600                       # Shorter outputs are simply regenerated
+
+# Tool Execution (environment/tool_interace.py)
+TOOLS_ENABLED = False                       # Let the executor request tools (calculator, search, ...)
+TOOL_TIMEOUT_SECONDS = 5.0                  # Per tool call; isolated tools are killed past this
+TOOL_WORKERS = 2                            # Worker processes for isolated tools
+TOOL_CACHE_SIZE = 1024                      # Memoized results of deterministic tools (and cached calculator ASTs)
+TOOL_MAX_ROUNDS = 3                         # Tool round trips per executor attempt
+
+# Agent State (bounded memory for high-volume runs)
+STATE_LOG_LIMIT = None                      # Keep only the latest N validations / history entries per state (None = all)
+
+# Checkpoints (AgentState snapshot after every attempt of a batch task, used by --resume)
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DB_PATH = "checkpoints.sqlite"
+
+# Tracing (metrics/events.py spans; exporters attach with --trace / --otlp / --profile)
+TRACE_PROFILE_INTERVAL = 0.005              # Seconds between sampling-profiler stack samples
+TRACE_OTLP_BATCH = 512                      # Finished spans buffered per line of the OTLP JSON file
+TRACE_SERVICE_NAME = "self-correcting-agent"
 
-LOG_DB_PATH = "experiment_logs.json"
\ No newline at end of file
+# Batch Configuration
+BATCH_CONCURRENCY = 8                       # Max correction loops running at once in batch mode
+BATCH_SUMMARY_PATH = "batch_summary.json"   # Aggregated summary of a batch run (steps go to the log store)
\ No newline at end of file
@@ -0,0 +1,160 @@
+import json
+import os
+import random
+import re
+from typing import Optional
+from config import (ADAPTIVE_POLICY_PATH, ADAPTIVE_PRIOR_STRENGTH, ADAPTIVE_CALLS_PER_ATTEMPT, ADAPTIVE_LEARN_FROM_LOG,
+                    LOG_DB_PATH)
+from correction.policy import CorrectionPolicy, RETRY_STRATEGIES
+from metrics.log_store import read_records
+from utils.types import ErrorType
+
+# Coarse task classes; the first matching pattern wins
+TASK_KINDS = [
+    ("code", re.compile(r"\b(code|function|python|script|program|bug|compile|sql|regex)\b", re.I)),
+    ("math", re.compile(r"\b(calculate|compute|solve|sum|equation|integral)\b|\d\s*[-+*/^]\s*\d", re.I)),
+    ("format", re.compile(r"\b(json|csv|table|bullet|format|words|characters|sentences)\b", re.I)),
+    ("factual", re.compile(r"\b(who|when|where|quote|cite|history|capital|founded)\b", re.I)),
+]
+
+def task_features(task: str) -> str:
+    """Bucket a task as "<kind>/<size>" so outcomes generalise across similar tasks."""
+    kind = next((name for name, pattern in TASK_KINDS if pattern.search(task)), "general")
+    size = "short" if len(task) < 200 else "long"
+    return f"{kind}/{size}"
+
+def context_key(error_type, features: str) -> str:
+    error = error_type.value if isinstance(error_type, ErrorType) else str(error_type)
+    return f"{error}|{features}"
+
+def credit_step(last_error, error_type, strategy: Optional[str]):
+    """
+    Crediting rule shared by the online update (main.py) and learn_from_log(): a step taken
+    with a strategy is credited to the error type of the last judged step of its loop.
+    Rate-limited steps were never judged, so they earn no credit and leave that error as is.
+    Returns (error type to credit or None, last judged error after this step).
+    """
+    if error_type in (ErrorType.RATE_LIMIT, ErrorType.RATE_LIMIT.value):
+        return None, last_error
+    return (last_error if strategy else None), error_type
+
+class AdaptiveCorrectionPolicy(CorrectionPolicy):
+    """
+    Contextual bandit over retry strategies, keyed on (error type, task features).
+    1. Every judged retry records (trials, successes, model calls) for the strategy used.
+    2. A strategy is chosen by Thompson sampling: draw a success rate p from its
+       Beta posterior and pick the lowest expected model calls per accepted answer
+       (calls per attempt / p). Sampling keeps exploring strategies with little data.
+    3. The static STRATEGY_BY_ERROR choice gets ADAPTIVE_PRIOR_STRENGTH pseudo-successes,
+       so a context with no history behaves like the static policy.
+    Stats are saved to ADAPTIVE_POLICY_PATH between runs.
+    """
+    def __init__(self, path: Optional[str] = ADAPTIVE_POLICY_PATH, prior_strength: float = ADAPTIVE_PRIOR_STRENGTH,
+                 seed: int = None):
+        self.path = path
+        self.prior_strength = prior_strength
+        self.stats = {}             # context -> strategy -> {"trials", "successes", "calls"}
+        self.decisions = 0
+        self.overrides = 0          # decisions that differ from the static mapping
+        self.outcomes_recorded = 0
+        self._rng = random.Random(seed)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _expected_calls(self, context: str, strategy: str, prior_strategy: str) -> float:
+        s = self.stats.get(context, {}).get(strategy, {})
+        trials = s.get("trials", 0)
+        successes = s.get("successes", 0)
+        prior = self.prior_strength if strategy == prior_strategy else 0.0
+        p = self._rng.betavariate(1.0 + successes + prior, 1.0 + trials - successes)
+        calls_per_attempt = (s.get("calls", 0) + ADAPTIVE_CALLS_PER_ATTEMPT) / (trials + 1)
+        return calls_per_attempt / max(p, 1e-6)
+
+    def rank_strategies(self, error_type: ErrorType, task: str) -> list:
+        """All retry strategies, best (fewest sampled calls per accept) first."""
+        prior_strategy = super().strategy_for(error_type)
+        context = context_key(error_type, task_features(task))
+        scored = [(self._expected_calls(context, s, prior_strategy), s) for s in RETRY_STRATEGIES]
+        return [s for _, s in sorted(scored)]
+
+    def strategy_for(self, error_type: ErrorType, task: str = None) -> str:
+        if task is None:
+            return super().strategy_for(error_type)
+        choice = self.rank_strategies(error_type, task)[0]
+        self.decisions += 1
+        self.overrides += choice != super().strategy_for(error_type)
+        return choice
+
+    def candidate_strategies(self, validation=None, n: int = 1, task: str = None) -> list:
+        if validation is None or task is None:
+            return super().candidate_strategies(validation, n)
+        return self.rank_strategies(validation.error_type, task)[:n]
+
+    def record_outcome(self, task: str, error_type, strategy: str, accepted: bool, model_calls: int):
+        self._record(context_key(error_type, task_features(task)), strategy, accepted, model_calls)
+
+    def _record(self, context: str, strategy: str, accepted: bool, model_calls: int):
+        s = self.stats.setdefault(context, {}).setdefault(strategy, {"trials": 0, "successes": 0, "calls": 0})
+        s["trials"] += 1
+        s["successes"] += bool(accepted)
+        s["calls"] += model_calls
+        self.outcomes_recorded += 1
+
+    def learn_from_log(self, path: str = LOG_DB_PATH) -> int:
+        """
+        Replay retries from a metrics log, crediting each step as the live loop did (see
+        credit_step). Returns the number of outcomes learned.
+        """
+        last_error = {}
+        learned = 0
+        for record in read_records(path, kind="step"):
+            key = (record.get("run_id"), record.get("task_id"), record.get("plan_step"))
+            if record.get("step", 1) <= 1:
+                last_error.pop(key, None)       # a new correction loop
+            strategy = record.get("strategy")
+            credited, last_error[key] = credit_step(last_error.get(key), record.get("error_type"), strategy)
+            features = record.get("task_features")
+            if credited is None or not features or strategy not in RETRY_STRATEGIES:
+                continue
+            self._record(context_key(credited, features), strategy, bool(record.get("is_valid")),
+                         record.get("model_calls") or 0)
+            learned += 1
+        return learned
+
+    def summary(self) -> dict:
+        return {
+            "mode": "adaptive",
+            "decisions": self.decisions,
+            "overrides": self.overrides,
+            "outcomes_recorded": self.outcomes_recorded,
+            "contexts": len(self.stats),
+        }
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "stats": self.stats}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with open(path, "r") as f:
+            self.stats = json.load(f).get("stats", {})
+
+# Process-wide adaptive policy, shared by concurrent workflows so they learn together
+_adaptive_policy = None
+
+def get_adaptive_policy() -> AdaptiveCorrectionPolicy:
+    global _adaptive_policy
+    if _adaptive_policy is None:
+        _adaptive_policy = AdaptiveCorrectionPolicy(path=ADAPTIVE_POLICY_PATH)
+        # Saved stats already include the logged outcomes; only a fresh policy replays the log
+        if ADAPTIVE_LEARN_FROM_LOG and not _adaptive_policy.stats:
+            _adaptive_policy.learn_from_log(LOG_DB_PATH)
+    return _adaptive_policy
+
+def set_adaptive_policy(policy: Optional[AdaptiveCorrectionPolicy]):
+    global _adaptive_policy
+    _adaptive_policy = policy
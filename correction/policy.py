@@ -1,5 +1,16 @@
 from utils.types import AgentState, ValidationResult, ErrorType
-from config import MAX_RETRIES
+from config import MAX_RETRIES, ESCALATION_TEMPERATURES
+
+# Correction strategy for each error type; anything else falls back to "retry_standard"
+STRATEGY_BY_ERROR = {
+    ErrorType.TOOL: "retry_tool_fix",
+    ErrorType.HALLUCINATION: "retry_grounding",
+    ErrorType.CONSTRAINT: "retry_format_fix",
+    ErrorType.SEMANTIC: "retry_reasoning",
+}
+
+# Every retry strategy, in the order they are tried as speculative alternatives
+RETRY_STRATEGIES = ["retry_reasoning", "retry_grounding", "retry_format_fix", "retry_tool_fix", "retry_standard"]
 
 class CorrectionPolicy:
     def decide_action(self, state: AgentState, validation: ValidationResult) -> str:
@@ -15,15 +26,44 @@ class CorrectionPolicy:
         if validation.error_type == ErrorType.RATE_LIMIT:
             return "wait_and_retry"
         
-        # 4. Adaptive Strategy for other errors
-        elif validation.error_type == ErrorType.TOOL:
-            return "retry_tool_fix"
-        elif validation.error_type == ErrorType.HALLUCINATION:
-            return "retry_grounding"
-        elif validation.error_type == ErrorType.CONSTRAINT:
-            return "retry_format_fix"
-        elif validation.error_type == ErrorType.SEMANTIC:
-            return "retry_reasoning"
-
-        # default fallback
-        return "retry_standard"
\ No newline at end of file
+        # 4. The retry repeated an earlier failed output - doing the same again is pointless
+        if validation.validated_by == "duplicate":
+            return self.escalate(state, validation)
+
+        # 5. Adaptive Strategy for other errors (default fallback: retry_standard)
+        return self.strategy_for(validation.error_type, state.task)
+
+    def strategy_for(self, error_type: ErrorType, task: str = None) -> str:
+        return STRATEGY_BY_ERROR.get(error_type, "retry_standard")
+
+    def candidate_strategies(self, validation: ValidationResult = None, n: int = 1, task: str = None) -> list:
+        """
+        Up to `n` distinct strategies for speculative execution: the policy's own choice
+        first, then the remaining retry strategies. Before any validation the first
+        candidate runs without a strategy.
+        """
+        primary = None if validation is None else self.strategy_for(validation.error_type)
+        others = [s for s in RETRY_STRATEGIES if s != primary]
+        return ([primary] + others)[:n]
+
+    def escalate(self, state: AgentState, validation: ValidationResult) -> str:
+        """The preferred strategy if it has not been tried on this task yet, else the next untried one."""
+        preferred = self.strategy_for(validation.error_type, state.task)
+        tried = {entry.get("strategy") for entry in state.history}
+        for strategy in [preferred] + RETRY_STRATEGIES:
+            if strategy not in tried:
+                return strategy
+        return preferred
+
+    def escalation_temperature(self, state: AgentState):
+        """Executor temperature for the next attempt: raised once per duplicate seen so far."""
+        duplicates = sum(1 for entry in state.history if entry.get("duplicate"))
+        if duplicates == 0:
+            return None
+        return ESCALATION_TEMPERATURES[min(duplicates, len(ESCALATION_TEMPERATURES)) - 1]
+
+    def record_outcome(self, task: str, error_type: ErrorType, strategy: str, accepted: bool, model_calls: int):
+        """Outcome of a retry made with `strategy` after `error_type`; the static policy ignores it."""
+
+    def summary(self) -> dict:
+        return {"mode": "static"}
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+from config import SPECULATIVE_N, SPECULATIVE_MAX_CALLS, SPECULATIVE_CANCEL_LOSERS, SPECULATIVE_TEMPERATURES
+from utils.llm import track_calls
+from utils.types import ValidationResult
+
+# attempt_fn(strategy, temperature) -> (executor result, validation)
+AttemptFn = Callable[[Optional[str], Optional[float]], Awaitable[Tuple[str, ValidationResult]]]
+
+@dataclass
+class SpeculativeRound:
+    result: str
+    validation: ValidationResult
+    strategy: Optional[str]
+    candidates: int
+    cancelled: int
+    wall_seconds: float
+    sequential_seconds: float    # estimated time to reach the same winner trying candidates one by one
+    model_calls: int
+    winner_calls: int
+
+    @property
+    def time_saved(self) -> float:
+        return max(0.0, self.sequential_seconds - self.wall_seconds)
+
+    @property
+    def extra_calls(self) -> int:
+        return self.model_calls - self.winner_calls
+
+class SpeculativeExecutor:
+    """
+    Best-of-N execution: fire N candidates at once (each with a different correction
+    strategy and/or temperature), validate them in parallel and take the first one the
+    validator accepts. With cancel_losers the remaining candidates are cancelled as soon
+    as a winner is found; otherwise all finish and the best score wins. `max_calls` caps
+    the model calls one task may spend across all rounds; once it cannot pay for another
+    candidate, width() is 0 and the caller runs a normal single attempt instead.
+    """
+
+    def __init__(self, n: int = SPECULATIVE_N, max_calls: int = SPECULATIVE_MAX_CALLS,
+                 cancel_losers: bool = SPECULATIVE_CANCEL_LOSERS, temperatures: List[Optional[float]] = None):
+        self.n = n
+        self.max_calls = max_calls
+        self.cancel_losers = cancel_losers
+        self.temperatures = temperatures or SPECULATIVE_TEMPERATURES
+        self.calls_spent = 0
+
+    def width(self) -> int:
+        """Candidates affordable this round (each costs up to 2 calls); 0 once the budget is spent."""
+        remaining = self.max_calls - self.calls_spent
+        return max(0, min(self.n, remaining // 2))
+
+    async def run_round(self, attempt_fn: AttemptFn, strategies: List[Optional[str]]) -> SpeculativeRound:
+        strategies = strategies[:self.width()] or [None]
+        start = time.perf_counter()
+
+        counters = {}
+
+        async def _candidate(index: int, strategy: Optional[str]):
+            temperature = self.temperatures[index % len(self.temperatures)]
+            counters[index] = track_calls()  # each candidate runs in its own task/context
+            t0 = time.perf_counter()
+            result, validation = await attempt_fn(strategy, temperature)
+            return index, result, validation, time.perf_counter() - t0
+
+        tasks = [asyncio.ensure_future(_candidate(i, s)) for i, s in enumerate(strategies)]
+        finished = {}
+        winner = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result, validation, elapsed = await next_done
+                finished[index] = (result, validation, elapsed)
+                if validation.is_valid and winner is None:
+                    winner = index
+                    if self.cancel_losers:
+                        break
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        wall = time.perf_counter() - start
+        if winner is None:
+            winner = min(finished, key=lambda i: finished[i][1].score)
+
+        # Sequentially we would have waited for every candidate tried before the winner
+        sequential = sum(finished[i][2] if i in finished else wall for i in range(winner + 1))
+        model_calls = sum(counter.calls for counter in counters.values())
+        winner_result, winner_validation, _ = finished[winner]
+        winner_calls = counters[winner].calls
+        self.calls_spent += model_calls
+
+        return SpeculativeRound(
+            result=winner_result,
+            validation=winner_validation,
+            strategy=strategies[winner],
+            candidates=len(tasks),
+            cancelled=len(tasks) - len(finished),
+            wall_seconds=wall,
+            sequential_seconds=sequential,
+            model_calls=model_calls,
+            winner_calls=winner_calls,
+        )
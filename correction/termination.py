@@ -1,3 +1,157 @@
+import random
+from typing import Optional, Tuple
+from config import (ACCEPTANCE_THRESHOLD, ADAPTIVE_CALLS_PER_ATTEMPT, MAX_RETRIES, TERMINATION_AUDIT_RATE,
+                    TERMINATION_EARLY_STOP, TERMINATION_GOOD_ENOUGH_MARGIN, TERMINATION_GOOD_ENOUGH_REMAINING,
+                    TERMINATION_MIN_IMPROVEMENT, TERMINATION_WINDOW)
+from utils.checkpoint import decode_validation, encode_validation
+from utils.types import AgentState, ErrorType, ValidationResult
+
+# Decides when the correction loop ends, and which attempt it hands back.
+# 1. The policy's "accept" and "stop_max_retries" always end the loop.
+# 2. Otherwise the ε trajectory of the judged attempts (rate-limited and duplicate attempts
+#    carry no new verdict) can end it early:
+#    - "stop_plateau": the best ε improved by less than `min_improvement` over the last `window` attempts
+#    - "stop_trend": a least-squares line through the last `window` scores, extended to the last
+#      allowed attempt, still ends above the acceptance threshold
+#    - "accept_good_enough" (only with `good_enough_margin`): with at most `good_enough_remaining`
+#      attempts left, the best ε is within the margin of the threshold
+# 3. A loop that ends without accepting its last attempt returns its best attempt instead;
+#    finish() gives the verdict of the attempt handed back and whether it counts as accepted.
+# 4. With `audit_rate`, a sampled early stop is not acted on: the loop runs on and records whether
+#    it was accepted after all, which measures the accuracy cost of stopping early.
+
+EARLY_STOP_REASONS = ("stop_plateau", "stop_trend", "accept_good_enough")
+
 class TerminationController:
-    def should_terminate(self, action: str) -> bool:
-        return action in ["accept", "stop_max_retries"]
\ No newline at end of file
+    def __init__(self, early_stop: bool = TERMINATION_EARLY_STOP, window: int = TERMINATION_WINDOW,
+                 min_improvement: float = TERMINATION_MIN_IMPROVEMENT,
+                 good_enough_margin: Optional[float] = TERMINATION_GOOD_ENOUGH_MARGIN,
+                 good_enough_remaining: int = TERMINATION_GOOD_ENOUGH_REMAINING,
+                 audit_rate: float = TERMINATION_AUDIT_RATE, max_retries: int = MAX_RETRIES,
+                 threshold: float = ACCEPTANCE_THRESHOLD, seed: int = None):
+        self.early_stop = early_stop
+        self.window = max(2, window)
+        self.min_improvement = min_improvement
+        self.good_enough_margin = good_enough_margin
+        self.good_enough_remaining = good_enough_remaining
+        self.audit_rate = audit_rate
+        self.max_retries = max_retries
+        self.threshold = threshold
+        self.scores = []            # ε of the judged attempts, in order
+        self.best_score = None
+        self.best_attempt = 0
+        self.best_result = None
+        self.best_validation = None
+        self.reason = None          # why the loop ended
+        self.returned_best = False  # the final output is an earlier attempt than the last one
+        self.verdict = None         # verdict of the attempt the loop hands back
+        self.accepted = False
+        self.audit = None           # the early stop that was overridden, and how the loop ended after it
+        self._rng = random.Random(seed)
+
+    def observe(self, attempt: int, result: str, validation: ValidationResult):
+        """Track one attempt's verdict (call after every attempt, before should_terminate)."""
+        if validation.error_type == ErrorType.RATE_LIMIT:
+            return
+        if self.best_score is None or validation.score < self.best_score:
+            self.best_score, self.best_attempt, self.best_result = validation.score, attempt, result
+            self.best_validation = validation
+        if validation.validated_by != "duplicate":
+            self.scores.append(validation.score)
+
+    def early_stop_reason(self, attempt_count: int) -> Optional[str]:
+        remaining = self.max_retries - attempt_count
+        if (self.good_enough_margin is not None and self.best_score is not None
+                and remaining <= self.good_enough_remaining
+                and self.best_score <= self.threshold + self.good_enough_margin):
+            return "accept_good_enough"
+        if not self.early_stop or len(self.scores) < self.window:
+            return None
+        if min(self.scores[:len(self.scores) - self.window + 1]) - min(self.scores) < self.min_improvement:
+            return "stop_plateau"
+        if self._projected_score(remaining) > self.threshold:
+            return "stop_trend"
+        return None
+
+    def _projected_score(self, remaining: int) -> float:
+        """ε the least-squares trend of the last `window` scores reaches after `remaining` more attempts."""
+        recent = self.scores[-self.window:]
+        n = len(recent)
+        mean_x, mean_y = (n - 1) / 2, sum(recent) / n
+        slope = (sum((x - mean_x) * (y - mean_y) for x, y in enumerate(recent))
+                 / sum((x - mean_x) ** 2 for x in range(n)))
+        return mean_y + slope * (n - 1 - mean_x + remaining)
+
+    def should_terminate(self, action: str, state: AgentState = None) -> bool:
+        """True when the loop must end after this attempt; `reason` says why."""
+        if action in ["accept", "stop_max_retries"]:
+            self.reason = action
+            return True
+        if state is None or action == "wait_and_retry" or self.audit is not None:
+            return False
+        reason = self.early_stop_reason(state.attempt_count)
+        if reason is None:
+            return False
+        if self.audit_rate and self._rng.random() < self.audit_rate:
+            self.audit = {"reason": reason, "attempt": state.attempt_count}
+            return False
+        self.reason = reason
+        return True
+
+    def finish(self, state: AgentState) -> Tuple[Optional[ValidationResult], bool]:
+        """
+        (verdict, accepted) of the attempt the loop hands back. If the last attempt was not
+        accepted, `state.current_result` becomes the best attempt and its verdict is returned.
+        """
+        last = state.validation_log[-1] if state.validation_log else None
+        if self.audit is not None:
+            self.audit["accepted_later"] = last is not None and last.is_valid
+            self.audit["extra_attempts"] = state.attempt_count - self.audit["attempt"]
+        self.verdict = last
+        if (last is not None and not last.is_valid and self.best_validation is not None
+                and self.best_attempt != state.attempt_count):
+            self.verdict = self.best_validation
+            if state.current_result != self.best_result:
+                state.current_result = self.best_result
+                self.returned_best = True
+        self.accepted = self.verdict is not None and (self.verdict.is_valid or self.reason == "accept_good_enough")
+        return self.verdict, self.accepted
+
+    def progress(self) -> dict:
+        """Checkpointable trajectory, so a resumed loop keeps its best attempt."""
+        return {"scores": list(self.scores), "best_score": self.best_score, "best_attempt": self.best_attempt,
+                "best_result": self.best_result, "reason": self.reason, "accepted": self.accepted,
+                "best_validation": encode_validation(self.best_validation) if self.best_validation else None,
+                "verdict": encode_validation(self.verdict) if self.verdict else None}
+
+    def restore(self, progress: Optional[dict]):
+        if progress:
+            self.scores = list(progress["scores"])
+            self.best_score = progress["best_score"]
+            self.best_attempt = progress["best_attempt"]
+            self.best_result = progress["best_result"]
+            self.reason = progress.get("reason")
+            self.accepted = progress.get("accepted", False)
+            if progress.get("best_validation"):
+                self.best_validation = decode_validation(progress["best_validation"])
+            if progress.get("verdict"):
+                self.verdict = decode_validation(progress["verdict"])
+
+    def stats(self, attempt_count: int, calls_per_attempt: float = None) -> dict:
+        early = self.reason in EARLY_STOP_REASONS
+        attempts_saved = self.max_retries - attempt_count if early else 0
+        calls_per_attempt = calls_per_attempt or ADAPTIVE_CALLS_PER_ATTEMPT
+        return {
+            "reason": self.reason,
+            "early": early,
+            "attempts": attempt_count,
+            "attempts_saved": attempts_saved,
+            "calls_saved": attempts_saved * calls_per_attempt,
+            "best_attempt": self.best_attempt,
+            "best_score": self.best_score,
+            "returned_best": self.returned_best,
+            "accepted": self.accepted,
+            "score": self.verdict.score if self.verdict is not None else None,
+            "error_type": self.verdict.error_type.value if self.verdict is not None else None,
+            "audit": dict(self.audit) if self.audit is not None else None,
+        }
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Delta Correction Test - Retries patch the previous output
+
+This test shows how the agentic AI system now:
+1. Applies edit lists and unified diffs to the previous output locally
+2. Rejects patches that do not apply cleanly
+3. Corrects a long output with a small patch and records the output tokens saved
+4. Falls back to full regeneration when a patch fails to apply
+5. Patches JSON-array answers too, but never error-tagged attempts
+"""
+
+import asyncio
+import json
+from agents.executor import ExecutorAgent
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.patching import PatchError, apply_patch
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+REPORT = "\n".join(f"Paragraph {i}: the quarterly figures for region {i} were stable and in line with plan."
+                   for i in range(12)) + "\nConclusion: Paris is the capital of Germany."
+FIXED = REPORT.replace("Paris is the capital of Germany", "Berlin is the capital of Germany")
+
+
+def test_apply_patches():
+    """Test edit lists, unified diffs and patches that must be rejected."""
+    print("=" * 70)
+    print("TEST 1: Apply Patches")
+    print("=" * 70)
+    
+    edits = json.dumps({"edits": [{"find": "Paris is", "replace": "Berlin is"}]})
+    assert apply_patch(REPORT, edits) == FIXED
+    
+    diff = ("--- a/report\n+++ b/report\n@@ -12,2 +12,2 @@\n"
+            " Paragraph 11: the quarterly figures for region 11 were stable and in line with plan.\n"
+            "-Conclusion: Paris is the capital of Germany.\n"
+            "+Conclusion: Berlin is the capital of Germany.\n")
+    assert apply_patch(REPORT, diff) == FIXED
+    
+    for bad in [json.dumps({"edits": [{"find": "Madrid", "replace": "x"}]}),        # not found
+                json.dumps({"edits": [{"find": "were stable", "replace": "x"}]}),   # ambiguous
+                json.dumps({"rewrite": True}),
+                "Here is the corrected report: ..."]:
+        try:
+            apply_patch(REPORT, bad)
+            raise AssertionError(f"Patch should not apply: {bad}")
+        except PatchError as e:
+            print(f"Rejected: {e}")
+    print("✅ PASSED: Patches apply exactly or not at all!\n")
+
+
+def _run(patch_reply):
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            if "Paris is the capital" in prompt:
+                return json.dumps({"score": 0.8, "error_type": "hallucination", "reasoning": "Paris is not in Germany."})
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+        if "Fix it by editing it" in prompt:
+            return patch_reply
+        return FIXED if "Paris is not in Germany" in prompt else REPORT
+    
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    logger = MetricsLogger()
+    # The scripted regeneration is a near-copy of the rejected report; keep duplicate detection out of it
+    state = asyncio.run(run_agentic_workflow_async("Write the quarterly report", logger=logger, verbose=False,
+                                                   delta=True, dedup=False))
+    execute_calls = [c for c in logger.calls if c.phase == "execute"]
+    return state, logger, execute_calls
+
+
+def test_delta_retry_and_fallback():
+    """Test that a retry is a small patch, and that a broken patch falls back to regeneration."""
+    print("=" * 70)
+    print("TEST 2: Delta Retry + Fallback")
+    print("=" * 70)
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    
+    state, logger, execute_calls = _run(json.dumps({"edits": [{"find": "Paris is", "replace": "Berlin is"}]}))
+    delta = logger.summary["delta"]
+    print(f"Patched: attempts={state.attempt_count}, output tokens per execute call "
+          f"{[c.output_tokens for c in execute_calls]}, delta {delta}")
+    assert state.current_result == FIXED and state.validation_log[-1].is_valid
+    assert len(execute_calls) == 2
+    assert execute_calls[1].output_tokens * 5 < execute_calls[0].output_tokens, "The retry should be a small patch"
+    assert delta["patches_applied"] == 1 and delta["output_tokens_saved"] > 200
+    assert logger.logs[1]["delta"]["applied"]
+    
+    state, logger, execute_calls = _run(json.dumps({"edits": [{"find": "Lisbon", "replace": "Berlin"}]}))
+    delta = logger.summary["delta"]
+    print(f"Fallback: attempts={state.attempt_count}, {len(execute_calls)} execute calls, delta {delta}")
+    assert state.current_result == FIXED and state.validation_log[-1].is_valid
+    assert len(execute_calls) == 3, "A failed patch costs one call, then the answer is regenerated"
+    assert delta["fallbacks"] == 1 and delta["output_tokens_saved"] < 0
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Retries patch the output and fall back safely!\n")
+
+
+
+def test_delta_only_skips_error_tags():
+    """Test that a JSON array answer is patched while tagged failures are regenerated."""
+    print("=" * 70)
+    print("TEST 3: Error Tags vs JSON Answers")
+    print("=" * 70)
+    
+    executor = ExecutorAgent()
+    array_answer = json.dumps([{"region": i, "status": "stable"} for i in range(30)])
+    assert executor._wants_delta(array_answer, "Region 3 is wrong."), "A JSON array answer can be patched"
+    for tagged in (f"[EXECUTION_ERROR] {'x' * 700}", f"[RATE_LIMIT_429] Error: {'x' * 700}",
+                   f"[CONSTRAINT_VIOLATION] Too long: {'x' * 700}"):
+        assert not executor._wants_delta(tagged, "Try again."), f"Should regenerate: {tagged[:20]}"
+    print("✅ PASSED: Only error tags disable delta retries!\n")
+
+
+if __name__ == "__main__":
+    test_apply_patches()
+    test_delta_retry_and_fallback()
+    test_delta_only_skips_error_tags()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -1,10 +1,295 @@
+import ast
+import asyncio
+import functools
+import inspect
+import json
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from config import TOOL_TIMEOUT_SECONDS, TOOL_WORKERS, TOOL_CACHE_SIZE
+from utils.helpers import percentile
+
+# Tool execution engine used by the executor (see agents.executor).
+# 1. Tools are registered by name (`ToolInterface.register`, also usable as a decorator);
+#    sync and async functions are both accepted.
+# 2. Every call has a timeout. Tools marked `isolated` run in a worker process pool. A call
+#    that times out retires its pool: new calls get a fresh pool, and the old one (with the
+#    runaway worker) is killed once the other calls on it are done, so a runaway expression
+#    can neither stall the agent nor fail concurrent calls of other workflows.
+# 3. Several calls from one step run concurrently (`call_many_async`).
+# 4. Results of `deterministic` tools are memoized (LRU); per-tool latency is recorded.
+# The calculator is a safe compiled-expression evaluator: the AST is checked against a
+# whitelist, compiled once and cached, and evaluated without builtins.
+
+# ---------------------------------------------------------------- safe calculator
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_FUNCTIONS = {name: getattr(math, name) for name in
+              ("sqrt", "exp", "log", "log10", "log2", "sin", "cos", "tan", "asin", "acos", "atan",
+               "floor", "ceil", "factorial", "radians", "degrees")}
+_FUNCTIONS.update({"abs": abs, "round": round, "min": min, "max": max})
+_CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+_NAMES = {**_FUNCTIONS, **_CONSTANTS}
+
+def _check(node: ast.AST):
+    if isinstance(node, ast.Expression):
+        return _check(node.body)
+    if isinstance(node, ast.Constant):
+        if type(node.value) not in (int, float):
+            raise ValueError(f"Unsupported constant {node.value!r}")
+    elif isinstance(node, ast.BinOp):
+        if not isinstance(node.op, _BIN_OPS):
+            raise ValueError(f"Unsupported operator {type(node.op).__name__}")
+        _check(node.left)
+        _check(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ValueError(f"Unsupported operator {type(node.op).__name__}")
+        _check(node.operand)
+    elif isinstance(node, ast.Name):
+        if node.id not in _NAMES:
+            raise ValueError(f"Unknown name '{node.id}'")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ValueError("Only calls to whitelisted math functions are allowed")
+        for arg in node.args:
+            _check(arg)
+    else:
+        raise ValueError(f"Unsupported syntax {type(node).__name__}")
+
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
+def compile_expression(expression: str):
+    """Parse, whitelist-check and compile an arithmetic expression (cached per process)."""
+    tree = ast.parse(expression.strip().replace("^", "**"), mode="eval")
+    _check(tree)
+    return compile(tree, "<calculator>", "eval")
+
+def calculator(expression: str = "0"):
+    return eval(compile_expression(expression), {"__builtins__": {}}, _NAMES)
+
+async def search(query: str = ""):
+    return f"Mock search results for '{query}'"
+
+# ---------------------------------------------------------------- engine
+
+@dataclass
+class Tool:
+    name: str
+    func: Callable
+    description: str = ""
+    timeout: float = TOOL_TIMEOUT_SECONDS
+    deterministic: bool = False     # same args -> same result, so results may be memoized
+    isolated: bool = False          # run in the worker process pool (func must be picklable)
+
+@dataclass
+class ToolCall:
+    name: str
+    args: dict
+
+@dataclass
+class ToolResult:
+    name: str
+    args: dict
+    output: object = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 class ToolInterface:
-    def execute_tool(self, tool_name: str, args: dict):
-        if tool_name == "calculator":
+    def __init__(self, timeout: float = TOOL_TIMEOUT_SECONDS, workers: int = TOOL_WORKERS,
+                 cache_size: int = TOOL_CACHE_SIZE, default_tools: bool = True):
+        self.timeout = timeout
+        self.workers = workers
+        self.cache_size = cache_size
+        self.tools = {}
+        self.metrics = {}
+        self._cache = OrderedDict()
+        self._pool = None
+        self._pool_calls = {}       # pool -> isolated calls still running on it
+        self._retired = set()       # pools with a runaway worker, killed when their last call ends
+        if default_tools:
+            self.register("calculator", calculator, "Evaluate an arithmetic expression: {\"expression\": \"17 * 23\"}",
+                          deterministic=True, isolated=True)
+            self.register("search", search, "Search for information: {\"query\": \"...\"}", deterministic=True)
+
+    def register(self, name: str, func: Callable = None, description: str = "", timeout: float = None,
+                 deterministic: bool = False, isolated: bool = False):
+        """Register `func` as tool `name`; without `func`, returns a decorator."""
+        if func is None:
+            def decorator(f):
+                self.register(name, f, description, timeout, deterministic, isolated)
+                return f
+            return decorator
+        if isolated and inspect.iscoroutinefunction(func):
+            raise ValueError(f"Async tool '{name}' cannot run in the process pool")
+        self.tools[name] = Tool(name, func, description or (func.__doc__ or "").strip(),
+                                timeout if timeout is not None else self.timeout, deterministic, isolated)
+        return self.tools[name]
+
+    def describe(self) -> str:
+        """One line per registered tool, for the executor prompt."""
+        return "\n".join(f"- {tool.name}: {tool.description}" for tool in self.tools.values())
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @staticmethod
+    def _kill_pool(pool: ProcessPoolExecutor):
+        """Terminate the worker processes (the only way to stop a runaway call)."""
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _retire_pool(self, pool: ProcessPoolExecutor):
+        """Send new calls to a fresh pool; kill `pool` now, or when its last running call ends."""
+        if self._pool is pool:
+            self._pool = None
+        if pool in self._pool_calls:
+            self._retired.add(pool)
+        else:
+            self._kill_pool(pool)
+
+    def _release_pool(self, pool: ProcessPoolExecutor):
+        self._pool_calls[pool] -= 1
+        if self._pool_calls[pool] == 0:
+            del self._pool_calls[pool]
+            if pool in self._retired:
+                self._retired.discard(pool)
+                self._kill_pool(pool)
+
+    async def _run(self, tool: Tool, args: dict, pool: ProcessPoolExecutor = None):
+        if inspect.iscoroutinefunction(tool.func):
+            return await tool.func(**args)
+        loop = asyncio.get_running_loop()
+        if pool is not None:
+            self._pool_calls[pool] = self._pool_calls.get(pool, 0) + 1
             try:
-                return eval(args.get("expression", "0"))
-            except:
-                return "Calculation error"
-        elif tool_name == "search":
-            return f"Mock search results for '{args.get('query', '')}'"
-        return "Unknown tool"
\ No newline at end of file
+                return await loop.run_in_executor(pool, functools.partial(tool.func, **args))
+            finally:
+                self._release_pool(pool)
+        return await loop.run_in_executor(None, functools.partial(tool.func, **args))
+
+    def _cache_key(self, name: str, args: dict) -> str:
+        return json.dumps([name, args], sort_keys=True, default=str)
+
+    async def call_async(self, name: str, args: dict = None) -> ToolResult:
+        args = args or {}
+        tool = self.tools.get(name)
+        if tool is None:
+            return ToolResult(name, args, error=f"Unknown tool '{name}'")
+        metrics = self.metrics.setdefault(name, {"calls": 0, "cache_hits": 0, "errors": 0, "timeouts": 0,
+                                                 "latencies": deque(maxlen=1024)})
+        metrics["calls"] += 1
+        key = self._cache_key(name, args) if tool.deterministic else None
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            metrics["cache_hits"] += 1
+            return ToolResult(name, args, self._cache[key], cached=True)
+
+        start = time.perf_counter()
+        result = ToolResult(name, args)
+        pool = self._process_pool() if tool.isolated else None
+        try:
+            result.output = await asyncio.wait_for(self._run(tool, args, pool), timeout=tool.timeout)
+        except asyncio.TimeoutError:
+            if pool is not None:
+                self._retire_pool(pool)
+            metrics["timeouts"] += 1
+            result.error = f"{name} timed out after {tool.timeout:g}s"
+        except BrokenProcessPool:
+            self._retire_pool(pool)
+            result.error = f"{name} worker was stopped"
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.latency = time.perf_counter() - start
+        metrics["latencies"].append(result.latency)
+        if result.error is not None:
+            metrics["errors"] += 1
+        elif key is not None:
+            self._cache[key] = result.output
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    async def call_many_async(self, calls: List[ToolCall]) -> List[ToolResult]:
+        """Run the calls of one step concurrently; results come back in call order."""
+        return list(await asyncio.gather(*(self.call_async(call.name, call.args) for call in calls)))
+
+    def call(self, name: str, args: dict = None) -> ToolResult:
+        """Blocking call_async() for code outside an event loop."""
+        return asyncio.run(self.call_async(name, args))
+
+    def execute_tool(self, tool_name: str, args: dict):
+        """Backwards-compatible entry point: the tool output, or an error string."""
+        result = self.call(tool_name, args)
+        return result.output if result.ok else f"Tool error: {result.error}"
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "calls": m["calls"],
+                "cache_hits": m["cache_hits"],
+                "errors": m["errors"],
+                "timeouts": m["timeouts"],
+                "latency_p50": percentile(list(m["latencies"]), 50),
+                "latency_p95": percentile(list(m["latencies"]), 95),
+            }
+            for name, m in self.metrics.items()
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        for pool in self._retired:
+            self._kill_pool(pool)
+        self._retired.clear()
+
+# ---------------------------------------------------------------- executor protocol
+
+# The executor asks the model to request tools as <tool>{"name": ..., "args": {...}}</tool>
+TOOL_CALL_PATTERN = re.compile(r"<tool>\s*(\{.*?\})\s*</tool>", re.DOTALL)
+
+def parse_tool_calls(text: str) -> List[ToolCall]:
+    calls = []
+    for match in TOOL_CALL_PATTERN.finditer(text):
+        try:
+            payload = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(payload, dict) and isinstance(payload.get("name"), str):
+            args = payload.get("args")
+            calls.append(ToolCall(payload["name"], args if isinstance(args, dict) else {}))
+    return calls
+
+def format_tool_results(results: List[ToolResult]) -> str:
+    lines = []
+    for result in results:
+        value = result.output if result.ok else f"ERROR {result.error}"
+        lines.append(f"{result.name}({json.dumps(result.args, sort_keys=True)}) -> {value}")
+    return "\n".join(lines)
+
+_tools = None
+
+def get_tool_interface() -> ToolInterface:
+    """Return the process-wide ToolInterface, creating it on first use."""
+    global _tools
+    if _tools is None:
+        _tools = ToolInterface()
+    return _tools
+
+def set_tool_interface(tools: Optional[ToolInterface]):
+    global _tools
+    _tools = tools
\ No newline at end of file
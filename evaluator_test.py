@@ -0,0 +1,122 @@
+"""
+Evaluator Test - Columnar analytics over experiment logs
+
+This test shows how the agentic AI system now:
+1. Loads step records into NumPy columns
+2. Answers convergence / strategy / ε-curve questions with vectorized aggregates
+3. Caches the columns on disk (memory-mapped) and exports reports as JSON/CSV
+4. Keeps the interleaved per-step loops of a plan-mode task apart
+"""
+
+import csv
+import os
+import tempfile
+from metrics.evaluator import ExperimentEvaluator
+from metrics.log_store import JSONLLogStore
+
+
+def _write_log(path):
+    # Task 0: semantic error, fixed on the retry. Task 1: tool error, never fixed.
+    store = JSONLLogStore(path, run_id="run-a")
+    store.append({"kind": "step", "step": 1, "attempt": 1, "epsilon": 0.8, "error_type": "semantic",
+                  "is_valid": False, "strategy": None, "duration": 1.0}, task_id=0)
+    store.append({"kind": "call", "phase": "execute"}, task_id=0)
+    store.append({"kind": "step", "step": 2, "attempt": 2, "epsilon": 0.1, "error_type": "none",
+                  "is_valid": True, "strategy": "retry_reasoning", "duration": 3.0}, task_id=0)
+    for step in (1, 2, 3):
+        store.append({"kind": "step", "step": step, "attempt": step, "epsilon": 0.9, "error_type": "tool",
+                      "is_valid": False, "strategy": None if step == 1 else "retry_tool_fix",
+                      "duration": 2.0}, task_id=1)
+    store.close()
+
+
+def test_vectorized_report():
+    """Test grouped aggregates on a tiny hand-checked log."""
+    print("=" * 70)
+    print("TEST 1: Vectorized Report")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    _write_log(path)
+    evaluator = ExperimentEvaluator()
+    table = evaluator.load_table(path)
+    report = evaluator.report(table)
+    
+    error_types = {row["error_type"]: row for row in report["error_types"]}
+    strategies = {row["strategy"]: row for row in report["strategies"]}
+    curve = {row["attempt"]: row for row in report["convergence_curve"]}
+    print(f"Steps: {len(table)}, error types: {error_types}")
+    assert len(table) == 5, "Call records must not be loaded as steps"
+    assert error_types["semantic"]["converged"] == 1 and error_types["semantic"]["mean_attempts_to_converge"] == 2
+    assert error_types["tool"]["convergence_rate"] == 0.0
+    assert strategies["retry_reasoning"]["acceptance_rate"] == 1.0
+    assert strategies["retry_tool_fix"]["attempts"] == 2
+    assert abs(curve[1]["mean_epsilon"] - 0.85) < 1e-6
+    assert report["latency"][0]["p50"] == 2.0
+    print("✅ PASSED: Aggregates match the log!\n")
+
+
+def test_mmap_cache_and_export():
+    """Test that a cached table is memory-mapped back and the report exports to CSV."""
+    print("=" * 70)
+    print("TEST 2: Memory-Mapped Cache + CSV Export")
+    print("=" * 70)
+    
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "logs.jsonl")
+    cache_dir = os.path.join(directory, "columns")
+    _write_log(path)
+    evaluator = ExperimentEvaluator()
+    
+    first = evaluator.load_table(path, cache_dir=cache_dir)
+    second = evaluator.load_table(path, cache_dir=cache_dir)
+    print(f"Reloaded column type: {type(second['epsilon']).__name__}")
+    assert type(second["epsilon"]).__name__ == "memmap", "Second load should map the cached columns"
+    assert (first["epsilon"] == second["epsilon"]).all()
+    
+    os.remove(path)
+    gone = evaluator.load_table(path, cache_dir=cache_dir)
+    print(f"Steps after the log was deleted: {len(gone)}")
+    assert len(gone) == 0, "A cache must not outlive the log it was built from"
+    _write_log(path)
+    
+    export = os.path.join(directory, "report.csv")
+    evaluator.analyze_log(path, cache_dir=cache_dir, export=export)
+    with open(export, newline="") as f:
+        sections = {row["section"] for row in csv.DictReader(f)}
+    assert {"error_types", "strategies", "convergence_curve", "latency"} <= sections
+    print("✅ PASSED: Columns are cached and reports export!\n")
+
+
+
+def test_plan_step_episodes():
+    """Test that concurrent plan-step loops sharing a task id count as separate episodes."""
+    print("=" * 70)
+    print("TEST 3: Plan-Step Episodes")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, run_id="run-a")
+    # Steps s1 and s2 of task 0 run concurrently, so their records interleave
+    for step, plan_step, valid in ((1, "s1", False), (1, "s2", False), (2, "s1", True), (2, "s2", True)):
+        store.append({"kind": "step", "step": step, "attempt": step, "epsilon": 0.1 if valid else 0.7,
+                      "error_type": "none" if valid else "semantic", "is_valid": valid,
+                      "plan_step": plan_step}, task_id=0)
+    store.append({"kind": "step", "step": 1, "attempt": 1, "epsilon": 0.1, "error_type": "none",
+                  "is_valid": True, "plan_step": "merge"}, task_id=0)
+    store.close()
+    
+    report = ExperimentEvaluator().report(ExperimentEvaluator().load_table(path))
+    error_types = {row["error_type"]: row for row in report["error_types"]}
+    print(f"Error types: {error_types}")
+    assert error_types["semantic"]["episodes"] == 2, "s1 and s2 are two loops, not three fragments"
+    assert error_types["semantic"]["mean_attempts_to_converge"] == 2
+    assert error_types["none"]["episodes"] == 1, "The merge loop is its own episode"
+    print("✅ PASSED: Plan-step loops are grouped apart!\n")
+
+
+if __name__ == "__main__":
+    test_vectorized_report()
+    test_mmap_cache_and_export()
+    test_plan_step_episodes()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
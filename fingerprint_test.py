@@ -0,0 +1,94 @@
+"""
+Fingerprint Test - Near-duplicate attempt detection
+
+This test shows how the agentic AI system now:
+1. Recognises exact and near-duplicate outputs with hashes + MinHash sketches
+2. Never treats an output with a corrected number as a duplicate
+3. Reuses a failed attempt's verdict instead of calling the validator again
+4. Escalates to an untried strategy and a higher temperature after a duplicate
+"""
+
+import asyncio
+import json
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.fingerprint import FingerprintIndex
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import ValidationResult, ErrorType
+
+set_log_store(None)
+
+ESSAY = ("The mitochondria is the powerhouse of the cell. It produces ATP through oxidative "
+         "phosphorylation across the inner membrane, using a proton gradient built by the electron "
+         "transport chain. This process yields most of the energy that eukaryotic cells need to "
+         "survive and divide.")
+
+
+def test_exact_and_near_duplicates():
+    """Test the index on exact repeats, small rewordings and corrected numbers."""
+    print("=" * 70)
+    print("TEST 1: Exact + Near-Duplicate Detection")
+    print("=" * 70)
+    
+    failed = ValidationResult(False, 0.8, ErrorType.SEMANTIC, "Too vague.")
+    index = FingerprintIndex(threshold=0.9)
+    index.add(ESSAY, failed, attempt=1)
+    index.add("The total is 41 apples.", failed, attempt=2)
+    
+    exact = index.find("  " + ESSAY.upper())
+    near = index.find(ESSAY.replace("yields", "provides"))
+    different = index.find("Photosynthesis converts light into chemical energy in chloroplasts.")
+    corrected = index.find("The total is 42 apples.")
+    
+    print(f"exact={exact.similarity:.2f}, near={near.similarity:.2f}, different={different}, corrected={corrected}")
+    assert exact.attempt == 1 and exact.similarity == 1.0
+    assert near is not None and near.validation is failed
+    assert different is None
+    assert corrected is None, "A changed number must always be judged again"
+    assert index.stats()["validations_skipped"] == 2
+    print("✅ PASSED: Duplicates found, real changes kept!\n")
+
+
+def test_duplicate_skips_validator_and_escalates():
+    """Test that a repeated output costs no judge call and changes strategy and temperature."""
+    print("=" * 70)
+    print("TEST 2: Skip Validation + Escalate")
+    print("=" * 70)
+    
+    judge_calls = []
+    
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            judge_calls.append(prompt)
+            if "Agent's output:\n4\n" in prompt:
+                return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+            return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Wrong number."})
+        # The executor keeps repeating itself until it is asked to ground its answer
+        return "4" if "Only state facts" in prompt else "5"
+    
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    logger = MetricsLogger()
+    state = asyncio.run(run_agentic_workflow_async("Calculate 2+2", logger=logger, verbose=False))
+    set_scheduler(previous_scheduler)
+    
+    history = [(h["strategy"], h["temperature"], h["duplicate"]) for h in state.history]
+    print(f"History: {history}")
+    print(f"Judge calls: {len(judge_calls)} for {state.attempt_count} attempts, {logger.summary['duplicates']}")
+    assert history[1] == ("retry_reasoning", None, True), "The plain retry repeats attempt 1"
+    assert history[2][0] == "retry_grounding" and history[2][1] == 0.7, "Escalation picks a new strategy, hotter"
+    assert state.validation_log[-1].is_valid, "The escalated strategy fixes the answer"
+    assert len(judge_calls) == state.attempt_count - 1, "The duplicate attempt must not reach the judge"
+    print("✅ PASSED: Repeats are caught and escalated!\n")
+
+
+if __name__ == "__main__":
+    test_exact_and_near_duplicates()
+    test_duplicate_skips_validator_and_escalates()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
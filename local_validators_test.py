@@ -0,0 +1,77 @@
+"""
+Local Validators Test - Deterministic checks before the LLM judge
+
+This test shows how the agentic AI system now:
+1. Accepts a numeric answer locally only when it is the single number in the output
+2. Rejects a single wrong number without a judge call
+3. Defers to the LLM judge when the output has no number or several candidates
+4. Short-circuits the validator chain on the first definitive verdict and counts saved judge calls
+"""
+
+from agents.local_validators import NumericAnswerValidator, build_local_validators
+from utils.types import ErrorType
+
+
+def test_numeric_accept_and_reject():
+    """Test that a single candidate number is decided locally."""
+    print("=" * 70)
+    print("TEST 1: Numeric Accept + Reject")
+    print("=" * 70)
+
+    validator = NumericAnswerValidator(1234.5)
+    for output in ["1,234.5", "The answer is 1234.5.", "1234.5, i.e. 1,234.50 in total"]:
+        verdict = validator.check("task", output)
+        print(f"{output!r:>40} -> valid={verdict.is_valid} ({verdict.feedback})")
+        assert verdict.is_valid and verdict.validated_by == "numeric"
+
+    verdict = validator.check("task", "The answer is 1200.")
+    print(f"{'The answer is 1200.'!r:>40} -> valid={verdict.is_valid} ({verdict.feedback})")
+    assert not verdict.is_valid and verdict.error_type == ErrorType.SEMANTIC and verdict.score == 1.0
+    print("✅ PASSED: One candidate number is accepted or rejected locally!\n")
+
+
+def test_numeric_defers_when_ambiguous():
+    """Test that outputs with zero or several numbers go to the judge."""
+    print("=" * 70)
+    print("TEST 2: Numeric Defer")
+    print("=" * 70)
+
+    validator = NumericAnswerValidator(42)
+    outputs = [
+        "The answer is forty-two.",
+        "The answer is 42 (checked in 2024).",
+        "Step 1: 6 * 7 = 42",
+        "It is 42 km, not 40 km.",
+        "Wrong: 41, or maybe 43",
+    ]
+    for output in outputs:
+        verdict = validator.check("task", output)
+        print(f"{output!r:>40} -> {verdict}")
+        assert verdict is None, "Ambiguous outputs are left to the LLM judge"
+    print("✅ PASSED: A correct answer next to other numbers is never hard-rejected!\n")
+
+
+def test_chain_short_circuit():
+    """Test that the chain stops at the first definitive verdict and counts judge calls saved."""
+    print("=" * 70)
+    print("TEST 3: Chain Short-Circuit")
+    print("=" * 70)
+
+    chain = build_local_validators({"max_chars": 40, "numeric_answer": 42})
+    outputs = ["", "x" * 60, "42", "41", "6 * 7 = 42"]
+    verdicts = [chain.run("What is 6 * 7?", output) for output in outputs]
+    tiers = [v.validated_by if v is not None else None for v in verdicts]
+    print(f"Tiers: {tiers}")
+    assert tiers == ["empty", "length", "numeric", "numeric", None]
+    assert chain.stats["numeric"]["checked"] == 3, "Empty and too-long outputs never reach the numeric check"
+    assert chain.stats["llm"]["checked"] == 1
+    print(f"Stats: {chain.stats}, saved {chain.calls_saved()}")
+    assert chain.calls_saved() == 4
+    print("✅ PASSED: The first definitive tier decides!\n")
+
+
+if __name__ == "__main__":
+    test_numeric_accept_and_reject()
+    test_numeric_defers_when_ambiguous()
+    test_chain_short_circuit()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Log Store Test - Append-only JSONL experiment logs
+
+This test shows how the agentic AI system now:
+1. Appends step records as they happen, tagged with run and task ids
+2. Keeps lines intact with many concurrent writers
+3. Rotates the log file and still reads every record back in order
+4. Flushes a partly filled buffer on a timer, without waiting for another append
+"""
+
+import os
+import tempfile
+import threading
+import time
+from metrics.log_store import JSONLLogStore, read_records
+from metrics.evaluator import ExperimentEvaluator
+
+
+def test_records_are_tagged_and_readable():
+    """Test that records land on disk with run/task ids and can be streamed back."""
+    print("=" * 70)
+    print("TEST 1: Tagged Append-Only Records")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, run_id="run-a", flush_records=2)
+    store.append({"kind": "step", "step": 1, "epsilon": 0.8}, task_id=7)
+    store.append({"kind": "step", "step": 2, "epsilon": 0.1}, task_id=7)
+    store.append({"kind": "call", "phase": "execute"}, task_id=7)
+    
+    on_disk = list(read_records(path))
+    print(f"On disk before flush: {len(on_disk)} records")
+    assert len(on_disk) == 2, "The first two records should be written once the buffer fills"
+    
+    store.close()
+    steps = list(ExperimentEvaluator().load_steps(path, run_id="run-a"))
+    print(f"Steps read back: {steps}")
+    assert [s["step"] for s in steps] == [1, 2]
+    assert all(s["run_id"] == "run-a" and s["task_id"] == 7 for s in steps)
+    print("✅ PASSED: Records are appended and tagged!\n")
+
+
+def test_concurrent_writers_and_rotation():
+    """Test that concurrent writers never tear lines and rotated files are read back."""
+    print("=" * 70)
+    print("TEST 2: Concurrent Writers + Rotation")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, flush_records=5, max_bytes=4000, backup_count=50)
+    
+    def writer(task_id):
+        for step in range(50):
+            store.append({"kind": "step", "step": step, "payload": "x" * 20}, task_id=task_id)
+    
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+    
+    records = list(read_records(path))
+    print(f"Records: {len(records)}, rotations: {store.rotations}")
+    assert len(records) == 200, "No record may be lost or torn"
+    assert store.rotations > 0, "The small max_bytes should force rotation"
+    for task_id in range(4):
+        steps = [r["step"] for r in records if r["task_id"] == task_id]
+        assert steps == list(range(50)), "Each writer's records stay in order across rotated files"
+    print("✅ PASSED: Concurrent appends survive rotation!\n")
+
+
+
+def test_quiet_store_flushes_on_timer():
+    """Test that a record reaches disk within the fsync interval even if nothing else is appended."""
+    print("=" * 70)
+    print("TEST 3: Timer-Driven Flush")
+    print("=" * 70)
+    
+    path = os.path.join(tempfile.mkdtemp(), "logs.jsonl")
+    store = JSONLLogStore(path, flush_records=100, fsync_interval=0.05)
+    store.append({"kind": "step", "step": 1}, task_id=0)
+    assert list(read_records(path)) == [], "A single record stays buffered at first"
+    
+    deadline = time.monotonic() + 2.0
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    records = list(read_records(path))
+    print(f"On disk after the interval: {len(records)} records, stats: {store.stats()}")
+    assert [r["step"] for r in records] == [1], "The flusher thread should write the pending record"
+    
+    store.close()
+    assert not store._flusher.is_alive(), "close() stops the flusher thread"
+    print("✅ PASSED: Quiet stores still reach disk!\n")
+
+
+if __name__ == "__main__":
+    test_records_are_tagged_and_readable()
+    test_concurrent_writers_and_rotation()
+    test_quiet_store_flushes_on_timer()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
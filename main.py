@@ -1,81 +1,690 @@
+import argparse
+import asyncio
+import json
 import time
+from dataclasses import replace
 from agents.executor import ExecutorAgent
+from agents.planner import PlannerAgent
+from agents.local_validators import build_local_validators
+from agents.validation_cascade import get_judge_cascade
 from agents.validator import ValidatorAgent
+from agents.constraints import build_constraints, check_constraints, format_violation
+from agents.validation_batcher import ValidationBatcher
+from backends.cassette import Cassette, RecordingBackend, ReplayBackend, replay_scheduler
+from backends.registry import get_backend, set_backend
+from config import (BATCH_CONCURRENCY, BATCH_SUMMARY_PATH, CASCADE_ENABLED, CASSETTE_LATENCY, CASSETTE_SPEED,
+                    CHECKPOINT_DB_PATH, CHECKPOINT_ENABLED, DEDUP_ENABLED,
+                    DELTA_MODE, EXECUTOR_STREAMING, PLAN_MODE, POLICY_MODE, SPECULATIVE_MODE, STATE_LOG_LIMIT,
+                    TERMINATION_EARLY_STOP, TOOLS_ENABLED, VALIDATOR_BATCH_SIZE)
+from correction.adaptive_policy import credit_step, get_adaptive_policy, task_features
 from correction.policy import CorrectionPolicy
+from correction.speculative import SpeculativeExecutor
 from correction.termination import TerminationController
-from metrics.logger import MetricsLogger
-from utils.types import AgentState
-
-def run_agentic_workflow(user_task: str):
-    executor = ExecutorAgent()
-    validator = ValidatorAgent()
-    policy = CorrectionPolicy()
-    terminator = TerminationController()
-    logger = MetricsLogger()
+from environment.tool_interace import ToolInterface, get_tool_interface
+from metrics.events import emit, span
+from metrics.exporters import console_output, tracing
+from metrics.logger import CallRollup, MetricsLogger
+from utils.cache import set_response_cache
+from utils.checkpoint import CheckpointStore, checkpoint_key
+from utils.fingerprint import FingerprintIndex
+from utils.llm import set_call_recorder
+from utils.rate_limiter import set_scheduler
+from utils.types import AgentState, ErrorType
 
-    state = AgentState(task=user_task)
-    feedback = None
-    current_strategy = None
-    consecutive_rate_limits = 0  # Track consecutive rate limit errors for backoff
+def log(message: str = ""):
+    """Progress line for the console: a "log" event, printed by ConsoleSubscriber under a verbose workflow."""
+    emit("log", message=message)
 
-    print(f"🚀 Starting Self-Correcting Agent: {user_task}\n")
+async def run_agentic_workflow_async(user_task: str, logger: MetricsLogger = None, verbose: bool = True,
+                                     constraints: dict = None, streaming: bool = EXECUTOR_STREAMING,
+                                     validators: dict = None, speculative: bool = SPECULATIVE_MODE,
+                                     validation_batcher: ValidationBatcher = None,
+                                     policy_mode: str = POLICY_MODE, dedup: bool = DEDUP_ENABLED,
+                                     checkpoint: CheckpointStore = None, checkpoint_id: str = None,
+                                     tools: ToolInterface = None, delta: bool = DELTA_MODE,
+                                     cascade: bool = CASCADE_ENABLED,
+                                     early_stop: bool = TERMINATION_EARLY_STOP) -> AgentState:
+    """
+    Run one self-correction loop on the async client and return the final AgentState.
+    `constraints` is a declarative spec (see agents.constraints.build_constraints). With
+    `streaming`, the executor output is checked chunk by chunk and cancelled on the first
+    violation; otherwise the finished output is checked before it reaches the validator.
+    `validators` declares the task's local pre-validators (see
+    agents.local_validators.build_local_validators), which run before the LLM judge.
+    With `speculative`, every attempt fires several candidates at once (see
+    correction.speculative.SpeculativeExecutor) and keeps the first accepted one, until
+    the task's speculative call budget is spent.
+    With `policy_mode="adaptive"` retry strategies are chosen by the shared learned policy
+    (see correction.adaptive_policy) and every judged retry updates it.
+    With `dedup`, an output that repeats (or nearly repeats) an earlier failed attempt
+    reuses that attempt's verdict instead of calling the validator, and the policy
+    escalates to an untried strategy and a higher temperature (see utils.fingerprint).
+    A shared `validation_batcher` packs judge calls from concurrent workflows together
+    (a shared request is recorded by the workflow that flushed it).
+    With a `checkpoint` store, the state is snapshotted under `checkpoint_id` after every
+    attempt; a finished snapshot is returned without any model call and an unfinished
+    one continues from its next attempt, with the termination trajectory and the dedup
+    fingerprints of the attempts before it.
+    With `tools` (default: the shared ToolInterface when TOOLS_ENABLED), the non-streaming
+    executor may request tool calls, which run concurrently between its model calls.
+    With `delta`, a non-streaming, non-speculative retry of a long output asks for edits
+    to the rejected output and applies them locally (see ExecutorAgent.execute).
+    With `cascade`, the judge is the shared two-tier JudgeCascade (see
+    agents.validation_cascade): a cheap model decides clear cases, the full validator the rest.
+    With `early_stop`, the loop ends early once ε stops converging. A loop that ends without
+    accepting its last attempt returns its best one (see correction.termination).
+    Every model request made by this workflow is reported to `logger.log_call()`.
+    """
+    with console_output(verbose), span("workflow", task=user_task[:200], verbose=verbose) as workflow_span:
+        if tools is None and TOOLS_ENABLED:
+            tools = get_tool_interface()
+        executor = ExecutorAgent(tools=tools)
+        validator = ValidatorAgent(cascade=get_judge_cascade() if cascade else None)
+        policy = get_adaptive_policy() if policy_mode == "adaptive" else CorrectionPolicy()
+        terminator = TerminationController(early_stop=early_stop)
+        logger = logger if logger is not None else MetricsLogger()
+        set_call_recorder(logger)
 
-    while True:
-        start_time = time.time()
-        state.attempt_count += 1
-        print(f"--- Attempt {state.attempt_count} ---")
+        output_constraints = build_constraints(constraints)
+        local_validators = build_local_validators(validators)
+        state = AgentState.create(user_task, STATE_LOG_LIMIT)
+        speculator = SpeculativeExecutor() if speculative else None
+        fingerprints = FingerprintIndex() if dedup else None
+        feedback = None
+        current_strategy = None
+        current_temperature = None
+        last_error = None       # error type the current retry strategy is meant to fix
+        features = task_features(user_task)
+
+        saved = checkpoint.load(checkpoint_id) if checkpoint is not None else None
+        if saved is not None:
+            state = saved.state
+            logger.summary["checkpoint"] = {"resumed_after_attempt": state.attempt_count, "status": saved.status}
+            terminator.restore(saved.progress.get("termination"))
+            if fingerprints is not None:
+                fingerprints.restore(saved.progress.get("fingerprints"))
+            if saved.finished:
+                log(f"⏭️ Already finished ({saved.status}) after {state.attempt_count} attempts - skipping.")
+                logger.log_termination(terminator, state)
+                return state
+            feedback = saved.progress.get("feedback")
+            current_strategy = saved.progress.get("strategy")
+            current_temperature = saved.progress.get("temperature")
+            last_error = ErrorType(saved.progress["last_error"]) if saved.progress.get("last_error") else None
+            log(f"↩️ Resuming after attempt {state.attempt_count}")
+
+        def _snapshot(status="running"):
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_id, state, {
+                    "feedback": feedback, "strategy": current_strategy, "temperature": current_temperature,
+                    "last_error": last_error.value if last_error is not None else None,
+                    "termination": terminator.progress(),
+                    "fingerprints": fingerprints.progress() if fingerprints is not None else None,
+                }, status=status)
+
+        async def _attempt(strategy, temperature=None):
+            if streaming:
+                result = await executor.execute_stream_async(state.task, feedback, strategy=strategy,
+                                                             constraints=output_constraints, temperature=temperature)
+            else:
+                previous = state.current_result if delta and speculator is None else None
+                result = await executor.execute_async(state.task, feedback, strategy=strategy, temperature=temperature,
+                                                      previous=previous)
+                violation = check_constraints(result, output_constraints, final=True)
+                if violation:
+                    result = format_violation(violation)
+            # A patched output is a near-copy of the rejected one by design; only an exact repeat counts
+            patched = executor.last_delta is not None and executor.last_delta["applied"] and not streaming
+            duplicate = fingerprints.find(result, near=not patched) if fingerprints is not None else None
+            if duplicate is not None:
+                validation = replace(duplicate.validation, validated_by="duplicate",
+                                     feedback=f"Your answer repeated failed attempt {duplicate.attempt} "
+                                              f"(similarity {duplicate.similarity:.2f}) - take a different approach. "
+                                              f"{duplicate.validation.feedback}")
+                emit("validation.duplicate", of_attempt=duplicate.attempt, similarity=duplicate.similarity)
+                return result, validation
+            with span("validation", batched=validation_batcher is not None) as validation_span:
+                if validation_batcher is not None:
+                    validation = await validation_batcher.validate(state.task, result, local_validators=local_validators)
+                else:
+                    validation = await validator.validate_async(state.task, result, local_validators=local_validators)
+                validation_span.set(validated_by=validation.validated_by, score=validation.score,
+                                    error_type=validation.error_type.value)
+            return result, validation
 
-        result = executor.execute(state.task, feedback)
-        result = executor.execute(state.task, feedback, strategy=current_strategy)
-        state.current_result = result
-        print(f"🤖 Output: {result[:120]}{'...' if len(result) > 120 else ''}\n")
+        log(f"🚀 Starting Self-Correcting Agent: {user_task}\n")
 
-        validation = validator.validate(state.task, result)
-        state.validation_log.append(validation)
+        while True:
+            start_time = time.time()
+            state.attempt_count += 1
+            with span("attempt", attempt=state.attempt_count, strategy=current_strategy) as attempt_span:
+                log(f"--- Attempt {state.attempt_count} ---")
 
-        print(f"🔍 Validator → ε = {validation.score:.3f} | Type: {validation.error_type.value}")
-        print(f"   Feedback: {validation.feedback}\n")
+                step_extra = {"strategy": current_strategy, "task_features": features}
+                # A speculator whose call budget is spent falls back to normal single attempts
+                width = speculator.width() if speculator is not None else 0
+                if width:
+                    last_validation = state.validation_log[-1] if state.validation_log else None
+                    strategies = policy.candidate_strategies(last_validation, width, task=state.task)
+                    spec_round = await speculator.run_round(_attempt, strategies)
+                    result, validation = spec_round.result, spec_round.validation
+                    step_extra.update(logger.log_speculative_round(spec_round), strategy=spec_round.strategy)
+                    log(f"🎲 Speculative: {spec_round.candidates} candidates, winner strategy={spec_round.strategy}, "
+                        f"{spec_round.cancelled} cancelled, saved {spec_round.time_saved:.1f}s for {spec_round.extra_calls} extra calls")
+                else:
+                    result, validation = await _attempt(current_strategy, current_temperature)
+                    if executor.last_delta is not None:
+                        step_extra["delta"] = executor.last_delta
 
-        logger.log_step(len(state.validation_log), state, time.time() - start_time)
+                state.current_result = result
+                state.validation_log.append(validation)
+                terminator.observe(state.attempt_count, result, validation)
+                state.history.append({"attempt": state.attempt_count, "strategy": step_extra["strategy"],
+                                      "temperature": current_temperature, "duplicate": validation.validated_by == "duplicate"})
+                # Index judged failures so a later retry that repeats one can skip the validator
+                if (fingerprints is not None and not validation.is_valid and validation.error_type != ErrorType.RATE_LIMIT
+                        and validation.validated_by not in ("precheck", "duplicate")):
+                    fingerprints.add(result, validation, state.attempt_count)
+                log(f"🤖 Output: {result[:120]}{'...' if len(result) > 120 else ''}\n")
 
-        action = policy.decide_action(state, validation)
-        print(f"⚖️ Decision → {action}\n")
+                log(f"🔍 Validator [{validation.validated_by}] → ε = {validation.score:.3f} | Type: {validation.error_type.value}")
+                log(f"   Feedback: {validation.feedback}\n")
 
-        if terminator.should_terminate(action):
-            if action == "accept":
-                print("✅ SUCCESS — Perfect result accepted!")
+                logger.log_step(state.attempt_count, state, time.time() - start_time, extra=step_extra)
+
+                # Credit the strategy with this attempt's outcome (rate-limited attempts were never judged)
+                credited, last_error = credit_step(last_error, validation.error_type, step_extra["strategy"])
+                if credited is not None:
+                    policy.record_outcome(state.task, credited, step_extra["strategy"], validation.is_valid,
+                                          logger.logs[-1]["model_calls"])
+
+                action = policy.decide_action(state, validation)
+                attempt_span.set(validated_by=validation.validated_by, score=validation.score,
+                                 error_type=validation.error_type.value, action=action)
+                emit("policy.decision", action=action, error_type=validation.error_type.value,
+                     strategy=step_extra["strategy"], policy=policy_mode)
+                log(f"⚖️ Decision → {action}\n")
+
+            if terminator.should_terminate(action, state):
+                verdict, accepted = terminator.finish(state)
+                if terminator.returned_best:
+                    log(f"🏅 Returning the best attempt ({terminator.best_attempt}, ε = {verdict.score:.3f})")
+                _snapshot(terminator.reason)
+                if action == "accept":
+                    log("✅ SUCCESS — Perfect result accepted!")
+                elif terminator.reason == "accept_good_enough":
+                    log("🆗 GOOD ENOUGH — Best result is close to the threshold and few attempts remain.")
+                elif terminator.reason in ("stop_plateau", "stop_trend"):
+                    log(f"🛑 STOPPED EARLY — ε is not converging ({terminator.reason}).")
+                else:
+                    log("❌ FAILED — Max retries reached.")
+                emit("termination", reason=terminator.reason, attempts=state.attempt_count,
+                     best_attempt=terminator.best_attempt)
+                break
+
+            # Rate limiting: the shared scheduler has already paused this model for every
+            # caller (server retry hint + backoff), so the next call simply waits its turn.
+            # Keep the previous feedback/strategy - the output itself was never judged.
+            if action == "wait_and_retry":
+                log(f"⏳ Rate Limited! Scheduler is pacing calls (server hint: {validation.retry_delay_seconds:.1f}s)...\n")
             else:
-                print("❌ FAILED — Max retries reached.")
-            break
-
-        # Handle rate limiting with exponential backoff
-        if action == "wait_and_retry":
-            consecutive_rate_limits += 1
-            # Extract retry delay from validation result
-            retry_delay = validation.retry_delay_seconds
-            
-            # Apply exponential backoff multiplier (1.5x for each consecutive rate limit)
-            backoff_multiplier = 1.5 ** (consecutive_rate_limits - 1)
-            total_delay = retry_delay * backoff_multiplier
-            
-            print(f"⏳ Rate Limited! Waiting {total_delay:.1f} seconds (base: {retry_delay:.1f}s, backoff: {backoff_multiplier:.1f}x)...")
-            time.sleep(total_delay)
-            print(f"✓ Ready to retry!\n")
-            
-            feedback = validation.feedback
+                feedback = validation.feedback
+                # The action string (e.g., "retry_reasoning") becomes the strategy
+                current_strategy = action
+                current_temperature = policy.escalation_temperature(state)
+            _snapshot()
+
+        logger.log_validation_tiers(local_validators)
+        logger.log_judge_replies(validator)
+        logger.log_policy(policy)
+        logger.log_termination(terminator, state)
+        if tools is not None:
+            logger.log_tool_stats(tools)
+        if delta:
+            logger.log_delta(executor)
+        if fingerprints is not None:
+            logger.log_duplicates(fingerprints)
+        logger.log_call_summary(accepted=accepted)
+        workflow_span.set(attempts=state.attempt_count, accepted=accepted)
+        return state
+
+def _accepted(state: AgentState, logger: MetricsLogger) -> bool:
+    """Whether the answer a loop handed back was accepted, as its TerminationController decided."""
+    termination = logger.summary.get("termination")
+    if termination is not None:
+        return termination["accepted"]
+    return bool(state.validation_log) and state.validation_log[-1].is_valid
+
+def _add_reply_stats(totals: dict, stats: dict):
+    """Add one workflow's judge reply counts (see MetricsLogger.log_judge_replies) to batch totals."""
+    for key, value in stats.items():
+        if key == "repairs":
+            for repair, count in value.items():
+                totals["repairs"][repair] = totals["repairs"].get(repair, 0) + count
         else:
-            # Reset rate limit counter for non-rate-limit errors
-            consecutive_rate_limits = 0
-            feedback = validation.feedback
-            # The action string (e.g., "retry_step_by_step") becomes the strategy
-            current_strategy = action
+            totals[key] += value
+
+def _step_prompt(user_task: str, step, outputs: dict) -> str:
+    prompt = f"{step.task}\n\n(This is one step of a larger task: {user_task})"
+    if step.depends_on:
+        prompt += "\n\nResults of the steps it builds on:\n" + "\n".join(f"[{d}] {outputs[d]}" for d in step.depends_on)
+    return prompt
+
+def _merge_prompt(user_task: str, graph, outputs: dict) -> str:
+    results = "\n\n".join(f"[{step.id}] {step.task}\n{outputs[step.id]}" for step in graph.steps)
+    return (f"Combine the step results below into one complete, consistent answer to the task.\n\n"
+            f"Task: {user_task}\n\nStep results:\n{results}")
+
+async def run_plan_workflow_async(user_task: str, logger: MetricsLogger = None, verbose: bool = True,
+                                  constraints: dict = None, streaming: bool = EXECUTOR_STREAMING,
+                                  validators: dict = None, validation_batcher: ValidationBatcher = None,
+                                  policy_mode: str = POLICY_MODE, planner: PlannerAgent = None,
+                                  delta: bool = DELTA_MODE, cascade: bool = CASCADE_ENABLED,
+                                  early_stop: bool = TERMINATION_EARLY_STOP) -> AgentState:
+    """
+    Plan-then-execute: the planner splits the task into a step graph (see
+    agents.planner), every step runs its own correction loop as soon as the steps it
+    depends on are done (independent steps run concurrently), and a final merge loop
+    combines the step results. Only a failing step is retried, never the whole answer.
+    `constraints` and `validators` apply to the merged answer. A task the planner does
+    not split (or could not plan, e.g. on a provider error) runs as a plain
+    run_agentic_workflow_async(). Returns the merge loop's state.
+    """
+    with console_output(verbose), span("plan_workflow", task=user_task[:200], verbose=verbose) as workflow_span:
+        logger = logger if logger is not None else MetricsLogger()
+        set_call_recorder(logger)
+        planner = planner if planner is not None else PlannerAgent()
+        start_time = time.time()
+
+        with span("plan") as plan_span:
+            try:
+                graph, plan_cached = await planner.create_step_graph_async(user_task)
+            except Exception as e:
+                # The planner is an optimization: a failed planning call must not fail the task
+                log(f"⚠️ Planning failed ({type(e).__name__}: {e})")
+                graph, plan_cached = None, False
+                plan_span.set(error=type(e).__name__)
+            plan_span.set(steps=len(graph.steps) if graph is not None else 0, cached=plan_cached)
+        if graph is None or len(graph.steps) < 2:
+            log("🗺️ Planner did not split the task - running it as one step\n")
+            return await run_agentic_workflow_async(user_task, logger=logger, verbose=verbose, constraints=constraints,
+                                                    streaming=streaming, validators=validators,
+                                                    validation_batcher=validation_batcher, policy_mode=policy_mode,
+                                                    delta=delta, cascade=cascade,
+                                                    early_stop=early_stop)
+        log(f"🗺️ Plan{' (memoized)' if plan_cached else ''}: "
+            + ", ".join(f"{s.id}{'<-' + '+'.join(s.depends_on) if s.depends_on else ''}" for s in graph.steps) + "\n")
+
+        def _absorb(step_id: str, state: AgentState, step_logger: MetricsLogger) -> dict:
+            # Fold the sub-loop's records into this workflow's logger (they are already in the log store)
+            logger.calls.extend(step_logger.calls)
+            logger.logs.extend(step_logger.logs)
+            return {"id": step_id, "attempts": state.attempt_count, "accepted": _accepted(state, step_logger),
+                    "duration": sum(entry["duration"] for entry in step_logger.logs)}
+
+        async def _run_step(step):
+            step_logger = MetricsLogger(task_id=logger.task_id, plan_step=step.id)
+            with span("plan_step", step=step.id, depends_on=",".join(step.depends_on)):
+                state = await run_agentic_workflow_async(_step_prompt(user_task, step, outputs), logger=step_logger,
+                                                         verbose=False, streaming=streaming,
+                                                         validation_batcher=validation_batcher,
+                                                         policy_mode=policy_mode, delta=delta, cascade=cascade,
+                                                         early_stop=early_stop)
+            return step, state, step_logger
+
+        outputs = {}
+        step_stats = []
+        pending = list(graph.steps)
+        running = set()
+        while pending or running:
+            for step in [s for s in pending if all(d in outputs for d in s.depends_on)]:
+                pending.remove(step)
+                running.add(asyncio.ensure_future(_run_step(step)))
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                step, state, step_logger = finished.result()
+                outputs[step.id] = state.current_result or ""
+                stats = _absorb(step.id, state, step_logger)
+                step_stats.append(stats)
+                log(f"{'✅' if stats['accepted'] else '❌'} [{step.id}] {stats['attempts']} attempt(s): "
+                    f"{outputs[step.id][:80]}{'...' if len(outputs[step.id]) > 80 else ''}")
+
+        merge_logger = MetricsLogger(task_id=logger.task_id, plan_step="merge")
+        state = await run_agentic_workflow_async(_merge_prompt(user_task, graph, outputs), logger=merge_logger,
+                                                 verbose=False, constraints=constraints, streaming=streaming,
+                                                 validators=validators, validation_batcher=validation_batcher,
+                                                 policy_mode=policy_mode, delta=delta, cascade=cascade,
+                                                 early_stop=early_stop)
+        merge_stats = _absorb("merge", state, merge_logger)
+        logger.summary["termination"] = merge_logger.summary["termination"]
+        set_call_recorder(logger)
+        log(f"{'✅' if merge_stats['accepted'] else '❌'} [merge] {merge_stats['attempts']} attempt(s)\n")
+
+        logger.summary["plan"] = {
+            "steps": len(graph.steps),
+            "plan_cached": plan_cached,
+            "step_attempts": sum(s["attempts"] for s in step_stats),
+            "retried_steps": sum(1 for s in step_stats if s["attempts"] > 1),
+            "merge_attempts": merge_stats["attempts"],
+            "wall_seconds": time.time() - start_time,
+            "step_seconds": sum(s["duration"] for s in step_stats),     # what running the steps one by one would take
+            "per_step": step_stats + [merge_stats],
+        }
+        logger.log_call_summary(accepted=merge_stats["accepted"])
+        workflow_span.set(steps=len(graph.steps), accepted=merge_stats["accepted"])
+        return state
 
+def run_agentic_workflow(user_task: str, constraints: dict = None, streaming: bool = EXECUTOR_STREAMING,
+                         validators: dict = None, speculative: bool = SPECULATIVE_MODE, policy_mode: str = POLICY_MODE,
+                         plan: bool = PLAN_MODE, delta: bool = DELTA_MODE, cascade: bool = CASCADE_ENABLED,
+                         early_stop: bool = TERMINATION_EARLY_STOP):
+    logger = MetricsLogger()
+    if plan:
+        state = asyncio.run(run_plan_workflow_async(user_task, logger=logger, constraints=constraints,
+                                                    streaming=streaming, validators=validators,
+                                                    policy_mode=policy_mode, delta=delta, cascade=cascade,
+                                                    early_stop=early_stop))
+    else:
+        state = asyncio.run(run_agentic_workflow_async(user_task, logger=logger, constraints=constraints,
+                                                       streaming=streaming, validators=validators,
+                                                       speculative=speculative, policy_mode=policy_mode, delta=delta,
+                                                       cascade=cascade,
+                                                       early_stop=early_stop))
+    if policy_mode == "adaptive":
+        get_adaptive_policy().save()
+
+    cache_stats = logger.log_cache_stats()
+    logger.log_resilience_stats()
+    cascade_stats = logger.log_cascade(get_judge_cascade()) if cascade else None
     logger.save()
     eff = logger.calculate_efficiency()
     print(f"📊 Correction Efficiency: {eff:.4f} (higher = better self-correction)")
+    calls = logger.summary["calls"]
+    print(f"💰 {calls['model_calls']} model calls, {calls['total_tokens']} tokens, ${calls['cost_usd']:.4f} "
+          f"({calls['rate_limit_wait_seconds']:.1f}s waiting on rate limits)")
+    if "hit_rate" in cache_stats:
+        print(f"💾 Cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / {cache_stats['misses']} misses")
+    if cascade_stats is not None:
+        _print_cascade(cascade_stats)
     return state.current_result
 
+def _print_cascade(stats: dict):
+    band = stats["agreement"]["uncertain"]
+    print(f"🪜 Judge cascade: {stats['fast_decided']}/{stats['judged']} decided by {stats['model']} "
+          f"(escalated: {stats['escalated']}); fast p50 {stats['latency']['fast_p50']:.2f}s vs "
+          f"full p50 {stats['latency']['strong_p50']:.2f}s"
+          + (f"; in-band agreement {band['verdict_agreement']:.0%}" if band["compared"] else ""))
+
+async def run_batch(tasks, concurrency: int = BATCH_CONCURRENCY, streaming: bool = EXECUTOR_STREAMING,
+                    speculative: bool = SPECULATIVE_MODE, validator_batch_size: int = VALIDATOR_BATCH_SIZE,
+                    validation_batcher: ValidationBatcher = None, policy_mode: str = POLICY_MODE,
+                    checkpoint: CheckpointStore = None, plan: bool = PLAN_MODE, delta: bool = DELTA_MODE,
+                    cascade: bool = CASCADE_ENABLED,
+                    early_stop: bool = TERMINATION_EARLY_STOP):
+    """
+    Run many correction loops at once, never more than `concurrency` in flight.
+    `tasks` may be any iterable (it is consumed lazily) of task strings or task specs
+    ({"task": ..., "constraints": {...}, "validators": {...}}). Yields (task_id, state, logger) as each
+    workflow finishes, so results stream back in completion order; every task gets
+    its own MetricsLogger. With `validator_batch_size` > 1, judge calls from concurrent
+    workflows are micro-batched into shared requests (pass `validation_batcher` to
+    supply or inspect the batcher). With a `checkpoint` store every task is snapshotted
+    after each attempt, and tasks it already holds are skipped or resumed. With `plan`,
+    every task runs as a step graph (see run_plan_workflow_async; not checkpointed).
+    A task whose workflow raises is yielded as failed (an [EXECUTION_ERROR] result and
+    `logger.summary["error"]`); the rest of the batch keeps running.
+    """
+    if validation_batcher is None and validator_batch_size > 1:
+        validation_batcher = ValidationBatcher(ValidatorAgent(cascade=get_judge_cascade() if cascade else None),
+                                               max_batch=validator_batch_size)
+
+    async def _workflow(task_id: int, task, spec: dict, logger: MetricsLogger) -> AgentState:
+        if plan:
+            return await run_plan_workflow_async(spec["task"], logger=logger, verbose=False,
+                                                 constraints=spec.get("constraints"), streaming=streaming,
+                                                 validators=spec.get("validators"),
+                                                 validation_batcher=validation_batcher, policy_mode=policy_mode,
+                                                 delta=delta, cascade=cascade,
+                                                 early_stop=early_stop)
+        return await run_agentic_workflow_async(spec["task"], logger=logger, verbose=False,
+                                                constraints=spec.get("constraints"), streaming=streaming,
+                                                validators=spec.get("validators"), speculative=speculative,
+                                                validation_batcher=validation_batcher, policy_mode=policy_mode,
+                                                checkpoint=checkpoint, checkpoint_id=checkpoint_key(task_id, task),
+                                                delta=delta, cascade=cascade,
+                                                early_stop=early_stop)
+
+    async def _run(task_id: int, task):
+        spec = task if isinstance(task, dict) else {"task": task}
+        logger = MetricsLogger(task_id=task_id)
+        try:
+            state = await _workflow(task_id, task, spec, logger)
+        except Exception as e:
+            # One failing task must not take the rest of the batch down with it
+            state = AgentState.create(spec["task"], STATE_LOG_LIMIT)
+            state.current_result = f"[EXECUTION_ERROR] {type(e).__name__}: {str(e)[:150]}"
+            logger.summary["error"] = {"type": type(e).__name__, "message": str(e)[:500]}
+        return task_id, state, logger
+
+    pending_tasks = iter(enumerate(tasks))
+    in_flight = set()
+
+    def _fill():
+        while len(in_flight) < concurrency:
+            try:
+                task_id, task = next(pending_tasks)
+            except StopIteration:
+                return
+            in_flight.add(asyncio.ensure_future(_run(task_id, task)))
+
+    _fill()
+    try:
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                yield finished.result()
+            _fill()
+    finally:
+        # The consumer stopped early (or was cancelled): nothing else will collect these
+        for unfinished in in_flight:
+            unfinished.cancel()
+
+def load_tasks(path: str):
+    """
+    Yield one task per non-empty line of a text file. Lines that are JSON objects are
+    task specs, e.g. {"task": "...", "constraints": {"max_chars": 500}, "validators": {"json": true}}.
+    """
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line) if line.startswith("{") else line
+
+async def _run_batch_cli(path: str, concurrency: int, streaming: bool, speculative: bool, validator_batch_size: int,
+                         policy_mode: str = POLICY_MODE, resume: bool = False, plan: bool = PLAN_MODE,
+                         delta: bool = DELTA_MODE, cascade: bool = CASCADE_ENABLED,
+                         early_stop: bool = TERMINATION_EARLY_STOP):
+    call_rollup = CallRollup()
+    tier_totals = {}
+    delta_totals = {}
+    reply_totals = {"replies": 0, "clean": 0, "repaired": 0, "failures": 0, "reasks": 0, "reask_recovered": 0,
+                    "repairs": {}}
+    fast_reply_totals = {"replies": 0, "clean": 0, "repaired": 0, "failures": 0, "repairs": {}}
+    termination_totals = {"early_stops": {}, "attempts_saved": 0, "calls_saved": 0.0, "returned_best": 0,
+                          "audits": 0, "audits_accepted_later": 0}
+    llm_calls_saved = 0
+    accepted = 0
+    total = 0
+    failed = 0
+    batcher = (ValidationBatcher(ValidatorAgent(cascade=get_judge_cascade() if cascade else None),
+                                 max_batch=validator_batch_size) if validator_batch_size > 1 else None)
+    checkpoint = CheckpointStore(CHECKPOINT_DB_PATH) if CHECKPOINT_ENABLED or resume else None
+    if checkpoint is not None and not resume:
+        checkpoint.clear()
+    attempt_seconds = 0.0
+    start_time = time.time()
+
+    async for task_id, state, logger in run_batch(load_tasks(path), concurrency=concurrency, streaming=streaming,
+                                                   speculative=speculative, validation_batcher=batcher,
+                                                   policy_mode=policy_mode, checkpoint=checkpoint, plan=plan,
+                                                   delta=delta, cascade=cascade,
+                                                   early_stop=early_stop):
+        total += 1
+        ok = _accepted(state, logger)
+        accepted += ok
+        failed += "error" in logger.summary
+        for call in logger.calls:
+            call_rollup.add(call)
+        attempt_seconds += sum(step["duration"] for step in logger.logs)
+        tiers = logger.summary.get("validation_tiers", {})
+        llm_calls_saved += tiers.get("llm_calls_saved", 0)
+        for key, value in logger.summary.get("delta", {}).items():
+            delta_totals[key] = delta_totals.get(key, 0) + value
+        _add_reply_stats(reply_totals, logger.summary.get("judge_replies", {}))
+        _add_reply_stats(fast_reply_totals, logger.summary.get("fast_judge_replies", {}))
+        termination = logger.summary.get("termination")
+        if termination is not None:
+            if termination["early"]:
+                stops = termination_totals["early_stops"]
+                stops[termination["reason"]] = stops.get(termination["reason"], 0) + 1
+            termination_totals["attempts_saved"] += termination["attempts_saved"]
+            termination_totals["calls_saved"] += termination["calls_saved"]
+            termination_totals["returned_best"] += termination["returned_best"]
+            if termination["audit"] is not None:
+                termination_totals["audits"] += 1
+                termination_totals["audits_accepted_later"] += termination["audit"]["accepted_later"]
+        for name, counts in tiers.get("tiers", {}).items():
+            totals = tier_totals.setdefault(name, {"checked": 0, "rejected": 0, "accepted": 0})
+            for key, value in counts.items():
+                totals[key] += value
+        result = state.current_result or ""
+        print(f"{'✅' if ok else '❌'} [task {task_id}] attempts={state.attempt_count} | {result[:80]}{'...' if len(result) > 80 else ''}")
+
+    # Per-step records are already in the log store; only the aggregates are kept here
+    batch_logger = MetricsLogger()
+    batch_logger.summary["validation_tiers"] = {"tiers": tier_totals, "llm_calls_saved": llm_calls_saved}
+    batch_logger.summary["judge_replies"] = reply_totals
+    if fast_reply_totals["replies"]:
+        batch_logger.summary["fast_judge_replies"] = fast_reply_totals
+    batch_logger.summary["termination"] = termination_totals
+    batch_logger.summary["failed_tasks"] = failed
+    calls = batch_logger.summary["calls"] = call_rollup.summary(accepted)
+    policy_summary = batch_logger.summary["policy"] = (get_adaptive_policy().summary() if policy_mode == "adaptive"
+                                                       else CorrectionPolicy().summary())
+    cache_stats = batch_logger.log_cache_stats()
+    resilience = batch_logger.log_resilience_stats()
+    if checkpoint is not None:
+        checkpoint_stats = batch_logger.summary["checkpoint"] = checkpoint.stats()
+        checkpoint.close()
+    cascade_stats = batch_logger.log_cascade(get_judge_cascade()) if cascade else None
+    batch_logger.save(BATCH_SUMMARY_PATH)
+    if policy_mode == "adaptive":
+        get_adaptive_policy().save()
+
+    print(f"\n📊 {accepted}/{total} tasks accepted" + (f" ({failed} failed with an error)" if failed else "")
+          + f" in {time.time() - start_time:.1f}s (summary: {BATCH_SUMMARY_PATH})")
+    if "hit_rate" in cache_stats:
+        print(f"💾 Cache hit rate: {cache_stats['hit_rate']:.1%}")
+    print(f"💰 {calls['model_calls']} model calls, {calls['total_tokens']} tokens, ${calls['cost_usd']:.4f}"
+          + (f" (${calls['cost_per_accepted']:.4f} per accepted answer)" if accepted else ""))
+    for phase, stats in calls["phases"].items():
+        print(f"   {phase}: {stats['calls']} calls, p50 {stats['latency_p50']:.2f}s / p95 {stats['latency_p95']:.2f}s")
+    if policy_mode == "adaptive":
+        print(f"🎯 Adaptive policy: {policy_summary['decisions']} decisions, {policy_summary['overrides']} differed "
+              f"from the static mapping, {policy_summary['contexts']} contexts learned")
+    if resilience["hedges_sent"] or resilience["deadlines_exceeded"] or resilience["fallback_calls"]:
+        print(f"🛡️ Resilience: {resilience['hedges_sent']} hedges ({resilience['hedges_won']} won), "
+              f"{resilience['deadlines_exceeded']} deadlines exceeded, {resilience['fallback_calls']} fallback calls")
+    for model, breaker in resilience["breakers"].items():
+        if breaker["times_opened"]:
+            print(f"   ⚡ {model}: circuit {breaker['state']}, opened {breaker['times_opened']}x, "
+                  f"{breaker['rejected']} calls rejected")
+    if checkpoint is not None:
+        overhead = checkpoint_stats["save_seconds"] / attempt_seconds if attempt_seconds else 0.0
+        print(f"💾 Checkpoints: {checkpoint_stats['saves']} snapshots (avg {checkpoint_stats['avg_bytes']:.0f} B, "
+              f"{checkpoint_stats['avg_save_ms']:.2f} ms = {overhead:.2%} of attempt time); "
+              f"{checkpoint_stats['skipped']} tasks skipped, {checkpoint_stats['resumed']} resumed")
+    if delta_totals:
+        batch_logger.summary["delta"] = delta_totals
+        print(f"✂️ Delta retries: {delta_totals['patches_applied']}/{delta_totals['patches_tried']} patches applied, "
+              f"{delta_totals['output_tokens_saved']} output tokens saved")
+    if cascade_stats is not None:
+        _print_cascade(cascade_stats)
+    if plan:
+        plan_cache = PlannerAgent().cache.stats()
+        print(f"🗺️ Plans: {plan_cache['hits']} memoized / {plan_cache['misses']} planned")
+    print(f"🧮 Local validators saved {llm_calls_saved} LLM judge calls")
+    if termination_totals["early_stops"] or termination_totals["returned_best"] or termination_totals["audits"]:
+        print(f"🛑 Early termination: {sum(termination_totals['early_stops'].values())} loops stopped "
+              f"{termination_totals['early_stops']}, ~{termination_totals['calls_saved']:.0f} model calls saved; "
+              f"best attempt returned for {termination_totals['returned_best']}"
+              + (f"; audited stops later accepted: {termination_totals['audits_accepted_later']}/"
+                 f"{termination_totals['audits']}" if termination_totals["audits"] else ""))
+    if reply_totals["repaired"] or reply_totals["reasks"] or reply_totals["failures"]:
+        print(f"🧩 Judge replies: {reply_totals['repaired']}/{reply_totals['replies']} repaired {reply_totals['repairs']}, "
+              f"{reply_totals['reasks']} re-asked ({reply_totals['reask_recovered']} recovered), "
+              f"{reply_totals['failures']} unparsable")
+    if fast_reply_totals["repaired"] or fast_reply_totals["failures"]:
+        print(f"🧩 Fast judge replies: {fast_reply_totals['repaired']}/{fast_reply_totals['replies']} repaired "
+              f"{fast_reply_totals['repairs']}, {fast_reply_totals['failures']} unparsable (escalated)")
+    if batcher is not None:
+        batch_stats = batcher.stats()
+        print(f"📦 Judge batches: {batch_stats['batches_sent']} requests for {batch_stats['items_judged']} outputs "
+              f"(avg {batch_stats['avg_batch_size']:.1f} per request)")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-correcting agentic AI loop")
+    parser.add_argument("--batch", metavar="FILE", help="run every task in FILE (one per line) concurrently")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="max correction loops in flight in batch mode")
+    parser.add_argument("--stream", action="store_true", default=EXECUTOR_STREAMING, help="stream executor output and abort early on constraint violations")
+    parser.add_argument("--speculative", action="store_true", default=SPECULATIVE_MODE, help="fire several executor candidates per attempt and keep the first accepted one")
+    parser.add_argument("--validator-batch", type=int, default=VALIDATOR_BATCH_SIZE, help="judge up to K outputs per validator request in batch mode")
+    parser.add_argument("--resume", action="store_true", help="skip tasks the last batch run finished and continue unfinished ones from their checkpoint")
+    parser.add_argument("--plan", action="store_true", default=PLAN_MODE, help="plan the task as a step graph, run independent steps concurrently and merge")
+    parser.add_argument("--delta", action="store_true", default=DELTA_MODE, help="correct long outputs with edits to the rejected output instead of regenerating them")
+    parser.add_argument("--cascade", action="store_true", default=CASCADE_ENABLED, help="judge with a cheap model first and escalate to the full validator only when uncertain")
+    parser.add_argument("--early-stop", action="store_true", default=TERMINATION_EARLY_STOP, help="stop retrying once ε plateaus or its trend cannot reach the threshold in time")
+    parser.add_argument("--policy", choices=["static", "adaptive"], default=POLICY_MODE, help="static ErrorType->strategy map or the learned adaptive policy")
+    parser.add_argument("--trace", metavar="FILE", help="write spans (attempts, model calls, validation, waits) as Chrome trace-event JSON")
+    parser.add_argument("--otlp", metavar="FILE", help="write spans as OTLP/JSON lines")
+    parser.add_argument("--profile", metavar="FILE", help="sample the CPU while running and write collapsed stacks grouped by span")
+    parser.add_argument("--record", metavar="FILE", help="record every model request/response (with timing and usage) into a cassette")
+    parser.add_argument("--replay", metavar="FILE", help="serve model calls from a recorded cassette instead of the provider")
+    parser.add_argument("--replay-latency", choices=["real", "scaled", "zero"], default=CASSETTE_LATENCY, help="replay recorded latencies as-is, divided by --replay-speed, or not at all")
+    parser.add_argument("--replay-speed", type=float, default=CASSETTE_SPEED, help="speedup factor for --replay-latency scaled")
+    args = parser.parse_args()
+
+    cassette = replay = None
+    if args.record or args.replay:
+        # Every call must reach the backend, so the cassette sees (and serves) all traffic
+        set_response_cache(None)
+    if args.record:
+        cassette = Cassette(args.record)
+        set_backend(RecordingBackend(get_backend(), cassette))
+    elif args.replay:
+        replay = ReplayBackend(Cassette.load(args.replay), latency=args.replay_latency, speed=args.replay_speed)
+        set_backend(replay)
+        set_scheduler(replay_scheduler(args.replay_latency, args.replay_speed))
+
+    def _finish_cassette():
+        if cassette is not None:
+            cassette.save()
+            print(f"📼 Recorded {len(cassette)} model calls -> {args.record}")
+        if replay is not None:
+            stats = replay.stats
+            print(f"📼 Replayed {stats['hits']} model calls ({stats['misses']} unrecorded): "
+                  f"{stats['recorded_seconds']:.1f}s recorded in {stats['replayed_seconds']:.2f}s ({replay.speedup():.0f}x)")
+
+    if args.batch:
+        with tracing(args.trace, args.otlp, args.profile) as profiler:
+            asyncio.run(_run_batch_cli(args.batch, args.concurrency, args.stream, args.speculative, args.validator_batch,
+                                       args.policy, args.resume, args.plan, args.delta, args.cascade, args.early_stop))
+        if profiler is not None:
+            print(f"🔬 Profile: {profiler.total_samples} samples ({profiler.idle_samples} idle) -> {args.profile}")
+        _finish_cassette()
+        raise SystemExit(0)
+
     print("=" * 70)
     print("🤖 AGENTIC AI SYSTEM - Self-Correcting Loop")
     print("=" * 70)
@@ -85,17 +694,21 @@ if __name__ == "__main__":
     print("  3. Self-correct up to 5 attempts if needed")
     print("=" * 70)
     print()
-    
+
     # Accept user input
     user_task = input("📝 Enter your task/prompt: ").strip()
-    
+
     if not user_task:
         print("❌ Error: Please provide a valid task.")
     else:
         print()
-        result = run_agentic_workflow(user_task)
+        with tracing(args.trace, args.otlp, args.profile):
+            result = run_agentic_workflow(user_task, streaming=args.stream, speculative=args.speculative,
+                                          policy_mode=args.policy, plan=args.plan, delta=args.delta,
+                                          cascade=args.cascade, early_stop=args.early_stop)
+        _finish_cassette()
         print("\n" + "=" * 70)
         print("📋 FINAL RESULT:")
         print("=" * 70)
         print(result)
-        print("=" * 70)
\ No newline at end of file
+        print("=" * 70)
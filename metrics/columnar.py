@@ -0,0 +1,265 @@
+import csv
+import json
+import os
+from typing import Dict, Iterable, List
+import numpy as np
+from config import ACCEPTANCE_THRESHOLD
+
+# Columnar view of step records for ExperimentEvaluator.
+# 1. Records are streamed from the log store into fixed-dtype NumPy chunks (strings are
+#    dictionary-encoded), so a million steps take ~60 MB instead of a million dicts.
+# 2. A table can be saved as one .npy file per column and re-opened memory-mapped.
+# 3. Aggregates are computed with sorts / bincount over whole columns, never per record.
+
+NUMERIC_COLUMNS = {
+    "task_id": np.int32,        # -1 when the step was not part of a batch
+    "step": np.int32,
+    "attempt": np.int32,
+    "epsilon": np.float32,      # NaN when the step has no verdict
+    "is_valid": np.int8,
+    "duration": np.float32,
+    "model_calls": np.int32,
+    "prompt_tokens": np.int32,
+    "output_tokens": np.int32,
+    "cost_usd": np.float64,
+    "queue_wait": np.float32,
+}
+CATEGORY_COLUMNS = ["run_id", "plan_step", "error_type", "strategy", "validated_by"]   # plan_step "None" outside plan mode
+CHUNK_ROWS = 65536
+PERCENTILES = (50, 90, 95, 99)
+
+class StepTable:
+    """Step records as named NumPy columns; category columns hold int codes into `categories`."""
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]]):
+        self.columns = columns
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.columns["step"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def labels(self, name: str) -> List[str]:
+        return self.categories[name]
+
+    def save(self, directory: str):
+        """One .npy per column plus categories.json, reloadable with mmap."""
+        os.makedirs(directory, exist_ok=True)
+        for name, values in self.columns.items():
+            np.save(os.path.join(directory, f"{name}.npy"), values)
+        with open(os.path.join(directory, "categories.json"), "w") as f:
+            json.dump(self.categories, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "StepTable":
+        with open(os.path.join(directory, "categories.json"), "r") as f:
+            categories = json.load(f)
+        mode = "r" if mmap else None
+        names = list(NUMERIC_COLUMNS) + CATEGORY_COLUMNS
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in names}
+        return cls(columns, categories)
+
+class StepTableBuilder:
+    """
+    Append step records one at a time. Rows are staged in plain lists and packed into
+    typed arrays every `chunk_rows`, so memory grows with the columns, not with dicts.
+    """
+    def __init__(self, chunk_rows: int = CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self._codes = {name: {} for name in CATEGORY_COLUMNS}
+        self._chunks = {name: [] for name in list(NUMERIC_COLUMNS) + CATEGORY_COLUMNS}
+        self._staged = {name: [] for name in self._chunks}
+
+    def _seal_chunk(self):
+        for name, values in self._staged.items():
+            self._chunks[name].append(np.array(values, dtype=NUMERIC_COLUMNS.get(name, np.int32)))
+            values.clear()
+
+    def _code(self, name: str, value) -> int:
+        codes = self._codes[name]
+        label = "initial" if value is None and name == "strategy" else str(value)
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(codes)
+        return code
+
+    def add(self, record: dict):
+        staged = self._staged
+        get = record.get
+        epsilon = get("epsilon")
+        epsilon = np.nan if epsilon is None else epsilon
+        is_valid = get("is_valid")
+        if is_valid is None:
+            # Older logs did not record the verdict; fall back to the acceptance threshold
+            is_valid = epsilon == epsilon and epsilon < ACCEPTANCE_THRESHOLD
+        task_id = get("task_id")
+
+        staged["task_id"].append(-1 if task_id is None else task_id)
+        staged["step"].append(get("step", 0))
+        staged["attempt"].append(get("attempt", 0))
+        staged["epsilon"].append(epsilon)
+        staged["is_valid"].append(bool(is_valid))
+        for name in ("duration", "model_calls", "prompt_tokens", "output_tokens", "cost_usd", "queue_wait"):
+            staged[name].append(get(name) or 0)
+        for name in CATEGORY_COLUMNS:
+            staged[name].append(self._code(name, get(name)))
+
+        if len(staged["step"]) >= self.chunk_rows:
+            self._seal_chunk()
+
+    def extend(self, records: Iterable[dict]) -> "StepTableBuilder":
+        for record in records:
+            self.add(record)
+        return self
+
+    def build(self) -> StepTable:
+        if self._staged["step"]:
+            self._seal_chunk()
+        columns = {}
+        for name, chunks in self._chunks.items():
+            dtype = NUMERIC_COLUMNS.get(name, np.int32)
+            columns[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+        categories = {name: list(codes) for name, codes in self._codes.items()}
+        return StepTable(columns, categories)
+
+def episodes(table: StepTable) -> np.ndarray:
+    """
+    Episode (one correction loop) id per step. Steps of a loop share run_id, task_id and
+    plan_step (the concurrent per-step loops of one plan-mode task interleave in the log)
+    and have increasing step numbers; a step that does not increase starts a new loop.
+    """
+    n = len(table)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    keys = (np.asarray(table["plan_step"]), np.asarray(table["task_id"]), np.asarray(table["run_id"]))
+    order = np.lexsort(keys)        # stable: log order is kept within each loop
+    sorted_step = table["step"][order]
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = sorted_step[1:] <= sorted_step[:-1]
+    for key in keys:
+        sorted_key = key[order]
+        starts[1:] |= sorted_key[1:] != sorted_key[:-1]
+    ids = np.empty(n, dtype=np.int64)
+    ids[order] = np.cumsum(starts) - 1
+    return ids
+
+def _group_percentiles(groups: np.ndarray, values: np.ndarray, n_groups: int, q=PERCENTILES) -> np.ndarray:
+    """(n_groups, len(q)) percentiles; one sort for all groups, NaNs ignored."""
+    keep = ~np.isnan(values)
+    groups, values = groups[keep], values[keep]
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    bounds = np.searchsorted(groups, np.arange(n_groups + 1))
+    out = np.full((n_groups, len(q)), np.nan)
+    for g in range(n_groups):
+        lo, hi = bounds[g], bounds[g + 1]
+        if hi > lo:
+            out[g] = np.percentile(values[lo:hi], q)
+    return out
+
+def group_aggregate(table: StepTable, by: str, value: str, q=PERCENTILES) -> List[dict]:
+    """count / mean / sum / percentiles of `value` for each group of column `by`."""
+    groups = np.asarray(table[by]).astype(np.int64)
+    values = np.asarray(table[value], dtype=np.float64)
+    labels = table.labels(by) if by in table.categories else None
+    unique, inverse = np.unique(groups, return_inverse=True)
+    n_groups = len(unique)
+    valid = ~np.isnan(values)
+    counts = np.bincount(inverse, weights=valid, minlength=n_groups)
+    sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=n_groups)
+    pcts = _group_percentiles(inverse, values, n_groups, q)
+    rows = []
+    for g, key in enumerate(unique):
+        row = {by: labels[key] if labels else int(key), "count": int(counts[g]), "sum": float(sums[g]),
+               "mean": float(sums[g] / counts[g]) if counts[g] else None}
+        for i, p in enumerate(q):
+            row[f"p{p}"] = None if np.isnan(pcts[g, i]) else float(pcts[g, i])
+        rows.append(row)
+    return rows
+
+def convergence_by_error_type(table: StepTable) -> List[dict]:
+    """For loops grouped by the error type of their first step: how often, and how fast, they converge."""
+    if len(table) == 0:
+        return []
+    ep = episodes(table)
+    n_ep = int(ep.max()) + 1
+    first_step = np.full(n_ep, np.iinfo(np.int32).max, dtype=np.int64)
+    np.minimum.at(first_step, ep, table["step"])
+    is_first = table["step"] == first_step[ep]
+    first_error = np.zeros(n_ep, dtype=np.int64)
+    first_error[ep[is_first]] = table["error_type"][is_first]
+    converged = np.bincount(ep, weights=table["is_valid"], minlength=n_ep) > 0
+    attempts = np.bincount(ep, minlength=n_ep)
+
+    labels = table.labels("error_type")
+    rows = []
+    for code in np.unique(first_error):
+        mask = first_error == code
+        conv = mask & converged
+        rows.append({
+            "error_type": labels[code],
+            "episodes": int(mask.sum()),
+            "converged": int(conv.sum()),
+            "convergence_rate": float(conv.sum() / mask.sum()),
+            "mean_attempts_to_converge": float(attempts[conv].mean()) if conv.any() else None,
+        })
+    return rows
+
+def attempts_by_strategy(table: StepTable) -> List[dict]:
+    """Per correction strategy: attempts made with it, its acceptance rate, and the attempt number it wins at."""
+    strategy = np.asarray(table["strategy"]).astype(np.int64)
+    n = len(table.labels("strategy"))
+    tried = np.bincount(strategy, minlength=n)
+    accepted = np.bincount(strategy, weights=table["is_valid"], minlength=n)
+    winning_attempts = np.bincount(strategy, weights=np.where(table["is_valid"] == 1, table["attempt"], 0), minlength=n)
+    rows = []
+    for code, label in enumerate(table.labels("strategy")):
+        if not tried[code]:
+            continue
+        rows.append({
+            "strategy": label,
+            "attempts": int(tried[code]),
+            "accepted": int(accepted[code]),
+            "acceptance_rate": float(accepted[code] / tried[code]),
+            "mean_attempt_when_accepted": float(winning_attempts[code] / accepted[code]) if accepted[code] else None,
+        })
+    return rows
+
+def convergence_curve(table: StepTable, q=(50, 90)) -> List[dict]:
+    """ε statistics at each attempt number across all loops (how error falls with retries)."""
+    rows = group_aggregate(table, "attempt", "epsilon", q)
+    for row in rows:
+        row["mean_epsilon"] = row.pop("mean")
+        row.pop("sum")
+    return rows
+
+def percentile_table(table: StepTable, columns=("duration", "queue_wait"), q=PERCENTILES) -> List[dict]:
+    """Overall percentiles for latency-like columns."""
+    rows = []
+    for name in columns:
+        values = np.asarray(table[name], dtype=np.float64)
+        values = values[~np.isnan(values)]
+        row = {"metric": name, "count": int(values.size)}
+        pcts = np.percentile(values, q) if values.size else [None] * len(q)
+        for p, v in zip(q, pcts):
+            row[f"p{p}"] = None if v is None else float(v)
+        rows.append(row)
+    return rows
+
+def export_report(report: Dict[str, List[dict]], path: str):
+    """Write a {section: rows} report as JSON, or as one CSV with a leading `section` column."""
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        return
+    fieldnames = ["section"]
+    for rows in report.values():
+        for row in rows:
+            fieldnames.extend(k for k in row if k not in fieldnames)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for section, rows in report.items():
+            for row in rows:
+                writer.writerow({"section": section, **row})
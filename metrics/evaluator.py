@@ -1,14 +1,73 @@
-import json
+import os
+from config import LOG_DB_PATH
+from metrics.log_store import log_files, read_records
 
 class ExperimentEvaluator:
-    def analyze_log(self, filepath):
+    def load_steps(self, filepath=LOG_DB_PATH, run_id=None):
+        """Stream step records from a JSONL log store (rotated files included) or a legacy JSON list."""
+        return read_records(filepath, run_id=run_id, kind="step")
+
+    def load_table(self, filepath=LOG_DB_PATH, run_id=None, cache_dir=None):
+        """
+        Load step records into a columnar StepTable (see metrics.columnar). With `cache_dir`,
+        the table is saved there as .npy columns and later calls memory-map it instead of
+        re-parsing the log, until the log changes.
+        """
+        from metrics.columnar import StepTable, StepTableBuilder
+
+        if cache_dir and run_id is None and os.path.exists(os.path.join(cache_dir, "categories.json")):
+            cached_at = os.path.getmtime(os.path.join(cache_dir, "categories.json"))
+            files = log_files(filepath)
+            # No log at all means the cache cannot be vouched for: rebuild (an empty table)
+            if files and all(os.path.getmtime(p) <= cached_at for p in files):
+                try:
+                    return StepTable.load(cache_dir, mmap=True)
+                except (OSError, KeyError):
+                    pass    # written by an older version with other columns
+
+        table = StepTableBuilder().extend(self.load_steps(filepath, run_id=run_id)).build()
+        if cache_dir and run_id is None:
+            table.save(cache_dir)
+        return table
+
+    def report(self, table) -> dict:
+        """Grouped aggregates for a StepTable: {section: rows}."""
+        from metrics.columnar import (attempts_by_strategy, convergence_by_error_type, convergence_curve,
+                                      group_aggregate, percentile_table)
+        return {
+            "error_types": convergence_by_error_type(table),
+            "strategies": attempts_by_strategy(table),
+            "convergence_curve": convergence_curve(table),
+            "latency": percentile_table(table),
+            "latency_by_strategy": group_aggregate(table, "strategy", "duration"),
+        }
+
+    def analyze_log(self, filepath=LOG_DB_PATH, run_id=None, cache_dir=None, export=None):
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            print(f"Loaded {len(data)} steps from {filepath}")
-            # You can add more advanced pandas / statistics analysis here later
-            if data:
-                print("First entry:", data[0])
-                print("Last entry:", data[-1])
+            table = self.load_table(filepath, run_id=run_id, cache_dir=cache_dir)
+            print(f"Loaded {len(table)} steps from {filepath} ({len(table.labels('run_id'))} runs)")
+            if not len(table):
+                return {}
+            report = self.report(table)
+
+            print("\nConvergence by initial error type:")
+            for row in report["error_types"]:
+                print(f"  {row['error_type']:<14} {row['converged']}/{row['episodes']} converged "
+                      f"({row['convergence_rate']:.0%}), attempts: {row['mean_attempts_to_converge']}")
+            print("\nStrategies:")
+            for row in report["strategies"]:
+                print(f"  {row['strategy']:<18} {row['attempts']} attempts, {row['acceptance_rate']:.0%} accepted")
+            print("\nε by attempt:")
+            for row in report["convergence_curve"]:
+                print(f"  attempt {row['attempt']}: mean {row['mean_epsilon']:.3f} p50 {row['p50']:.3f} (n={row['count']})")
+            print("\nLatency percentiles (s):")
+            for row in report["latency"]:
+                print(f"  {row['metric']:<10} " + " ".join(f"p{q}={row[f'p{q}']:.3f}" for q in (50, 90, 95, 99) if row[f"p{q}"] is not None))
+
+            if export:
+                from metrics.columnar import export_report
+                export_report(report, export)
+                print(f"\nReport written to {export}")
+            return report
         except Exception as e:
             print(f"Error analyzing log: {e}")
\ No newline at end of file
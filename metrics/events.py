@@ -0,0 +1,157 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Instrumentation surface for the correction loop.
+# 1. `span(name, **attrs)` times a block (workflow, attempt, validation, ...); spans nest
+#    through a ContextVar, so concurrent asyncio workflows each get their own tree.
+# 2. `emit(name, **attrs)` is a point event (policy decision, log line, ...).
+# 3. `record_span()` reports a span after the fact (model calls and rate-limit waits,
+#    from utils.llm._record_call).
+# Subscribers (see metrics.exporters) receive every span start/end and event. With no
+# subscriber attached, span() returns a shared no-op object and emit() returns at once.
+
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+_ids = itertools.count(1)
+_current_span = ContextVar("current_span", default=None)
+
+def unix_ns(perf_ns: int) -> int:
+    """Convert a span timestamp (perf_counter_ns) to Unix time in nanoseconds."""
+    return perf_ns + _EPOCH_OFFSET_NS
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "start_ns", "end_ns", "attrs", "thread_id", "_token")
+
+    def __init__(self, name: str, attrs: dict, parent: Optional["Span"], start_ns: int = None):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.start_ns = start_ns if start_ns is not None else time.perf_counter_ns()
+        self.end_ns = None
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        _bus.span_started(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+        _bus.span_ended(self)
+        return False
+
+class _NullSpan:
+    """Returned by span() when nothing is listening: every operation is a no-op."""
+    __slots__ = ()
+    trace_id = span_id = parent_id = None
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Event:
+    __slots__ = ("name", "attrs", "time_ns", "span_id", "trace_id", "thread_id")
+
+    def __init__(self, name: str, attrs: dict, parent: Optional[Span]):
+        self.name = name
+        self.attrs = attrs
+        self.time_ns = time.perf_counter_ns()
+        self.span_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else None
+        self.thread_id = threading.get_ident()
+
+class Subscriber:
+    """Base class: override the hooks you need. Hooks run inline, so keep them cheap."""
+    def on_span_start(self, span: Span):
+        pass
+
+    def on_span_end(self, span: Span):
+        pass
+
+    def on_event(self, event: Event):
+        pass
+
+    def close(self):
+        pass
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = ()       # tuple: replaced, never mutated, so emitters iterate without a lock
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscriber: Subscriber) -> Subscriber:
+        with self._lock:
+            self.subscribers = self.subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+
+    def span_started(self, span: Span):
+        for subscriber in self.subscribers:
+            subscriber.on_span_start(span)
+
+    def span_ended(self, span: Span):
+        for subscriber in self.subscribers:
+            subscriber.on_span_end(span)
+
+    def event(self, event: Event):
+        for subscriber in self.subscribers:
+            subscriber.on_event(event)
+
+_bus = EventBus()
+
+def get_event_bus() -> EventBus:
+    return _bus
+
+def subscribe(subscriber: Subscriber) -> Subscriber:
+    return _bus.subscribe(subscriber)
+
+def unsubscribe(subscriber: Subscriber):
+    _bus.unsubscribe(subscriber)
+
+def span(name: str, **attrs):
+    if not _bus.subscribers:
+        return NULL_SPAN
+    return Span(name, attrs, _current_span.get())
+
+def emit(name: str, **attrs):
+    if not _bus.subscribers:
+        return
+    _bus.event(Event(name, attrs, _current_span.get()))
+
+def record_span(name: str, duration: float, ended_ago: float = 0.0, **attrs):
+    """Report a finished span of `duration` seconds (ended `ended_ago` seconds ago) under the current span."""
+    if not _bus.subscribers:
+        return
+    end_ns = time.perf_counter_ns() - int(ended_ago * 1e9)
+    finished = Span(name, attrs, _current_span.get(), start_ns=end_ns - int(duration * 1e9))
+    _bus.span_started(finished)
+    finished.end_ns = end_ns
+    _bus.span_ended(finished)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from config import TRACE_OTLP_BATCH, TRACE_PROFILE_INTERVAL, TRACE_SERVICE_NAME
+from metrics.events import Event, Span, Subscriber, get_event_bus, unix_ns
+
+# Built-in subscribers for metrics.events.
+# 1. ConsoleSubscriber - the workflow's progress lines ("log" events) on stdout.
+# 2. ChromeTraceExporter - Chrome trace-event JSON (chrome://tracing, Perfetto); one row per trace.
+# 3. OTLPFileExporter - OTLP/JSON ExportTraceServiceRequest lines, as written by the
+#    OpenTelemetry collector's file exporter, for loading into any OTLP backend.
+# 4. SamplingProfiler - samples every thread's stack and charges it to the innermost open
+#    span of whatever was running (asyncio task or thread); writes collapsed stacks for
+#    flamegraph.pl / speedscope, rooted at the span name.
+
+def _json_safe(value):
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+# ---------------------------------------------------------------- console
+
+class ConsoleSubscriber(Subscriber):
+    """
+    Prints "log" events raised under a span opened with verbose=True (and its children,
+    up to a nested span that sets verbose itself), so a quiet sub-workflow stays quiet.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._verbose_spans = set()
+
+    def on_span_start(self, span: Span):
+        verbose = span.attrs.get("verbose")
+        if verbose or (verbose is None and span.parent_id in self._verbose_spans):
+            self._verbose_spans.add(span.span_id)
+
+    def on_span_end(self, span: Span):
+        self._verbose_spans.discard(span.span_id)
+
+    def on_event(self, event: Event):
+        if event.name == "log" and event.span_id in self._verbose_spans:
+            print(event.attrs.get("message", ""), file=self.stream or sys.stdout)
+
+_console = ConsoleSubscriber()
+_console_users = 0
+
+@contextmanager
+def console_output(enabled: bool = True):
+    """Keep the shared ConsoleSubscriber attached while any verbose workflow is running."""
+    global _console_users
+    if not enabled:
+        yield
+        return
+    if _console_users == 0:
+        get_event_bus().subscribe(_console)
+    _console_users += 1
+    try:
+        yield
+    finally:
+        _console_users -= 1
+        if _console_users == 0:
+            get_event_bus().unsubscribe(_console)
+
+# ---------------------------------------------------------------- Chrome trace events
+
+class ChromeTraceExporter(Subscriber):
+    """Collects spans as "X" (complete) events and point events as "i" events; close() writes the file."""
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        self._traces = set()
+
+    def _trace_row(self, span: Span):
+        if span.trace_id not in self._traces:
+            self._traces.add(span.trace_id)
+            label = span.attrs.get("task") or span.name
+            self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": span.trace_id,
+                                "args": {"name": f"{span.name} #{span.trace_id}: {str(label)[:60]}"}})
+
+    def on_span_end(self, span: Span):
+        self._trace_row(span)
+        self.events.append({"name": span.name, "cat": "agent", "ph": "X", "pid": self.pid, "tid": span.trace_id,
+                            "ts": unix_ns(span.start_ns) / 1000, "dur": (span.end_ns - span.start_ns) / 1000,
+                            "args": {k: _json_safe(v) for k, v in span.attrs.items()}})
+
+    def on_event(self, event: Event):
+        self.events.append({"name": event.name, "cat": "agent", "ph": "i", "s": "t", "pid": self.pid,
+                            "tid": event.trace_id or 0, "ts": unix_ns(event.time_ns) / 1000,
+                            "args": {k: _json_safe(v) for k, v in event.attrs.items()}})
+
+    def close(self):
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+# ---------------------------------------------------------------- OTLP file
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attrs: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attrs.items() if value is not None]
+
+class OTLPFileExporter(Subscriber):
+    """
+    Writes finished spans as OTLP/JSON, one ExportTraceServiceRequest per line, every
+    `batch` spans and on close(). Point events become span events of their enclosing span.
+    """
+    def __init__(self, path: str, batch: int = TRACE_OTLP_BATCH, service_name: str = TRACE_SERVICE_NAME):
+        self.path = path
+        self.batch = batch
+        self.service_name = service_name
+        self.spans = []
+        self.spans_written = 0
+        self._events = {}
+        self._trace_prefix = f"{random.getrandbits(64):016x}"     # span ids are only unique per process
+        open(path, "w").close()
+
+    def on_event(self, event: Event):
+        if event.span_id is not None:
+            self._events.setdefault(event.span_id, []).append(
+                {"timeUnixNano": str(unix_ns(event.time_ns)), "name": event.name,
+                 "attributes": _otlp_attributes(event.attrs)})
+
+    def on_span_end(self, span: Span):
+        record = {
+            "traceId": f"{self._trace_prefix}{span.trace_id:016x}",
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            "kind": 1,      # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(unix_ns(span.start_ns)),
+            "endTimeUnixNano": str(unix_ns(span.end_ns)),
+            "attributes": _otlp_attributes(span.attrs),
+            "events": self._events.pop(span.span_id, []),
+            "status": {"code": 2, "message": str(span.attrs["error"])} if span.attrs.get("error") else {"code": 1},
+        }
+        if span.parent_id is not None:
+            record["parentSpanId"] = f"{span.parent_id:016x}"
+        self.spans.append(record)
+        if len(self.spans) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name,
+                                                         "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "metrics.events"}, "spans": self.spans}],
+        }]}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(request) + "\n")
+        self.spans_written += len(self.spans)
+        self.spans = []
+
+    def close(self):
+        self.flush()
+
+# ---------------------------------------------------------------- sampling profiler
+
+class SamplingProfiler(Subscriber):
+    """
+    Samples the stack of every thread that has an open span every `interval` seconds.
+    On an event loop thread the sample goes to the innermost span of the task that is
+    running (asyncio.current_task); a loop with no running task is counted as idle.
+    Subscribe it, start(), run the workload, then stop() and write(path).
+    """
+    def __init__(self, interval: float = TRACE_PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()        # collapsed stack ("span;frame;frame") -> count
+        self.span_samples = Counter()   # span name -> count
+        self.idle_samples = 0
+        self.total_samples = 0
+        self._stacks = {}               # (thread id, id(task) or None) -> [open spans]
+        self._loops = {}                # thread id -> running event loop
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _key(span: Span):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None, (span.thread_id, None)
+        return loop, (span.thread_id, id(asyncio.current_task(loop)))
+
+    def on_span_start(self, span: Span):
+        loop, key = self._key(span)
+        with self._lock:
+            if loop is not None:
+                self._loops[span.thread_id] = loop
+            self._stacks.setdefault(key, []).append(span)
+
+    def on_span_end(self, span: Span):
+        _, key = self._key(span)
+        with self._lock:
+            stack = self._stacks.get(key)
+            if stack and span in stack:
+                stack.remove(span)
+                if not stack:
+                    del self._stacks[key]
+
+    def _innermost(self, thread_id: int):
+        loop = self._loops.get(thread_id)
+        if loop is not None and not loop.is_closed():
+            task = asyncio.current_task(loop)
+            if task is None:
+                return None, loop.is_running()
+            stack = self._stacks.get((thread_id, id(task)))
+        else:
+            stack = self._stacks.get((thread_id, None))
+        return (stack[-1] if stack else None), False
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    def sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            with self._lock:
+                span, idle = self._innermost(thread_id)
+            if idle:
+                self.idle_samples += 1
+                self.total_samples += 1
+            elif span is not None:
+                self.samples[f"{span.name};{self._collapse(frame)}"] += 1
+                self.span_samples[span.name] += 1
+                self.total_samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def stats(self) -> dict:
+        return {"samples": self.total_samples, "idle_samples": self.idle_samples,
+                "interval": self.interval, "per_span": dict(self.span_samples.most_common())}
+
+    def write(self, path: str):
+        """Collapsed-stack format: one "frame;frame;... count" line per distinct stack."""
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def tracing(trace_path: str = None, otlp_path: str = None, profile_path: str = None):
+    """Attach the requested exporters for the duration of the block; files are written on exit."""
+    bus = get_event_bus()
+    exporters = []
+    if trace_path:
+        exporters.append(bus.subscribe(ChromeTraceExporter(trace_path)))
+    if otlp_path:
+        exporters.append(bus.subscribe(OTLPFileExporter(otlp_path)))
+    profiler = bus.subscribe(SamplingProfiler()).start() if profile_path else None
+    try:
+        yield profiler
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            bus.unsubscribe(profiler)
+            profiler.write(profile_path)
+        for exporter in exporters:
+            bus.unsubscribe(exporter)
+            exporter.close()
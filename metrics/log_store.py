@@ -0,0 +1,202 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from typing import Iterator, Optional
+from config import (LOG_STORE_ENABLED, LOG_DB_PATH, LOG_FLUSH_RECORDS, LOG_FSYNC_INTERVAL,
+                    LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are still serialised within the process
+    fcntl = None
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+class JSONLLogStore:
+    """
+    Append-only experiment log: one JSON record per line, tagged with run_id and task_id.
+    1. Records are buffered and written once LOG_FLUSH_RECORDS are pending, then fsync'ed.
+       A daemon thread also writes whatever is pending every LOG_FSYNC_INTERVAL seconds,
+       so a quiet run still reaches disk - a crash loses at most that tail.
+       A full buffer is written by the appending caller (possibly on the event loop):
+       deliberate, as one write is amortised over LOG_FLUSH_RECORDS records and keeps
+       memory bounded when the disk is slower than the producers.
+    2. Each write holds a thread lock plus an flock on `<path>.lock`, so concurrent
+       workflows (and processes) sharing the file never interleave lines.
+    3. Past `max_bytes` the file rotates to `<path>.1`, `<path>.2`, ... (oldest dropped).
+    Memory use is bounded by the buffer, whatever the length of the run.
+    """
+    def __init__(self, path: str = LOG_DB_PATH, run_id: str = None, flush_records: int = LOG_FLUSH_RECORDS,
+                 fsync_interval: float = LOG_FSYNC_INTERVAL, max_bytes: Optional[int] = LOG_MAX_BYTES,
+                 backup_count: int = LOG_BACKUP_COUNT):
+        self.path = path
+        self.run_id = run_id or new_run_id()
+        self.flush_records = max(1, flush_records)
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.records_written = 0
+        self.rotations = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def append(self, record: dict, task_id=None):
+        line = json.dumps({"run_id": self.run_id, "task_id": task_id, "ts": time.time(), **record}, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.flush_records
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._write_buffer()
+            elif self._flusher is None and self.fsync_interval and self.fsync_interval > 0:
+                self._flusher = threading.Thread(
+                    target=_flush_periodically, args=(weakref.ref(self), self._stop, self.fsync_interval),
+                    name="log-store-flusher", daemon=True)
+                self._flusher.start()
+
+    def flush(self):
+        """Write and fsync everything buffered so far."""
+        with self._lock:
+            self._write_buffer()
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _write_buffer(self):
+        if not self._buffer:
+            return
+        data = ("\n".join(self._buffer) + "\n").encode("utf-8")
+        count = len(self._buffer)
+        self._buffer = []
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._lock_file is None:
+            self._lock_file = open(self.path + ".lock", "a")
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            # Re-stat under the lock: another process may have written or rotated
+            if self.max_bytes and os.path.exists(self.path):
+                size = os.path.getsize(self.path)
+                if size > 0 and size + len(data) > self.max_bytes:
+                    self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        self._last_fsync = time.monotonic()
+        self.records_written += count
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+        else:
+            for i in range(self.backup_count - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "run_id": self.run_id,
+            "records_written": self.records_written,
+            "buffered": len(self._buffer),
+            "rotations": self.rotations,
+        }
+
+def _flush_periodically(store_ref, stop: threading.Event, interval: float):
+    # Holds only a weak reference, so an abandoned store can still be collected
+    while not stop.wait(interval):
+        store = store_ref()
+        if store is None:
+            return
+        store.flush()
+        del store
+
+def log_files(path: str, include_rotated: bool = True) -> list:
+    """The log file and its rotated predecessors, oldest first."""
+    files = []
+    if include_rotated:
+        i = 1
+        while os.path.exists(f"{path}.{i}"):
+            files.insert(0, f"{path}.{i}")
+            i += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def read_records(path: str, include_rotated: bool = True, run_id: str = None, kind: str = None) -> Iterator[dict]:
+    """
+    Stream records back from a JSONL log (and its rotated files) one line at a time.
+    A legacy whole-file JSON list is also accepted. A torn last line from a crash is skipped.
+    """
+    for file_path in log_files(path, include_rotated):
+        with open(file_path, "r", encoding="utf-8") as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            records = json.load(f) if first == "[" else _iter_lines(f, kind)
+            for record in records:
+                if run_id is not None and record.get("run_id") != run_id:
+                    continue
+                if kind is not None and record.get("kind", "step") != kind:
+                    continue
+                yield record
+
+def _iter_lines(f, kind: str = None) -> Iterator[dict]:
+    # Records of another kind are skipped on the raw line, before paying for json.loads
+    wanted = f'"kind": "{kind}"' if kind else None
+    for line in f:
+        if wanted and wanted not in line and '"kind": ' in line:
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+# Process-wide store shared by every MetricsLogger (created on first use)
+_store = None
+_store_configured = False
+
+def get_log_store() -> Optional[JSONLLogStore]:
+    global _store, _store_configured
+    if not _store_configured:
+        _store_configured = True
+        if LOG_STORE_ENABLED:
+            _store = JSONLLogStore()
+            atexit.register(_store.close)
+    return _store
+
+def set_log_store(store: Optional[JSONLLogStore]):
+    """Swap the shared store (None disables persistent step logs)."""
+    global _store, _store_configured
+    if _store is not None and _store is not store:
+        _store.flush()
+    _store = store
+    _store_configured = True
@@ -1,29 +1,274 @@
 import json
-import time
-from utils.types import AgentState
-from config import LOG_DB_PATH
+import random
+from dataclasses import asdict
+from utils.types import AgentState, CallRecord
+from config import LOG_LATENCY_SAMPLES, METRICS_SUMMARY_PATH
+from metrics.log_store import get_log_store
+from utils.cache import get_response_cache
+from utils.helpers import percentile
+from utils.resilience import get_resilience
+
+def requests_sent(call: CallRecord) -> int:
+    """Model requests behind a CallRecord: 0 for cache hits and circuit-breaker rejections, 2 if hedged."""
+    if call.cached or call.error == "circuit_open":
+        return 0
+    return 2 if call.hedged else 1
+
+class CallRollup:
+    """
+    Running per-phase totals of CallRecords (count, p50/p95 latency, tokens, cost).
+    Latency percentiles come from a fixed-size reservoir sample per phase, so memory
+    stays bounded however many calls a batch makes (exact below `sample_size` calls).
+    """
+    def __init__(self, sample_size: int = LOG_LATENCY_SAMPLES):
+        self.sample_size = sample_size
+        self.phases = {}
+        self._rng = random.Random(0)
+
+    def add(self, call: CallRecord):
+        stats = self.phases.setdefault(call.phase, {
+            "calls": 0, "cache_hits": 0, "rate_limited": 0, "hedged": 0, "circuit_open": 0,
+            "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cost_usd": 0.0,
+            "queue_wait": 0.0, "model_seconds": 0.0, "latencies": [], "latencies_seen": 0,
+        })
+        stats["rate_limited"] += call.rate_limited
+        stats["cost_usd"] += call.cost_usd
+        stats["queue_wait"] += call.queue_wait
+        stats["model_seconds"] += call.latency
+        if call.cached:
+            stats["cache_hits"] += 1
+            return
+        if call.error == "circuit_open":
+            stats["circuit_open"] += 1
+            return
+        stats["calls"] += requests_sent(call)
+        stats["hedged"] += call.hedged
+        stats["prompt_tokens"] += call.prompt_tokens
+        stats["output_tokens"] += call.output_tokens
+        stats["total_tokens"] += call.total_tokens
+        # Reservoir sampling: every latency has the same chance to be kept
+        latencies = stats["latencies"]
+        stats["latencies_seen"] += 1
+        if len(latencies) < self.sample_size:
+            latencies.append(call.latency)
+        else:
+            slot = self._rng.randrange(stats["latencies_seen"])
+            if slot < self.sample_size:
+                latencies[slot] = call.latency
+
+    def summary(self, accepted: int = None) -> dict:
+        """
+        With `accepted` (number of accepted answers, or a bool for a single workflow),
+        also report the tokens and cost spent per accepted answer.
+        """
+        by_phase = {}
+        for phase, stats in self.phases.items():
+            by_phase[phase] = {
+                "calls": stats["calls"],
+                "cache_hits": stats["cache_hits"],
+                "rate_limited": stats["rate_limited"],
+                "hedged": stats["hedged"],
+                "circuit_open": stats["circuit_open"],
+                "latency_p50": percentile(stats["latencies"], 50),
+                "latency_p95": percentile(stats["latencies"], 95),
+                "prompt_tokens": stats["prompt_tokens"],
+                "output_tokens": stats["output_tokens"],
+                "cost_usd": stats["cost_usd"],
+            }
+
+        total_tokens = sum(stats["total_tokens"] for stats in self.phases.values())
+        total_cost = sum(stats["cost_usd"] for stats in self.phases.values())
+        summary = {
+            "phases": by_phase,
+            "model_calls": sum(stats["calls"] for stats in self.phases.values()),
+            "total_tokens": total_tokens,
+            "cost_usd": total_cost,
+            "rate_limit_wait_seconds": sum(stats["queue_wait"] for stats in self.phases.values()),
+            "model_seconds": sum(stats["model_seconds"] for stats in self.phases.values()),
+        }
+        if accepted is not None:
+            summary["accepted"] = int(accepted)
+            summary["calls_per_accepted"] = summary["model_calls"] / accepted if accepted else None
+            summary["tokens_per_accepted"] = total_tokens / accepted if accepted else None
+            summary["cost_per_accepted"] = total_cost / accepted if accepted else None
+        return summary
+
+def summarize_calls(calls: list, accepted: int = None) -> dict:
+    """Roll a list of CallRecords up per phase plus run totals (see CallRollup)."""
+    rollup = CallRollup()
+    for call in calls:
+        rollup.add(call)
+    return rollup.summary(accepted)
 
 class MetricsLogger:
-    def __init__(self):
+    """
+    Per-workflow metrics. Steps and model calls are appended to the shared log store
+    (metrics.log_store) as they happen; `logs`/`calls` keep only this workflow's records.
+    In plan mode each step's loop gets its own logger with `plan_step` set to the step id.
+    """
+    def __init__(self, task_id=None, store=None, plan_step: str = None):
+        self.task_id = task_id
+        self.plan_step = plan_step
+        self.store = store if store is not None else get_log_store()
         self.logs = []
+        self.summary = {}
+        self.calls = []
+        self._step_call_start = 0
+
+    def _append(self, kind: str, record: dict):
+        if self.store is not None:
+            self.store.append({"kind": kind, **record}, task_id=self.task_id)
+
+    def log_call(self, record: CallRecord):
+        """Receive one model request (see utils.llm.set_call_recorder)."""
+        self.calls.append(record)
+        self._append("call", asdict(record))
 
-    def log_step(self, step_num: int, state: AgentState, duration: float):
+    def log_step(self, step_num: int, state: AgentState, duration: float, extra: dict = None):
         entry = {
+            "task_id": self.task_id,
             "step": step_num,
             "attempt": state.attempt_count,
             "epsilon": state.validation_log[-1].score if state.validation_log else None,
             "error_type": state.validation_log[-1].error_type.value if state.validation_log else None,
+            "validated_by": state.validation_log[-1].validated_by if state.validation_log else None,
+            "is_valid": state.validation_log[-1].is_valid if state.validation_log else None,
             "duration": duration
         }
+        # Model requests made since the previous step
+        step_calls = self.calls[self._step_call_start:]
+        self._step_call_start = len(self.calls)
+        latency_by_phase = {}
+        for call in step_calls:
+            latency_by_phase[call.phase] = latency_by_phase.get(call.phase, 0.0) + call.latency
+        entry.update({
+            "model_calls": sum(requests_sent(c) for c in step_calls),
+            "prompt_tokens": sum(c.prompt_tokens for c in step_calls if not c.cached),
+            "output_tokens": sum(c.output_tokens for c in step_calls if not c.cached),
+            "cost_usd": sum(c.cost_usd for c in step_calls),
+            "queue_wait": sum(c.queue_wait for c in step_calls),
+            "latency_by_phase": latency_by_phase,
+        })
+        if extra:
+            entry.update(extra)
+        if self.plan_step is not None:
+            entry["plan_step"] = self.plan_step
         self.logs.append(entry)
+        self._append("step", entry)
 
-    def save(self):
-        with open(LOG_DB_PATH, "w") as f:
-            json.dump(self.logs, f, indent=4)
+    def log_cache_stats(self):
+        """Snapshot the response cache's hit/miss counters into the run summary."""
+        cache = get_response_cache()
+        self.summary["cache"] = cache.stats() if cache is not None else {"enabled": False}
+        return self.summary["cache"]
+
+    def log_resilience_stats(self):
+        """Snapshot hedging, deadline and circuit-breaker counters into the run summary."""
+        self.summary["resilience"] = get_resilience().stats()
+        return self.summary["resilience"]
+
+    def log_validation_tiers(self, chain):
+        """Record per-tier verdict counts of a ValidatorChain and how many LLM judge calls it saved."""
+        self.summary["validation_tiers"] = {
+            "tiers": chain.stats,
+            "llm_calls_saved": chain.calls_saved(),
+        }
+        return self.summary["validation_tiers"]
 
-    def calculate_efficiency(self):
+    def log_judge_replies(self, validator) -> dict:
+        """
+        Record how the validator's JSON replies parsed: clean, repaired (by defect), re-asked or failed.
+        With a cascade, the fast tier's replies are recorded apart as "fast_judge_replies".
+        """
+        stats = validator.parse_stats
+        self.summary["judge_replies"] = dict(stats, repairs=dict(stats["repairs"]))
+        if validator.cascade is not None:
+            fast = validator.fast_parse_stats
+            self.summary["fast_judge_replies"] = dict(fast, repairs=dict(fast["repairs"]))
+        return self.summary["judge_replies"]
+
+    def log_cascade(self, cascade) -> dict:
+        """Record a JudgeCascade's escalations, per-tier agreement and latency."""
+        self.summary["cascade"] = cascade.stats()
+        return self.summary["cascade"]
+
+    def log_speculative_round(self, spec_round) -> dict:
+        """Accumulate wall-clock time saved vs extra calls spent by speculative execution."""
+        totals = self.summary.setdefault("speculative", {
+            "rounds": 0, "candidates": 0, "cancelled": 0, "model_calls": 0,
+            "extra_calls": 0, "wall_seconds": 0.0, "time_saved_seconds": 0.0,
+        })
+        totals["rounds"] += 1
+        totals["candidates"] += spec_round.candidates
+        totals["cancelled"] += spec_round.cancelled
+        totals["model_calls"] += spec_round.model_calls
+        totals["extra_calls"] += spec_round.extra_calls
+        totals["wall_seconds"] += spec_round.wall_seconds
+        totals["time_saved_seconds"] += spec_round.time_saved
+        return {"speculative": {
+            "candidates": spec_round.candidates,
+            "winner_strategy": spec_round.strategy,
+            "time_saved": spec_round.time_saved,
+            "extra_calls": spec_round.extra_calls,
+        }}
+
+    def log_tool_stats(self, tools) -> dict:
+        """Snapshot per-tool call counts, cache hits, timeouts and latency of a ToolInterface."""
+        self.summary["tools"] = tools.stats()
+        return self.summary["tools"]
+
+    def log_delta(self, executor) -> dict:
+        """Record an executor's delta retries: patches tried / applied / fallen back and output tokens saved."""
+        self.summary["delta"] = dict(executor.delta_stats)
+        return self.summary["delta"]
+
+    def log_duplicates(self, index) -> dict:
+        """Record how many validations a FingerprintIndex skipped by spotting repeated outputs."""
+        self.summary["duplicates"] = index.stats()
+        return self.summary["duplicates"]
+
+    def log_policy(self, policy) -> dict:
+        """Record which correction policy ran and, for the adaptive one, how it decided."""
+        self.summary["policy"] = policy.summary()
+        return self.summary["policy"]
+
+    def log_termination(self, terminator, state: AgentState) -> dict:
+        """Record why the loop ended, the attempt it returned and the model calls an early stop saved."""
+        calls_per_attempt = (sum(step["model_calls"] for step in self.logs) / len(self.logs)) if self.logs else None
+        self.summary["termination"] = terminator.stats(state.attempt_count, calls_per_attempt)
+        return self.summary["termination"]
+
+    def log_call_summary(self, accepted: int = None) -> dict:
+        """Per-phase latency/token/cost rollup of every request this workflow made."""
+        self.summary["calls"] = summarize_calls(self.calls, accepted)
+        return self.summary["calls"]
+
+    def save(self, summary_path: str = METRICS_SUMMARY_PATH):
+        """Append the run summary to the log store, flush it and write the summary file."""
+        if self.summary:
+            self._append("summary", self.summary)
+            with open(summary_path, "w") as f:
+                json.dump(self.summary, f, indent=4)
+        if self.store is not None:
+            self.store.flush()
+
+    def calculate_efficiency(self, per: str = "step"):
+        """
+        Error reduction (initial ε - final ε) per correction step, or per 1k tokens
+        (`per="token"`) or per second of model time (`per="second"`).
+        """
         if not self.logs:
             return 0.0
         initial_eps = self.logs[0].get('epsilon', 1.0)
         final_eps = self.logs[-1].get('epsilon', 1.0)
-        return (initial_eps - final_eps) / len(self.logs) if initial_eps > 0 else 0.0
\ No newline at end of file
+        if not initial_eps or initial_eps <= 0:
+            return 0.0
+        if per == "token":
+            cost = sum(c.total_tokens for c in self.calls if not c.cached) / 1000
+        elif per == "second":
+            cost = sum(c.latency for c in self.calls)
+        elif per == "step":
+            cost = len(self.logs)
+        else:
+            raise ValueError(f"Unknown efficiency unit: {per}")
+        return (initial_eps - final_eps) / cost if cost > 0 else 0.0
\ No newline at end of file
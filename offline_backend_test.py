@@ -0,0 +1,105 @@
+"""
+Offline Backend Test - Runs the full correction loop without network or API key
+
+This test shows how the agentic AI system now:
+1. Imports without GOOGLE_API_KEY or the Gemini SDK
+2. Selects a model backend by name from the registry
+3. Drives run_agentic_workflow against a deterministic stub backend
+4. Accounts tokens, latency and cost for every model call
+"""
+
+import json
+import sys
+from backends.registry import set_backend, available_backends, create_backend
+from backends.stub import StubBackend
+from utils.cache import ResponseCache, set_response_cache
+from main import run_agentic_workflow_async
+from metrics.logger import MetricsLogger
+from metrics.log_store import set_log_store
+import asyncio
+
+# Keep test runs out of the experiment log store
+set_log_store(None)
+
+
+def test_import_is_offline():
+    """Test that importing the agents does not load the Gemini SDK."""
+    print("=" * 70)
+    print("TEST 1: Offline Import")
+    print("=" * 70)
+    
+    print(f"Registered backends: {available_backends()}")
+    assert "gemini" in available_backends() and "stub" in available_backends()
+    assert "google.genai" not in sys.modules, "Gemini SDK should only load when the gemini backend is used"
+    print("✅ PASSED: Package imports without SDK or credentials!\n")
+
+
+def test_stub_backend_is_deterministic():
+    """Test that the stub backend returns the same answer for the same prompt."""
+    print("=" * 70)
+    print("TEST 2: Deterministic Stub Backend")
+    print("=" * 70)
+    
+    backend = create_backend("stub")
+    first = backend.generate("stub-model", "Calculate 2+2").text
+    second = backend.generate("stub-model", "Calculate 2+2").text
+    streamed = "".join(backend.stream("stub-model", "Calculate 2+2"))
+    
+    print(f"Answer: {first}")
+    assert first == second == streamed, "Stub answers must be stable across calls and streaming"
+    print("✅ PASSED: Stub backend is deterministic!\n")
+
+
+def test_workflow_runs_on_stub_backend():
+    """Test the full executor → validator → policy loop on a scripted stub."""
+    print("=" * 70)
+    print("TEST 3: Correction Loop on Stub Backend")
+    print("=" * 70)
+    
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            if "Agent's output:\n4\n" in prompt:
+                return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+            return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Wrong number."})
+        # First attempt is wrong, the retry (which carries feedback) is right
+        return "4" if "PREVIOUS ATTEMPT FAILED" in prompt else "5"
+    
+    set_response_cache(ResponseCache(db_path=None))
+    set_backend(StubBackend(responder=responder))
+    
+    state = asyncio.run(run_agentic_workflow_async("Calculate 2+2", verbose=False))
+    
+    print(f"Attempts: {state.attempt_count}, ε trajectory: {[v.score for v in state.validation_log]}")
+    assert state.attempt_count == 2, "Should retry once after the semantic failure"
+    assert state.validation_log[-1].is_valid, "Second attempt should be accepted"
+    print("✅ PASSED: Loop self-corrects entirely offline!\n")
+
+
+def test_call_accounting_per_phase():
+    """Test that every model request is recorded with its phase, tokens and cost."""
+    print("=" * 70)
+    print("TEST 4: Per-Call Accounting")
+    print("=" * 70)
+    
+    set_response_cache(ResponseCache(db_path=None))
+    set_backend(StubBackend())
+    logger = MetricsLogger()
+    
+    state = asyncio.run(run_agentic_workflow_async("Calculate 2+2", logger=logger, verbose=False))
+    calls = logger.summary["calls"]
+    
+    print(f"Phases: {list(calls['phases'])}, tokens: {calls['total_tokens']}, cost: ${calls['cost_usd']:.6f}")
+    assert set(calls["phases"]) == {"execute", "validate"}, "Executor and validator calls should be tagged"
+    assert calls["model_calls"] == len(logger.calls) == 2 * state.attempt_count
+    assert calls["total_tokens"] > 0 and calls["cost_usd"] > 0
+    assert logger.logs[0]["model_calls"] == 2, "Each step should report the calls it made"
+    assert calls["tokens_per_accepted"] == calls["total_tokens"], "One accepted answer carries the whole bill"
+    print("✅ PASSED: Calls are accounted per phase!\n")
+
+
+if __name__ == "__main__":
+    test_import_is_offline()
+    test_stub_backend_is_deterministic()
+    test_workflow_runs_on_stub_backend()
+    test_call_accounting_per_phase()
+    print("ALL TESTS PASSED! ✅")
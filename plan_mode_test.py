@@ -0,0 +1,151 @@
+"""
+Plan Mode Test - Planner step graph run as concurrent correction loops
+
+This test shows how the agentic AI system now:
+1. Parses the planner's step graph and orders it by dependencies
+2. Memoizes plans per task template, so repeated templates skip the planning call
+3. Runs every step in its own correction loop, retrying only the failed step
+4. Merges the step results in a final validated step
+5. Runs the task as one correction loop when the planning call fails
+"""
+
+import asyncio
+import json
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from agents.planner import PlanCache, PlannerAgent, StepGraph, PlanStep, parse_step_graph
+from main import run_plan_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+
+def test_step_graph_and_plan_cache():
+    """Test dependency ordering, rejected plans and template memoization."""
+    print("=" * 70)
+    print("TEST 1: Step Graph + Plan Cache")
+    print("=" * 70)
+    
+    graph = parse_step_graph(json.dumps({"steps": [
+        {"id": "c", "task": "Combine", "depends_on": ["a", "b"]},
+        {"id": "a", "task": "Part A", "depends_on": []},
+        {"id": "b", "task": "Part B", "depends_on": ["a", "ghost"]},
+    ]}))
+    print(f"Order: {[(s.id, s.depends_on) for s in graph.steps]}")
+    assert [s.id for s in graph.steps] == ["a", "b", "c"]
+    assert graph.step("b").depends_on == ["a"], "Unknown dependencies are dropped"
+    
+    cycle = {"steps": [{"id": "a", "task": "A", "depends_on": ["b"]}, {"id": "b", "task": "B", "depends_on": ["a"]}]}
+    assert parse_step_graph(json.dumps(cycle)) is None
+    assert parse_step_graph("Step 1: think. Step 2: answer.") is None
+    
+    cache = PlanCache()
+    cache.put("Compare the populations of 3 and 5 cities",
+              StepGraph([PlanStep("s1", "List 3 cities"), PlanStep("s2", "List 5 cities"),
+                         PlanStep("s3", "Compare them in 2 sentences", ["s1", "s2"])]))
+    reused = cache.get("compare the populations of  4 and 9 cities")
+    print(f"Reused plan: {[s.task for s in reused.steps]}")
+    assert [s.task for s in reused.steps] == ["List 4 cities", "List 9 cities", "Compare them in 2 sentences"]
+    assert cache.get("Something else entirely") is None
+    print("✅ PASSED: Graphs are ordered and plans generalize!\n")
+
+
+def test_plan_workflow():
+    """Test that steps run in their own loops, only the failed one retries, and plans are memoized."""
+    print("=" * 70)
+    print("TEST 2: Plan Workflow")
+    print("=" * 70)
+    
+    executor_prompts = []
+    
+    def responder(prompt):
+        if "Split the task below" in prompt:
+            task = prompt.rsplit("Task: ", 1)[1]
+            n = task.split()[3]
+            return json.dumps({"steps": [
+                {"id": "s1", "task": f"List {n} fruits", "depends_on": []},
+                {"id": "s2", "task": f"List {n} vegetables", "depends_on": []},
+                {"id": "s3", "task": "Pick one of each", "depends_on": ["s1", "s2"]},
+            ]})
+        if "QA Validator" in prompt:
+            # Vegetables are wrong until the correction feedback comes back
+            if "Agent's output:\nturnip\n" in prompt:
+                return json.dumps({"score": 0.9, "error_type": "semantic", "reasoning": "Turnip again?"})
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Fine."})
+        executor_prompts.append(prompt)
+        if "Combine the step results" in prompt:
+            return "apple and carrot"
+        if "vegetables" in prompt.split("(This is one step")[0]:
+            return "carrot" if "Turnip again?" in prompt else "turnip"
+        if "Pick one of each" in prompt:
+            return "apple, carrot"
+        return "apple"
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    planner = PlannerAgent(cache=PlanCache())
+    
+    logger = MetricsLogger()
+    state = asyncio.run(run_plan_workflow_async("Name and list 3 fruits and vegetables", logger=logger,
+                                                verbose=False, planner=planner))
+    plan = logger.summary["plan"]
+    print(f"Result: {state.current_result!r}; plan: {json.dumps({k: v for k, v in plan.items() if k != 'per_step'})}")
+    print(f"Per step: {plan['per_step']}")
+    assert state.current_result == "apple and carrot"
+    assert plan["steps"] == 3 and plan["retried_steps"] == 1
+    attempts = {s["id"]: s["attempts"] for s in plan["per_step"]}
+    assert attempts == {"s1": 1, "s2": 2, "s3": 1, "merge": 1}, "Only the failed step is retried"
+    s3_prompt = next(p for p in executor_prompts if "Pick one of each" in p.split("(This is one step")[0])
+    assert "[s1] apple" in s3_prompt and "[s2] carrot" in s3_prompt, "Dependent steps see accepted results"
+    assert sum(1 for c in logger.calls if c.phase == "plan") == 1
+    
+    logger = MetricsLogger()
+    asyncio.run(run_plan_workflow_async("Name and list 7 fruits and vegetables", logger=logger, verbose=False,
+                                        planner=planner))
+    print(f"Second run: plan_cached={logger.summary['plan']['plan_cached']}, cache {planner.cache.stats()}")
+    assert logger.summary["plan"]["plan_cached"]
+    assert not any(c.phase == "plan" for c in logger.calls), "A repeated template skips the planning call"
+    assert any("List 7 fruits" in p for p in executor_prompts)
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Steps run as a graph with per-step correction!\n")
+
+
+def test_planner_failure_falls_back():
+    """Test that a provider error on the planning call runs the task unsplit instead of failing it."""
+    print("=" * 70)
+    print("TEST 3: Planner Failure Fallback")
+    print("=" * 70)
+    
+    def responder(prompt):
+        if "Split the task below" in prompt:
+            raise RuntimeError("500 INTERNAL")
+        if "QA Validator" in prompt:
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Fine."})
+        return "apple and carrot"
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    
+    logger = MetricsLogger()
+    state = asyncio.run(run_plan_workflow_async("Name a fruit and a vegetable", logger=logger, verbose=False,
+                                                planner=PlannerAgent(cache=PlanCache())))
+    phases = [(c.phase, c.error) for c in logger.calls]
+    print(f"Result: {state.current_result!r} after {state.attempt_count} attempt(s), calls {phases}")
+    assert state.current_result == "apple and carrot" and state.validation_log[-1].is_valid
+    assert phases[0] == ("plan", "RuntimeError") and "plan" not in logger.summary
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: A failed plan costs one call, not the task!\n")
+
+
+if __name__ == "__main__":
+    test_step_graph_and_plan_cache()
+    test_plan_workflow()
+    test_planner_failure_falls_back()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -6,13 +6,23 @@ This test shows how the agentic AI system now:
 2. Extracts retry delays from error messages
 3. Implements exponential backoff
 4. Respects API rate limiting without burning through attempts
+5. Returns the tokens reserved for a request the server rejected
 """
 
 import time
+from contextlib import contextmanager
+import backends.registry as backend_registry
+import utils.cache as response_cache
+from backends.registry import set_backend
+from config import RATE_LIMIT_MAX_WAITS
+from utils.cache import set_response_cache
+from utils.llm import generate
+from utils.resilience import ResilienceManager, get_resilience, set_resilience
 from utils.types import ValidationResult, ErrorType
 from agents.validator import ValidatorAgent
 from correction.policy import CorrectionPolicy
 from utils.types import AgentState
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
 
 def test_rate_limit_detection():
     """Test that rate limit errors are correctly detected."""
@@ -192,6 +202,99 @@ def test_recovery_after_rate_limit():
     print("✅ PASSED: System successfully recovers after rate limit!\n")
 
 
+def test_scheduler_paces_requests():
+    """Test that the shared scheduler holds requests back once the RPM budget is spent."""
+    print("=" * 70)
+    print("TEST 7: Proactive RPM/TPM Pacing")
+    print("=" * 70)
+    
+    scheduler = RateLimitScheduler(quotas={"test-model": {"rpm": 3, "tpm": 1000}}, jitter=0.0)
+    
+    waits = [scheduler._reserve("test-model", 100) for _ in range(4)]
+    print(f"Waits for 4 requests at 3 RPM: {[round(w, 1) for w in waits]}")
+    
+    assert waits[:3] == [0.0, 0.0, 0.0], "First 3 requests should go straight through"
+    assert 19.0 < waits[3] <= 20.0, "4th request should wait ~20s for the next RPM slot"
+    
+    big_wait = scheduler._reserve("other-model", 10**9)
+    print(f"Oversized prompt on a fresh model waits: {big_wait:.1f}s")
+    assert big_wait == 0.0, "Oversized prompts are clamped to the TPM budget instead of waiting forever"
+    print("✅ PASSED: Scheduler paces requests before the server rejects them!\n")
+
+
+def test_scheduler_retry_hint_blocks_all_callers():
+    """Test that one 429 with a retry hint pauses every caller of that model."""
+    print("=" * 70)
+    print("TEST 8: Shared Retry Hint + Backoff")
+    print("=" * 70)
+    
+    scheduler = RateLimitScheduler(quotas={"test-model": {"rpm": 1000, "tpm": 10**6}}, jitter=0.0)
+    
+    first = scheduler.report_rate_limit("test-model", retry_after=10.0)
+    second = scheduler.report_rate_limit("test-model", retry_after=10.0)
+    wait = scheduler._reserve("test-model", 1)
+    
+    print(f"Pause after 1st 429: {first:.1f}s, after 2nd: {second:.1f}s, next caller waits: {wait:.1f}s")
+    
+    assert first == 10.0, "Should honor the server retry hint"
+    assert second == 15.0, "Consecutive 429s should back off by RATE_LIMIT_BACKOFF_MULTIPLIER"
+    assert 14.0 < wait <= 15.0, "Every caller should wait out the pause"
+    assert scheduler._reserve("unrelated-model", 1) == 0.0, "Other models should not be blocked"
+    print("✅ PASSED: Retry hints are shared by every waiting caller!\n")
+
+
+class RejectingBackend:
+    """Every request is rejected with a short server retry hint."""
+    def __init__(self):
+        self.calls = 0
+    
+    def generate(self, model, prompt, config=None):
+        self.calls += 1
+        raise RuntimeError("429 RESOURCE_EXHAUSTED: Please retry in 0.01 seconds")
+
+
+@contextmanager
+def _restored_globals():
+    """Put the process-wide backend, response cache, resilience manager and scheduler back afterwards."""
+    # Read the module globals directly: the getters would build a backend or cache that was never used
+    saved = (backend_registry._backend, response_cache._cache, response_cache._cache_enabled,
+             get_resilience(), get_scheduler())
+    try:
+        yield
+    finally:
+        backend_registry._backend, response_cache._cache, response_cache._cache_enabled = saved[:3]
+        set_resilience(saved[3])
+        set_scheduler(saved[4])
+
+
+def test_rejected_requests_release_tokens():
+    """Test that 429s, including the one a call gives up on, do not keep their TPM reservation."""
+    print("=" * 70)
+    print("TEST 9: Rejected Requests Release Their Tokens")
+    print("=" * 70)
+    
+    with _restored_globals():
+        set_resilience(ResilienceManager(hedging=False))
+        scheduler = RateLimitScheduler(quotas={"m": {"rpm": 10**6, "tpm": 6000}}, jitter=0.0)
+        set_scheduler(scheduler)
+        set_response_cache(None)
+        backend = RejectingBackend()
+        set_backend(backend)
+        
+        try:
+            generate("hi", model="m")
+            assert False, "The call should give up after RATE_LIMIT_MAX_WAITS retries"
+        except RuntimeError as e:
+            print(f"Gave up after {backend.calls} requests: {e}")
+        tokens = scheduler._bucket("m").tokens
+        print(f"TPM bucket afterwards: {tokens:.0f}/6000")
+        
+        assert backend.calls == RATE_LIMIT_MAX_WAITS + 1
+        # Each leaked reservation would cost 513 tokens; refill over the short backoff is ~5
+        assert tokens > 6000 - 50, "Rejected requests must not keep their reserved tokens"
+    print("✅ PASSED: A 429 costs a retry, not quota!\n")
+
+
 if __name__ == "__main__":
     print("\n")
     print("╔" + "="*68 + "╗")
@@ -206,6 +309,9 @@ if __name__ == "__main__":
         test_delay_extraction()
         test_no_infinite_loops()
         test_recovery_after_rate_limit()
+        test_scheduler_paces_requests()
+        test_scheduler_retry_hint_blocks_all_callers()
+        test_rejected_requests_release_tokens()
         
         print("╔" + "="*68 + "╗")
         print("║" + " "*20 + "ALL TESTS PASSED! ✅" + " "*28 + "║")
@@ -217,6 +323,7 @@ if __name__ == "__main__":
         print("✓ Retry delay extraction functional")
         print("✓ No infinite loops")
         print("✓ Recovery mechanism in place")
+        print("✓ Proactive scheduler pacing and shared retry hints")
         print("\nThe agentic AI system now properly handles API rate limiting!")
         
     except AssertionError as e:
@@ -0,0 +1,168 @@
+"""
+Resilience Test - Deadlines, hedged requests and circuit breaker
+
+This test shows how the agentic AI system now:
+1. Abandons a model call that runs past its phase deadline
+2. Sends a hedged duplicate once a call outlives the observed p95
+3. Opens a per-model circuit on errors, routes to a fallback model and probes to recover
+4. Refunds the quota reserved for a hedge once only one answer is used
+"""
+
+import asyncio
+import time
+import backends.registry as backend_registry
+import utils.cache as response_cache
+from backends.registry import set_backend
+from utils.cache import set_response_cache
+from utils.llm import generate_async
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.resilience import CircuitBreaker, DeadlineExceeded, ResilienceManager, get_resilience, set_resilience
+from utils.types import LLMResponse
+
+
+def test_deadline_and_hedge():
+    """Test that a hung call is hedged past p95 and a call with no answer hits the deadline."""
+    print("=" * 70)
+    print("TEST 1: Deadline + Hedged Request")
+    print("=" * 70)
+    
+    manager = ResilienceManager(deadlines={"execute": 0.5}, hedge_min_delay=0.05)
+    for _ in range(20):
+        manager.record("m", "execute", latency=0.01)
+    
+    calls = []
+    
+    async def flaky_call():
+        calls.append(time.perf_counter())
+        await asyncio.sleep(10 if len(calls) == 1 else 0.01)   # only the first request hangs
+        return "answer"
+    
+    start = time.perf_counter()
+    result, hedged = asyncio.run(manager.call_async("m", "execute", flaky_call))
+    elapsed = time.perf_counter() - start
+    print(f"Result: {result}, hedged: {hedged}, took {elapsed:.2f}s, stats: {manager.stats()}")
+    assert result == "answer" and hedged and manager.hedges_won == 1
+    assert elapsed < 0.4, "The hedge should answer long before the hung request"
+    
+    async def hung_call():
+        await asyncio.sleep(10)
+    
+    no_hedge = ResilienceManager(deadlines={"execute": 0.2}, hedging=False)
+    try:
+        asyncio.run(no_hedge.call_async("m", "execute", hung_call))
+        assert False, "Should have raised DeadlineExceeded"
+    except DeadlineExceeded as e:
+        print(f"Deadline: {e}")
+    assert no_hedge.deadlines_exceeded == 1
+    print("✅ PASSED: Tail latency is bounded!\n")
+
+
+class OutageBackend:
+    """The primary model is down (until `down` is cleared); the fallback model works."""
+    def __init__(self):
+        self.down = True
+    
+    async def generate_async(self, model, prompt, config=None):
+        if model == "primary" and self.down:
+            raise ConnectionError("503 Service Unavailable")
+        return LLMResponse(text=f"answer from {model}", model=model)
+
+
+def test_circuit_breaker_routes_to_fallback():
+    """Test that repeated failures open the circuit, calls fail over, and a probe closes it."""
+    print("=" * 70)
+    print("TEST 2: Circuit Breaker + Fallback")
+    print("=" * 70)
+    
+    previous = get_resilience(), get_scheduler()
+    set_resilience(ResilienceManager(fallbacks={"primary": "fallback"}, hedging=False,
+                                     breaker_factory=lambda: CircuitBreaker(min_calls=3, open_seconds=0.2)))
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    backend = OutageBackend()
+    set_backend(backend)
+    
+    async def run():
+        errors = 0
+        for _ in range(3):
+            try:
+                await generate_async("hi", model="primary")
+            except ConnectionError:
+                errors += 1
+        answer = await generate_async("hi", model="primary")
+        return errors, answer
+    
+    errors, answer = asyncio.run(run())
+    breaker = get_resilience().breaker("primary")
+    print(f"Errors before opening: {errors}, then: '{answer.text}', breaker: {breaker.stats()}")
+    assert errors == 3 and answer.model == "fallback"
+    assert breaker.state == CircuitBreaker.OPEN
+    
+    # After the open period one half-open probe goes to the primary again
+    time.sleep(0.25)
+    backend.down = False
+    asyncio.run(generate_async("hi", model="primary"))
+    print(f"After probe: {breaker.stats()}")
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    set_resilience(previous[0])
+    set_scheduler(previous[1])
+    print("✅ PASSED: Outages fail over and recover!\n")
+
+
+class HedgedBackend:
+    """The first request hangs; the hedged duplicate answers (or, with `fail`, every request errors)."""
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+    
+    async def generate_async(self, model, prompt, config=None):
+        self.calls += 1
+        await asyncio.sleep(0.3 if self.calls == 1 else 0.01)
+        if self.fail:
+            raise ValueError("500 Internal Server Error")
+        return LLMResponse(text="answer", model=model, prompt_tokens=6, output_tokens=4, total_tokens=10)
+
+
+def test_hedge_reservation_refunded():
+    """Test that the TPM bucket only keeps the winner's usage after a hedged request."""
+    print("=" * 70)
+    print("TEST 3: Hedge Quota Settlement")
+    print("=" * 70)
+    
+    # Read the module globals directly: the getters would build a backend or cache that was never used
+    previous = (backend_registry._backend, response_cache._cache, response_cache._cache_enabled,
+                get_resilience(), get_scheduler())
+    set_response_cache(None)
+    try:
+        for fail in (False, True):
+            manager = ResilienceManager(deadlines={"execute": 1.0}, hedge_min_delay=0.05)
+            for _ in range(20):
+                manager.record("m", "execute", latency=0.01)
+            set_resilience(manager)
+            scheduler = RateLimitScheduler(quotas={"m": {"rpm": 10**6, "tpm": 6000}}, jitter=0.0)
+            set_scheduler(scheduler)
+            backend = HedgedBackend(fail=fail)
+            set_backend(backend)
+            try:
+                answer = asyncio.run(generate_async("hi", model="m")).text
+            except ValueError as e:
+                answer = f"error: {e}"
+            tokens = scheduler._bucket("m").tokens
+            print(f"fail={fail}: {answer!r} after {backend.calls} requests, {manager.hedges_sent} hedge, "
+                  f"TPM bucket {tokens:.0f}/6000")
+            assert backend.calls == 2 and manager.hedges_sent == 1
+            # Refill adds ~100 tokens/s; a leaked reservation would be 513 tokens short
+            assert tokens > 6000 - 10 - 50, "Only the winner's actual usage may stay reserved"
+    finally:
+        backend_registry._backend, response_cache._cache, response_cache._cache_enabled = previous[:3]
+        set_resilience(previous[3])
+        set_scheduler(previous[4])
+    print("✅ PASSED: A hedge costs its quota only while it is in flight!\n")
+
+
+if __name__ == "__main__":
+    test_deadline_and_hedge()
+    test_circuit_breaker_routes_to_fallback()
+    test_hedge_reservation_refunded()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Response Cache Test - Two-tier cache for model responses
+
+This test shows how the agentic AI system now:
+1. Answers a repeated (model, prompt, config) request from memory
+2. Evicts the least recently used entry once the memory tier is full
+3. Expires entries older than the TTL in both tiers
+4. Keeps responses in the SQLite tier across process restarts
+5. Never caches empty responses, error-tagged responses or failed calls
+"""
+
+import os
+import tempfile
+import time
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from utils.cache import ResponseCache, set_response_cache
+from utils.llm import generate
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import LLMResponse
+
+
+def _response(text):
+    return LLMResponse(text=text, model="m", prompt_tokens=3, output_tokens=2, total_tokens=5)
+
+
+def test_hit_and_miss():
+    """Test that a stored response is served from memory and keyed on model, prompt and config."""
+    print("=" * 70)
+    print("TEST 1: Hit + Miss")
+    print("=" * 70)
+
+    cache = ResponseCache(max_entries=4, ttl_seconds=None, db_path=None)
+    key = cache.make_key("m", "What is 2 + 2?", {"temperature": 0})
+    assert cache.get(key) is None
+    cache.put(key, _response("4"))
+    hit = cache.get(key)
+    print(f"Hit: {hit.text!r} (cached={hit.cached}), stats {cache.stats()}")
+    assert hit.text == "4" and hit.cached and hit.total_tokens == 5
+    assert key != cache.make_key("m", "What is 2 + 2?", {"temperature": 1})
+    assert key != cache.make_key("other", "What is 2 + 2?", {"temperature": 0})
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1 and cache.stats()["hit_rate"] == 0.5
+    print("✅ PASSED: Repeated requests are answered from the cache!\n")
+
+
+def test_lru_eviction():
+    """Test that the memory tier drops the least recently used entry when full."""
+    print("=" * 70)
+    print("TEST 2: LRU Eviction")
+    print("=" * 70)
+
+    cache = ResponseCache(max_entries=2, ttl_seconds=None, db_path=None)
+    cache.put("a", _response("A"))
+    cache.put("b", _response("B"))
+    assert cache.get("a").text == "A", "Touching 'a' makes 'b' the least recently used"
+    cache.put("c", _response("C"))
+    print(f"Entries: {list(cache._memory)}, stats {cache.stats()}")
+    assert cache.get("b") is None
+    assert cache.get("a").text == "A" and cache.get("c").text == "C"
+    assert cache.stats()["memory_entries"] == 2
+    print("✅ PASSED: The memory tier stays within its size cap!\n")
+
+
+def test_ttl_expiry():
+    """Test that expired entries are dropped from memory and disk."""
+    print("=" * 70)
+    print("TEST 3: TTL Expiry")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(max_entries=4, ttl_seconds=0.05, db_path=os.path.join(tmp, "cache.sqlite"))
+        cache.put("k", _response("fresh"))
+        assert cache.get("k").text == "fresh"
+        time.sleep(0.1)
+        assert cache.get("k") is None
+        rows = cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        print(f"Stats after expiry: {cache.stats()}, disk rows {rows}")
+        assert rows == 0 and "k" not in cache._memory
+        cache._db.close()
+    print("✅ PASSED: Stale responses are never served!\n")
+
+
+def test_disk_persistence():
+    """Test that a new cache on the same file answers from disk and promotes the entry."""
+    print("=" * 70)
+    print("TEST 4: Disk Persistence")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        first = ResponseCache(max_entries=4, ttl_seconds=None, db_path=path)
+        first.put("k", _response("persisted"))
+        first._db.close()
+
+        second = ResponseCache(max_entries=4, ttl_seconds=None, db_path=path)
+        hit = second.get("k")
+        again = second.get("k")
+        print(f"Restarted: {hit.text!r}, stats {second.stats()}")
+        assert hit.text == "persisted" and hit.cached and hit.total_tokens == 5 and again.text == "persisted"
+        assert second.stats()["disk_hits"] == 1 and second.stats()["memory_hits"] == 1, "Disk hits are promoted"
+        second.clear()
+        assert second.get("k") is None
+        second._db.close()
+    print("✅ PASSED: Responses survive a restart!\n")
+
+
+def test_errors_never_cached():
+    """Test that empty and error-tagged responses and failed calls leave the cache untouched."""
+    print("=" * 70)
+    print("TEST 5: Errors Never Cached")
+    print("=" * 70)
+
+    cache = ResponseCache(max_entries=8, ttl_seconds=None, db_path=None)
+    for text in ["", "   \n", "[RATE_LIMIT_429] slow down", "[EXECUTION_ERROR] boom", "[CONSTRAINT_VIOLATION] x"]:
+        cache.put(text, _response(text))
+        assert cache.get(text) is None, f"{text!r} must not be cached"
+    assert cache.stats()["stores"] == 0 and cache.stats()["memory_entries"] == 0
+
+    def responder(prompt):
+        if prompt == "fail":
+            raise ValueError("provider exploded")
+        return "" if prompt == "empty" else "fine"
+
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(cache)
+    set_backend(StubBackend(responder=responder))
+    try:
+        generate("fail", model="m")
+        assert False, "The provider error must be raised"
+    except ValueError:
+        pass
+    assert generate("empty", model="m").text == ""
+    assert generate("ok", model="m").text == "fine" and generate("ok", model="m").cached
+    print(f"Stats: {cache.stats()}")
+    assert cache.stats()["stores"] == 1 and cache.stats()["memory_entries"] == 1
+    set_response_cache(None)
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Only real answers are cached!\n")
+
+
+if __name__ == "__main__":
+    test_hit_and_miss()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_disk_persistence()
+    test_errors_never_cached()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Speculative Test - Best-of-N candidates per correction attempt
+
+This test shows how the agentic AI system now:
+1. Takes the first accepted candidate and cancels the others
+2. Lets every candidate finish and keeps the best score when losers are not cancelled
+3. Narrows each round to the candidates the remaining call budget can pay for
+4. Stops speculating once the budget is spent and falls back to normal single attempts
+5. Counts the model calls of cancelled losers against the budget
+"""
+
+import asyncio
+import json
+import main
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from correction.speculative import SpeculativeExecutor
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.llm import generate_async, set_call_recorder
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import ErrorType, ValidationResult
+
+set_log_store(None)
+
+
+def _verdict(score):
+    return ValidationResult(is_valid=score < 0.2, score=score, error_type=ErrorType.NONE if score < 0.2 else ErrorType.SEMANTIC,
+                            feedback="")
+
+
+def _scripted_attempt(delays, scores, cancelled):
+    """attempt_fn whose candidate for `strategy` sleeps delays[strategy] and scores scores[strategy]."""
+    async def attempt(strategy, temperature):
+        try:
+            await asyncio.sleep(delays[strategy])
+        except asyncio.CancelledError:
+            cancelled.append(strategy)
+            raise
+        return f"answer {strategy}", _verdict(scores[strategy])
+    return attempt
+
+
+def test_losers_cancelled():
+    """Test that the first accepted candidate wins and the slower ones are cancelled."""
+    print("=" * 70)
+    print("TEST 1: Loser Cancellation")
+    print("=" * 70)
+
+    delays = {"a": 0.5, "b": 0.01, "c": 0.5}
+    scores = {"a": 0.0, "b": 0.1, "c": 0.6}
+    cancelled = []
+    speculator = SpeculativeExecutor(n=3, max_calls=100, cancel_losers=True)
+    spec_round = asyncio.run(speculator.run_round(_scripted_attempt(delays, scores, cancelled), ["a", "b", "c"]))
+    print(f"Winner {spec_round.strategy!r} after {spec_round.wall_seconds:.2f}s, cancelled {sorted(cancelled)}")
+    assert spec_round.strategy == "b" and spec_round.result == "answer b"
+    assert spec_round.candidates == 3 and spec_round.cancelled == 2 and sorted(cancelled) == ["a", "c"]
+    assert spec_round.wall_seconds < 0.4
+
+    cancelled = []
+    patient = SpeculativeExecutor(n=3, max_calls=100, cancel_losers=False)
+    scores = {"a": 0.5, "b": 0.3, "c": 0.4}
+    spec_round = asyncio.run(patient.run_round(_scripted_attempt(delays, scores, cancelled), ["a", "b", "c"]))
+    print(f"Without cancellation: winner {spec_round.strategy!r}, cancelled {spec_round.cancelled}")
+    assert spec_round.strategy == "b" and spec_round.cancelled == 0 and not cancelled
+    print("✅ PASSED: Losers stop as soon as a candidate is accepted!\n")
+
+
+def _setup(responder):
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    return previous_scheduler
+
+
+def test_budget_caps_rounds():
+    """Test that rounds shrink to the remaining budget and never spend past it."""
+    print("=" * 70)
+    print("TEST 2: Call Budget")
+    print("=" * 70)
+
+    previous_scheduler = _setup(lambda prompt: "draft")
+
+    async def attempt(strategy, temperature):
+        result = await generate_async(f"execute {strategy}", use_cache=False)
+        await generate_async(f"judge {strategy}", use_cache=False, phase="validate")
+        return result.text, _verdict(0.6)
+
+    speculator = SpeculativeExecutor(n=3, max_calls=9)
+    widths = []
+    for _ in range(5):
+        if not speculator.width():
+            break
+        widths.append(speculator.width())
+        asyncio.run(speculator.run_round(attempt, ["a", "b", "c"]))
+    print(f"Round widths {widths}, spent {speculator.calls_spent} of {speculator.max_calls}")
+    assert widths == [3, 1] and speculator.calls_spent == 8
+    assert SpeculativeExecutor(n=3, max_calls=1).width() == 0, "One call cannot pay for a candidate"
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Speculation stops at the call budget!\n")
+
+
+def test_workflow_falls_back_to_single_attempts():
+    """Test that a workflow keeps retrying one candidate at a time once the budget is spent."""
+    print("=" * 70)
+    print("TEST 3: Fallback To Single Attempts")
+    print("=" * 70)
+
+    executor_calls = []
+
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            return json.dumps({"score": 0.6, "error_type": "semantic", "reasoning": "Not yet."})
+        executor_calls.append(prompt)
+        return f"Draft {len(executor_calls)}"
+
+    previous_scheduler = _setup(responder)
+    default_speculator = main.SpeculativeExecutor
+    main.SpeculativeExecutor = lambda: default_speculator(n=3, max_calls=7)
+    try:
+        logger = MetricsLogger()
+        state = asyncio.run(run_agentic_workflow_async("Write a haiku", logger=logger, verbose=False,
+                                                     speculative=True, dedup=False))
+    finally:
+        main.SpeculativeExecutor = default_speculator
+    rounds = [entry["speculative"]["candidates"] for entry in logger.logs if "speculative" in entry]
+    print(f"Attempts: {state.attempt_count}, speculative rounds {rounds}, {len(logger.calls)} model calls")
+    assert rounds == [3] and logger.summary["speculative"]["model_calls"] == 6
+    assert state.attempt_count == 5 and len(executor_calls) == 3 + 4 and len(logger.calls) == 6 + 8
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: A spent budget no longer forces extra speculative rounds!\n")
+
+
+class RacingStub(StubBackend):
+    """Requests for the "slow" strategy hang until they are cancelled."""
+    async def generate_async(self, model, prompt, config=None):
+        await asyncio.sleep(10 if "slow" in prompt else 0.01)
+        return self.generate(model, prompt, config)
+
+
+def test_cancelled_calls_count():
+    """Test that a cancelled loser's request is recorded and charged to the budget."""
+    print("=" * 70)
+    print("TEST 4: Cancelled Calls Count")
+    print("=" * 70)
+
+    previous_scheduler = _setup(lambda prompt: "draft")
+    set_backend(RacingStub(responder=lambda prompt: "draft"))
+    logger = MetricsLogger()
+    set_call_recorder(logger)
+
+    async def attempt(strategy, temperature):
+        result = await generate_async(f"execute {strategy}", use_cache=False)
+        return result.text, _verdict(0.0 if strategy == "fast" else 0.6)
+
+    speculator = SpeculativeExecutor(n=3, max_calls=100)
+    spec_round = asyncio.run(speculator.run_round(attempt, ["slow", "fast", "slow too"]))
+    errors = sorted(str(call.error) for call in logger.calls)
+    print(f"Winner {spec_round.strategy!r}: {spec_round.model_calls} calls, {spec_round.extra_calls} extra, "
+          f"cancelled {spec_round.cancelled}, records {errors}")
+    assert spec_round.strategy == "fast" and spec_round.cancelled == 2
+    assert spec_round.model_calls == 3 and spec_round.extra_calls == 2 and speculator.calls_spent == 3
+    assert errors == ["None", "cancelled", "cancelled"]
+    set_call_recorder(None)
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Losers are paid for, and counted!\n")
+
+
+if __name__ == "__main__":
+    test_losers_cancelled()
+    test_budget_caps_rounds()
+    test_workflow_falls_back_to_single_attempts()
+    test_cancelled_calls_count()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
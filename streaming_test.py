@@ -0,0 +1,130 @@
+"""
+Streaming Test - Executor output checked chunk by chunk
+
+This test shows how the agentic AI system now:
+1. Closes the executor stream on the first constraint violation instead of reading it to the end
+2. Records the aborted request with the tokens of the partial output
+3. Runs a correction loop to the same result whether the executor streams or not
+"""
+
+import asyncio
+import json
+from agents.constraints import CONSTRAINT_VIOLATION_TAG, build_constraints
+from agents.executor import ExecutorAgent
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.llm import set_call_recorder
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+LONG_ANSWER = "Paris is the capital of France. " * 10
+SHORT_ANSWER = "Paris."
+
+
+class CountingStub(StubBackend):
+    """Stub backend that counts the chunks each stream handed out and whether it was closed early."""
+    def __init__(self, responder, chunk_size=16):
+        super().__init__(responder=responder, chunk_size=chunk_size)
+        self.streams = []
+
+    def stream(self, model, prompt, config=None):
+        text = self.generate(model, prompt, config).text
+        record = {"total": -(-len(text) // self.chunk_size), "yielded": 0, "closed_early": False}
+        self.streams.append(record)
+        try:
+            for i in range(0, len(text), self.chunk_size):
+                record["yielded"] += 1
+                yield text[i:i + self.chunk_size]
+        except GeneratorExit:
+            record["closed_early"] = True
+            raise
+
+
+def _responder(prompt):
+    if "QA Validator" in prompt:
+        output = prompt.split("Agent's output:\n", 1)[1].split("\n", 1)[0]
+        if output == SHORT_ANSWER:
+            return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+        return json.dumps({"score": 0.6, "error_type": "semantic", "reasoning": "Too vague."})
+    return SHORT_ANSWER if "character limit" in prompt or "briefly" in prompt else LONG_ANSWER
+
+
+def _setup(backend):
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(backend)
+    return previous_scheduler
+
+
+def test_violation_closes_stream():
+    """Test that the sync and async streaming executors stop reading at the first violation."""
+    print("=" * 70)
+    print("TEST 1: Constraint Violation Aborts The Stream")
+    print("=" * 70)
+
+    backend = CountingStub(_responder)
+    previous_scheduler = _setup(backend)
+    logger = MetricsLogger()
+    set_call_recorder(logger)
+    executor = ExecutorAgent()
+    constraints = build_constraints({"max_chars": 40})
+    results = [executor.execute_stream("Where is Paris?", constraints=constraints, use_cache=False),
+               asyncio.run(executor.execute_stream_async("Where is Paris?", constraints=constraints,
+                                                         use_cache=False))]
+    set_call_recorder(None)
+    print(f"Results: {results}")
+    print(f"Streams: {backend.streams}")
+    for result, record, call in zip(results, backend.streams, logger.calls):
+        assert result == f"{CONSTRAINT_VIOLATION_TAG} Output exceeds the 40-character limit."
+        assert record["closed_early"] and record["yielded"] == 3 < record["total"]
+        assert call.error == "aborted" and 0 < call.output_tokens < len(LONG_ANSWER) // 4
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: The rest of a violating output is never generated!\n")
+
+
+def _run_workflow(task, streaming, constraints=None):
+    backend = CountingStub(_responder)
+    previous_scheduler = _setup(backend)
+    logger = MetricsLogger()
+    state = asyncio.run(run_agentic_workflow_async(task, logger=logger, verbose=False, constraints=constraints,
+                                                 streaming=streaming))
+    set_scheduler(previous_scheduler)
+    return state, backend
+
+
+def _outcome(state):
+    return (state.current_result, state.attempt_count,
+            [(v.is_valid, v.score, v.error_type, v.feedback) for v in state.validation_log])
+
+
+def test_streaming_matches_non_streaming():
+    """Test that a streamed loop ends with the same result as the non-streaming one."""
+    print("=" * 70)
+    print("TEST 2: Streaming Matches Non-Streaming")
+    print("=" * 70)
+
+    cases = [
+        ("Where is Paris? Answer briefly.", None, [False]),
+        ("Where is Paris?", {"max_chars": 40}, [True, False]),
+    ]
+    for task, constraints, closed_early in cases:
+        streamed, streamed_backend = _run_workflow(task, True, constraints)
+        plain, plain_backend = _run_workflow(task, False, constraints)
+        print(f"{task!r} {constraints}: {_outcome(streamed)}")
+        assert _outcome(streamed) == _outcome(plain)
+        assert streamed.current_result == SHORT_ANSWER and streamed.attempt_count == len(closed_early)
+        assert not plain_backend.streams
+        assert [record["closed_early"] for record in streamed_backend.streams] == closed_early
+    print("✅ PASSED: Streaming changes the cost of an attempt, not its outcome!\n")
+
+
+if __name__ == "__main__":
+    test_violation_closes_stream()
+    test_streaming_matches_non_streaming()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Termination Test - Convergence-aware early termination of the correction loop
+
+This test shows how the agentic AI system now:
+1. Stops a loop whose ε has plateaued or whose trend cannot reach the threshold in time
+2. Keeps going while ε is converging
+3. Optionally accepts a good-enough result when few attempts remain
+4. Returns the best attempt instead of the last one
+5. Reports calls saved and audits the accuracy cost of stopping early
+"""
+
+import asyncio
+import json
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from correction.termination import TerminationController
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+from utils.types import AgentState, ErrorType, ValidationResult
+
+set_log_store(None)
+
+
+def _verdict(score):
+    return ValidationResult(is_valid=score < 0.2, score=score, error_type=ErrorType.NONE if score < 0.2 else ErrorType.SEMANTIC,
+                            feedback="")
+
+
+def _replay(controller, scores):
+    """Feed a score trajectory through the controller; returns (reason, attempts used, state)."""
+    state = AgentState(task="t")
+    for attempt, score in enumerate(scores, 1):
+        state.attempt_count = attempt
+        state.current_result = f"answer {attempt}"
+        validation = _verdict(score)
+        state.validation_log.append(validation)
+        controller.observe(attempt, state.current_result, validation)
+        action = "accept" if validation.is_valid else ("stop_max_retries" if attempt >= 5 else "retry_reasoning")
+        if controller.should_terminate(action, state):
+            controller.finish(state)
+            return controller.reason, attempt, state
+    raise AssertionError("The trajectory ended without a decision")
+
+
+def test_trajectory_decisions():
+    """Test plateau, trend, convergence and good-enough decisions on scripted trajectories."""
+    print("=" * 70)
+    print("TEST 1: Trajectory Decisions")
+    print("=" * 70)
+
+    cases = [
+        ([0.9, 0.9, 0.88, 0.9, 0.9], {}, "stop_plateau", 3),
+        ([0.9, 0.75, 0.6, 0.45, 0.3], {}, "stop_trend", 3),
+        ([0.9, 0.6, 0.35, 0.1], {}, "accept", 4),
+        ([0.6, 0.4, 0.3, 0.25, 0.3], {}, "stop_max_retries", 5),
+        ([0.6, 0.4, 0.3, 0.22, 0.3], {"good_enough_margin": 0.05}, "accept_good_enough", 4),
+        ([0.9, 0.9, 0.9, 0.9, 0.9], {"early_stop": False}, "stop_max_retries", 5),
+    ]
+    for scores, options, expected, attempts in cases:
+        controller = TerminationController(**dict({"early_stop": True}, **options))
+        reason, used, state = _replay(controller, scores)
+        print(f"{scores} {options} -> {reason} after {used}, returns {state.current_result!r}")
+        assert (reason, used) == (expected, attempts)
+        assert controller.accepted == (expected in ("accept", "accept_good_enough"))
+        assert controller.verdict.score == min(scores[:used]) or controller.verdict.is_valid
+
+    controller = TerminationController(early_stop=False)
+    _, _, state = _replay(controller, [0.9, 0.55, 0.7, 0.6, 0.65])
+    assert controller.returned_best and state.current_result == "answer 2" and controller.best_score == 0.55
+    assert controller.verdict.score == 0.55 and not controller.accepted, "The verdict matches the returned attempt"
+    stats = controller.stats(state.attempt_count)
+    print(f"Stats: {stats}")
+    assert stats["early"] is False and stats["attempts_saved"] == 0
+    print("✅ PASSED: The trajectory decides when to stop!\n")
+
+
+def test_workflow_stops_early():
+    """Test that a stuck loop stops after the plateau window and returns its best attempt."""
+    print("=" * 70)
+    print("TEST 2: Stuck Loop Stops Early")
+    print("=" * 70)
+
+    scores = {"Draft 1": 0.9, "Draft 2": 0.88, "Draft 3": 0.9}
+    executor_calls = []
+
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            output = prompt.split("Agent's output:\n", 1)[1].split("\n", 1)[0]
+            return json.dumps({"score": scores.get(output, 0.9), "error_type": "semantic", "reasoning": "Still wrong."})
+        executor_calls.append(prompt)
+        return f"Draft {len(executor_calls)}"
+
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=responder))
+    logger = MetricsLogger()
+    state = asyncio.run(run_agentic_workflow_async("Prove the Riemann hypothesis", logger=logger, verbose=False,
+                                                 early_stop=True))
+    termination = logger.summary["termination"]
+    print(f"Attempts: {state.attempt_count}, result: {state.current_result!r}, termination: {termination}")
+    assert state.attempt_count == 3 and len(executor_calls) == 3
+    assert termination["reason"] == "stop_plateau" and termination["attempts_saved"] == 2
+    assert termination["calls_saved"] == 4, "Two attempts of one executor and one judge call each"
+    assert state.current_result == "Draft 2" and termination["returned_best"] and termination["best_attempt"] == 2
+    assert termination["score"] == 0.88 and termination["accepted"] is False
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: A stuck loop no longer burns the whole retry budget!\n")
+
+
+def test_audit_measures_accuracy_cost():
+    """Test that an audited early stop runs on and records whether the loop succeeded after all."""
+    print("=" * 70)
+    print("TEST 3: Early-Stop Audit")
+    print("=" * 70)
+
+    late_bloomer = TerminationController(early_stop=True, audit_rate=1.0)
+    reason, used, _ = _replay(late_bloomer, [0.9, 0.9, 0.9, 0.1])
+    print(f"Late bloomer: {reason} after {used}, audit {late_bloomer.audit}")
+    assert reason == "accept" and used == 4
+    assert late_bloomer.audit == {"reason": "stop_plateau", "attempt": 3, "accepted_later": True, "extra_attempts": 1}
+
+    stuck = TerminationController(early_stop=True, audit_rate=1.0)
+    reason, used, _ = _replay(stuck, [0.9, 0.9, 0.9, 0.9, 0.9])
+    print(f"Stuck: {reason} after {used}, audit {stuck.audit}")
+    assert reason == "stop_max_retries" and stuck.audit["accepted_later"] is False
+    assert stuck.stats(used)["audit"]["extra_attempts"] == 2
+    print("✅ PASSED: Audits measure how often stopping early would have cost an answer!\n")
+
+
+if __name__ == "__main__":
+    test_trajectory_decisions()
+    test_workflow_stops_early()
+    test_audit_measures_accuracy_cost()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Tool Engine Test - Registry, concurrent tool calls, timeouts and memoization
+
+This test shows how the agentic AI system now:
+1. Evaluates calculator expressions safely from cached compiled ASTs
+2. Runs the tool calls of one step concurrently, each under a timeout
+3. Kills a runaway isolated tool without stalling the agent, and memoizes deterministic tools
+4. Keeps concurrent isolated calls alive when another call on the shared pool times out
+5. Lets the executor request tools and answer from their results
+"""
+
+import asyncio
+import json
+import time
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from agents.executor import ExecutorAgent
+from environment.tool_interace import ToolCall, ToolInterface, calculator, compile_expression
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+
+def slow_square(x: int):
+    """Isolated tool (module level, so the worker process can unpickle it)."""
+    time.sleep(0.8)
+    return x * x
+
+
+def test_safe_calculator():
+    """Test that arithmetic works, ASTs are cached and anything else is rejected."""
+    print("=" * 70)
+    print("TEST 1: Safe Calculator")
+    print("=" * 70)
+    
+    compile_expression.cache_clear()
+    assert calculator("17 * 23") == 391
+    assert calculator("2^10 + sqrt(16)") == 1028.0
+    assert abs(calculator("sin(pi / 2)") - 1.0) < 1e-9
+    for _ in range(100):
+        calculator("17 * 23")
+    info = compile_expression.cache_info()
+    print(f"AST cache: {info}")
+    assert info.hits >= 100 and info.misses == 3
+    
+    tools = ToolInterface()
+    for expression in ["__import__('os').system('echo hi')", "().__class__", "open('x')", "[1, 2]"]:
+        result = tools.call("calculator", {"expression": expression})
+        print(f"{expression!r} -> {result.error}")
+        assert not result.ok
+    assert tools.execute_tool("calculator", {"expression": "6 * 7"}) == 42
+    assert tools.execute_tool("nope", {}).startswith("Tool error")
+    tools.close()
+    print("✅ PASSED: Calculator is safe and cached!\n")
+
+
+def test_concurrency_timeout_memoization():
+    """Test concurrent calls, a killed runaway calculation and memoized results."""
+    print("=" * 70)
+    print("TEST 2: Concurrency + Timeout + Memoization")
+    print("=" * 70)
+    
+    tools = ToolInterface(timeout=1.0)
+    
+    @tools.register("slow_lookup", description="Sleeps, then echoes", deterministic=True)
+    async def slow_lookup(key: str):
+        await asyncio.sleep(0.3)
+        return key.upper()
+    
+    async def run():
+        calls = [ToolCall("slow_lookup", {"key": k}) for k in "abcd"]
+        start = time.perf_counter()
+        results = await tools.call_many_async(calls)
+        concurrent_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        runaway = await tools.call_async("calculator", {"expression": "9**9**9**9"})
+        runaway_time = time.perf_counter() - start
+        
+        after = await tools.call_async("calculator", {"expression": "1 + 1"})
+        cached = await tools.call_many_async(calls)
+        return results, concurrent_time, runaway, runaway_time, after, cached
+    
+    results, concurrent_time, runaway, runaway_time, after, cached = asyncio.run(run())
+    print(f"4 x 0.3s lookups in {concurrent_time:.2f}s -> {[r.output for r in results]}")
+    print(f"Runaway: {runaway.error} after {runaway_time:.2f}s; next call -> {after.output}")
+    print(f"Stats: {json.dumps(tools.stats(), indent=2)}")
+    assert [r.output for r in results] == ["A", "B", "C", "D"]
+    assert concurrent_time < 0.9, "Calls of one step should overlap"
+    assert "timed out" in runaway.error and runaway_time < 3.0
+    assert after.output == 2, "The worker pool should recover after a kill"
+    assert all(r.cached for r in cached)
+    stats = tools.stats()
+    assert stats["slow_lookup"]["cache_hits"] == 4 and stats["calculator"]["timeouts"] == 1
+    tools.close()
+    print("✅ PASSED: Tools run concurrently, time out safely and memoize!\n")
+
+
+def test_timeout_spares_concurrent_calls():
+    """Test that a runaway isolated call does not fail another call running on the same pool."""
+    print("=" * 70)
+    print("TEST 3: Timeout Spares Concurrent Calls")
+    print("=" * 70)
+    
+    tools = ToolInterface(timeout=0.3)
+    tools.register("slow_square", slow_square, "Squares slowly", timeout=5.0, isolated=True)
+    
+    async def run():
+        calls = [ToolCall("calculator", {"expression": "9**9**9**9"}), ToolCall("slow_square", {"x": 12})]
+        results = await tools.call_many_async(calls)
+        after = await tools.call_async("calculator", {"expression": "2 * 21"})
+        return results, after
+    
+    (runaway, square), after = asyncio.run(run())
+    print(f"Runaway: {runaway.error}; concurrent call: {square.output} ({square.error}); next call -> {after.output}")
+    assert "timed out" in runaway.error
+    assert square.ok and square.output == 144, "The concurrent call survives the runaway's timeout"
+    assert after.output == 42
+    assert not tools._pool_calls and not tools._retired, "The retired pool is killed once its calls are done"
+    tools.close()
+    print("✅ PASSED: Only the runaway's pool is retired!\n")
+
+
+def test_executor_uses_tools():
+    """Test that a tool request in the executor output is served and answered."""
+    print("=" * 70)
+    print("TEST 4: Executor Tool Round Trip")
+    print("=" * 70)
+    
+    def responder(prompt):
+        if "Tool results:" in prompt:
+            return prompt.rsplit("-> ", 1)[1].split("\n")[0]
+        return '<tool>{"name": "calculator", "args": {"expression": "17 * 23"}}</tool>'
+    
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    backend = StubBackend(responder=responder)
+    set_backend(backend)
+    tools = ToolInterface()
+    result = asyncio.run(ExecutorAgent(tools=tools).execute_async("What is 17 * 23?"))
+    set_scheduler(previous_scheduler)
+    tools.close()
+    print(f"Executor answer: {result} ({backend.calls} model calls)")
+    assert result == "391"
+    assert backend.calls == 2
+    print("✅ PASSED: Executor answers from tool results!\n")
+
+
+if __name__ == "__main__":
+    test_safe_calculator()
+    test_concurrency_timeout_memoization()
+    test_timeout_spares_concurrent_calls()
+    test_executor_uses_tools()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Tracing Test - Event bus, span exporters and sampling profiler
+
+This test shows how the agentic AI system now:
+1. Opens no spans and builds no events while nothing is subscribed
+2. Records the correction loop as nested spans (workflow > attempt > model_call / validation)
+3. Exports them as Chrome trace-event JSON and OTLP/JSON
+4. Prints progress lines only through the console subscriber of a verbose workflow
+5. Charges profiler samples to the span that was running
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from main import run_agentic_workflow_async
+from metrics.events import NULL_SPAN, Subscriber, emit, get_event_bus, span, subscribe, unsubscribe
+from metrics.exporters import SamplingProfiler, tracing
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+
+class Recorder(Subscriber):
+    def __init__(self):
+        self.spans = []
+        self.events = []
+
+    def on_span_end(self, span):
+        self.spans.append(span)
+
+    def on_event(self, event):
+        self.events.append(event)
+
+
+def _responder(prompt):
+    if "QA Validator" in prompt:
+        if "Agent's output:\nParis is in Germany\n" in prompt:
+            return json.dumps({"score": 0.8, "error_type": "semantic", "reasoning": "Wrong country."})
+        return json.dumps({"score": 0.0, "error_type": "none", "reasoning": "Correct."})
+    return "Paris is in France" if "Wrong country." in prompt else "Paris is in Germany"
+
+
+def _run(verbose=False):
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=_responder))
+    try:
+        return asyncio.run(run_agentic_workflow_async("Where is Paris?", logger=MetricsLogger(), verbose=verbose))
+    finally:
+        set_scheduler(previous_scheduler)
+
+
+def test_no_subscriber_overhead():
+    """Test that span() and emit() are no-ops when nothing listens."""
+    print("=" * 70)
+    print("TEST 1: No-Subscriber Overhead")
+    print("=" * 70)
+
+    assert not get_event_bus().subscribers
+    assert span("attempt", attempt=1) is NULL_SPAN
+    n = 200_000
+    start = time.perf_counter()
+    for i in range(n):
+        with span("attempt", attempt=i) as s:
+            s.set(score=0.0)
+        emit("policy.decision", action="accept")
+    per_call = (time.perf_counter() - start) / n
+    print(f"span + set + emit with no subscriber: {per_call * 1e9:.0f} ns")
+    assert per_call < 5e-6
+    print("✅ PASSED: Instrumentation is free when unused!\n")
+
+
+def test_workflow_spans_and_exporters():
+    """Test the span tree of a two-attempt run and both file exporters."""
+    print("=" * 70)
+    print("TEST 2: Workflow Spans + Exporters")
+    print("=" * 70)
+
+    recorder = subscribe(Recorder())
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path, otlp_path = os.path.join(tmp, "trace.json"), os.path.join(tmp, "spans.otlp.jsonl")
+        try:
+            with tracing(trace_path, otlp_path):
+                state = _run()
+        finally:
+            unsubscribe(recorder)
+
+        by_id = {s.span_id: s for s in recorder.spans}
+        names = [s.name for s in recorder.spans]
+        print(f"Spans: {names}")
+        assert state.attempt_count == 2
+        assert names.count("attempt") == 2 and names.count("validation") == 2 and names.count("workflow") == 1
+        root = next(s for s in recorder.spans if s.name == "workflow")
+        assert root.parent_id is None and root.attrs["accepted"] and root.attrs["attempts"] == 2
+        for call in (s for s in recorder.spans if s.name == "model_call"):
+            assert by_id[call.parent_id].name in ("attempt", "validation"), "Model calls nest under their step"
+            assert call.trace_id == root.trace_id
+        decisions = [e.attrs["action"] for e in recorder.events if e.name == "policy.decision"]
+        print(f"Decisions: {decisions}")
+        assert decisions == ["retry_reasoning", "accept"]
+
+        with open(trace_path) as f:
+            chrome = json.load(f)["traceEvents"]
+        complete = [e for e in chrome if e["ph"] == "X"]
+        assert len(complete) == len(recorder.spans) and all(e["dur"] >= 0 for e in complete)
+        assert any(e["ph"] == "i" and e["name"] == "policy.decision" for e in chrome)
+
+        with open(otlp_path) as f:
+            requests = [json.loads(line) for line in f]
+        otlp_spans = [s for r in requests for s in r["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+        print(f"OTLP: {len(requests)} request(s), {len(otlp_spans)} spans")
+        assert len(otlp_spans) == len(recorder.spans)
+        assert len({s["traceId"] for s in otlp_spans}) == 1 and all(len(s["traceId"]) == 32 for s in otlp_spans)
+        attempt = next(s for s in otlp_spans if s["name"] == "attempt")
+        assert any(e["name"] == "policy.decision" for e in attempt["events"]), "Events attach to their span"
+    assert not get_event_bus().subscribers
+    print("✅ PASSED: The loop is traced end to end!\n")
+
+
+def test_console_subscriber():
+    """Test that verbose output goes through the console subscriber and quiet runs print nothing."""
+    print("=" * 70)
+    print("TEST 3: Console Subscriber")
+    print("=" * 70)
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        _run(verbose=False)
+    assert out.getvalue() == "", "A quiet run prints nothing"
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        _run(verbose=True)
+    lines = out.getvalue().splitlines()
+    print(f"{len(lines)} lines, e.g. {lines[:2]}")
+    assert "--- Attempt 2 ---" in lines and any("SUCCESS" in line for line in lines)
+    assert not get_event_bus().subscribers, "The console subscriber detaches after the run"
+    print("✅ PASSED: Printing is just another subscriber!\n")
+
+
+def test_sampling_profiler():
+    """Test that CPU samples are charged to the innermost open span."""
+    print("=" * 70)
+    print("TEST 4: Sampling Profiler")
+    print("=" * 70)
+
+    def busy(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            sum(range(1000))
+
+    profiler = subscribe(SamplingProfiler(interval=0.002)).start()
+    try:
+        with span("outer"):
+            with span("hot_loop"):
+                busy(0.2)
+    finally:
+        profiler.stop()
+        unsubscribe(profiler)
+    stats = profiler.stats()
+    print(f"Profile: {stats}")
+    assert stats["per_span"].get("hot_loop", 0) >= 5
+    assert stats["per_span"].get("hot_loop", 0) > stats["per_span"].get("outer", 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.folded")
+        profiler.write(path)
+        with open(path) as f:
+            top = f.readline()
+    print(f"Hottest stack: {top[:100]}...")
+    assert top.startswith("hot_loop;") and "busy (tracing_test.py" in top
+    print("✅ PASSED: Samples are grouped by span!\n")
+
+
+if __name__ == "__main__":
+    test_no_subscriber_overhead()
+    test_workflow_spans_and_exporters()
+    test_console_subscriber()
+    test_sampling_profiler()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file
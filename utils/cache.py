@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from typing import Optional
+from config import CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_DB_PATH
+from utils.types import LLMResponse
+
+# Error tags produced by the agents - responses carrying them must never be cached
+_ERROR_MARKERS = ("[RATE_LIMIT_429]", "[EXECUTION_ERROR]", "[CONSTRAINT_VIOLATION]")
+
+class ResponseCache:
+    """
+    Content-addressed cache for model responses, keyed on (model, prompt, generation config).
+    Tier 1 is an in-memory LRU with a size cap and TTL; tier 2 is a SQLite file that
+    survives restarts. Disk hits are promoted back into memory.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: Optional[float] = CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._memory = OrderedDict()  # key -> (stored_at, LLMResponse)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, payload TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, config: dict = None) -> str:
+        raw = json.dumps({"model": model, "prompt": prompt, "config": config}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(response: LLMResponse) -> bool:
+        text = response.text.strip()
+        return bool(text) and not any(marker in text for marker in _ERROR_MARKERS)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, response = entry
+                if not self._expired(stored_at):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return replace(response, cached=True)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at, payload FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    stored_at, payload = row
+                    if not self._expired(stored_at):
+                        response = LLMResponse(**json.loads(payload))
+                        self._remember(key, stored_at, response)
+                        self.disk_hits += 1
+                        return replace(response, cached=True)
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: LLMResponse):
+        if not self.is_cacheable(response):
+            return
+        stored_at = time.time()
+        response = replace(response, cached=False)
+        with self._lock:
+            self._remember(key, stored_at, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, payload) VALUES (?, ?, ?)",
+                    (key, stored_at, json.dumps(asdict(response)))
+                )
+                self._db.commit()
+            self.stores += 1
+
+    def _remember(self, key: str, stored_at: float, response: LLMResponse):
+        self._memory[key] = (stored_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+_cache = None
+_cache_enabled = CACHE_ENABLED
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _cache
+    if _cache is None and _cache_enabled:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """
+    Replace the process-wide cache. Pass None to turn caching off for the process,
+    or ResponseCache(db_path=None) for a memory-only cache.
+    """
+    global _cache, _cache_enabled
+    _cache = cache
+    _cache_enabled = cache is not None
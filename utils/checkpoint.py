@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+from config import CHECKPOINT_DB_PATH, STATE_LOG_LIMIT
+from utils.types import AgentState, ErrorType, ValidationResult
+
+# Durable AgentState snapshots, so a batch killed part-way can be resumed.
+# 1. After every attempt the workflow saves its state plus the loop variables needed to
+#    continue (next feedback / strategy / temperature), keyed on the task.
+# 2. A snapshot is compact JSON (validations as positional rows, no key names), zlib
+#    level 1, in one SQLite row; WAL + synchronous=NORMAL keeps a save well under a
+#    millisecond while still surviving a killed process.
+# 3. On resume a finished task is returned as-is and an unfinished one continues after
+#    its last attempt - no executor or judge call is repeated.
+
+FORMAT_VERSION = 1
+RUNNING = "running"
+
+def checkpoint_key(task_id, task) -> str:
+    """Stable key for one task of a batch: its position plus a hash of its spec."""
+    raw = json.dumps({"id": task_id, "task": task}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+def encode_validation(v: ValidationResult) -> list:
+    return [v.is_valid, v.score, v.error_type.value, v.feedback, v.retry_delay_seconds, v.validated_by]
+
+def decode_validation(row: list) -> ValidationResult:
+    is_valid, score, error_type, feedback, retry_delay, validated_by = row
+    return ValidationResult(is_valid, score, ErrorType(error_type), feedback, retry_delay, validated_by)
+
+def encode_checkpoint(state: AgentState, progress: dict = None) -> bytes:
+    payload = {
+        "v": FORMAT_VERSION,
+        "task": state.task,
+        "attempt_count": state.attempt_count,
+        "current_result": state.current_result,
+        "history": list(state.history),
+        "validation_log": [encode_validation(v) for v in state.validation_log],
+        "progress": progress or {},
+    }
+    return zlib.compress(json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8"), 1)
+
+def decode_checkpoint(blob: bytes):
+    """Inverse of encode_checkpoint(): returns (AgentState, progress)."""
+    payload = json.loads(zlib.decompress(blob))
+    state = AgentState.create(payload["task"], STATE_LOG_LIMIT)
+    state.attempt_count = payload["attempt_count"]
+    state.current_result = payload["current_result"]
+    state.history.extend(payload["history"])
+    state.validation_log.extend(decode_validation(row) for row in payload["validation_log"])
+    return state, payload["progress"]
+
+@dataclass
+class Checkpoint:
+    state: AgentState
+    status: str                 # "running", or the final action ("accept" / "stop_max_retries")
+    progress: dict = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+class CheckpointStore:
+    """One row per task: (key, status, attempt, updated_at, compressed snapshot)."""
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH):
+        self.db_path = db_path
+        self.saves = 0
+        self.bytes_written = 0
+        self.save_seconds = 0.0
+        self.resumed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints "
+            "(key TEXT PRIMARY KEY, status TEXT, attempt INTEGER, updated_at REAL, payload BLOB)"
+        )
+        self._db.commit()
+
+    def save(self, key: str, state: AgentState, progress: dict = None, status: str = RUNNING):
+        start = time.perf_counter()
+        blob = encode_checkpoint(state, progress)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, status, attempt, updated_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, status, state.attempt_count, time.time(), blob)
+            )
+            self._db.commit()
+            self.saves += 1
+            self.bytes_written += len(blob)
+            self.save_seconds += time.perf_counter() - start
+
+    def load(self, key: str) -> Optional[Checkpoint]:
+        with self._lock:
+            row = self._db.execute("SELECT status, payload FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        status, blob = row
+        state, progress = decode_checkpoint(blob)
+        if status == RUNNING:
+            self.resumed += 1
+        else:
+            self.skipped += 1
+        return Checkpoint(state, status, progress)
+
+    def counts(self) -> dict:
+        """Number of stored tasks per status."""
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM checkpoints GROUP BY status").fetchall())
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM checkpoints")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        return {
+            "saves": self.saves,
+            "bytes_written": self.bytes_written,
+            "avg_bytes": self.bytes_written / self.saves if self.saves else 0.0,
+            "save_seconds": self.save_seconds,
+            "avg_save_ms": 1000 * self.save_seconds / self.saves if self.saves else 0.0,
+            "resumed": self.resumed,
+            "skipped": self.skipped,
+        }
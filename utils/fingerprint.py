@@ -0,0 +1,119 @@
+import hashlib
+import heapq
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+from config import DEDUP_SIMILARITY, DEDUP_SHINGLE_SIZE, DEDUP_SKETCH_SIZE
+from utils.checkpoint import decode_validation, encode_validation
+from utils.types import ValidationResult
+
+# Fingerprints of a task's previous outputs, used to spot a retry that repeats a failed attempt.
+# 1. Exact: sha1 of the whitespace/case-normalised text.
+# 2. Near-duplicate: MinHash (bottom-k sketch) over character shingles, which estimates the
+#    Jaccard similarity of two outputs from a fixed-size sketch instead of the full texts.
+# Outputs whose numbers differ are never near-duplicates: a corrected figure is exactly
+# the kind of small edit that must be judged again.
+# The index is checkpointed with the workflow's progress, so a resumed loop still
+# recognises the failures it saw before it was interrupted.
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)*")
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+def exact_hash(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+def _shingle_hashes(text: str, size: int) -> set:
+    text = normalize(text)
+    if len(text) <= size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return {int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles}
+
+def minhash_sketch(text: str, size: int = DEDUP_SKETCH_SIZE, shingle_size: int = DEDUP_SHINGLE_SIZE) -> List[int]:
+    """The `size` smallest shingle hashes, sorted."""
+    return sorted(heapq.nsmallest(size, _shingle_hashes(text, shingle_size)))
+
+def estimate_similarity(a: List[int], b: List[int], size: int = DEDUP_SKETCH_SIZE) -> float:
+    """Jaccard estimate from two bottom-k sketches: share of the union's k smallest hashes found in both."""
+    if not a or not b:
+        return 0.0
+    union = heapq.nsmallest(size, set(a) | set(b))
+    a_set, b_set = set(a), set(b)
+    shared = sum(1 for h in union if h in a_set and h in b_set)
+    return shared / len(union)
+
+@dataclass
+class Fingerprint:
+    attempt: int
+    exact: str
+    sketch: List[int]
+    numbers: tuple
+    validation: ValidationResult
+
+@dataclass
+class DuplicateMatch:
+    attempt: int                # attempt number of the earlier output
+    similarity: float           # 1.0 for an exact repeat
+    validation: ValidationResult
+
+class FingerprintIndex:
+    """Failed outputs of one task; `find()` returns the earlier attempt a new output repeats, if any."""
+    def __init__(self, threshold: float = DEDUP_SIMILARITY):
+        self.threshold = threshold
+        self.entries: List[Fingerprint] = []
+        self.checked = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+
+    def _fingerprint(self, text: str, attempt: int, validation: ValidationResult) -> Fingerprint:
+        return Fingerprint(attempt, exact_hash(text), minhash_sketch(text),
+                           tuple(_NUMBER.findall(text)), validation)
+
+    def add(self, text: str, validation: ValidationResult, attempt: int):
+        self.entries.append(self._fingerprint(text, attempt, validation))
+
+    def find(self, text: str, near: bool = True) -> Optional[DuplicateMatch]:
+        """With `near=False` only exact repeats count (e.g. for a patched output, which is similar by design)."""
+        if not self.entries:
+            return None
+        self.checked += 1
+        probe = self._fingerprint(text, 0, None)
+        for entry in self.entries:
+            if entry.exact == probe.exact:
+                self.exact_hits += 1
+                return DuplicateMatch(entry.attempt, 1.0, entry.validation)
+        if not near:
+            return None
+
+        best = None
+        for entry in self.entries:
+            if entry.numbers != probe.numbers:
+                continue
+            similarity = estimate_similarity(entry.sketch, probe.sketch)
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = DuplicateMatch(entry.attempt, similarity, entry.validation)
+        if best is not None:
+            self.near_hits += 1
+        return best
+
+    def progress(self) -> list:
+        """Checkpointable entries (positional rows, like the validation log)."""
+        return [[e.attempt, e.exact, e.sketch, list(e.numbers), encode_validation(e.validation)]
+                for e in self.entries]
+
+    def restore(self, progress: Optional[list]):
+        if progress:
+            self.entries = [Fingerprint(attempt, exact, list(sketch), tuple(numbers), decode_validation(validation))
+                            for attempt, exact, sketch, numbers, validation in progress]
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "exact_duplicates": self.exact_hits,
+            "near_duplicates": self.near_hits,
+            "validations_skipped": self.exact_hits + self.near_hits,
+        }
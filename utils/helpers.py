@@ -1,7 +1,203 @@
+import json
+from typing import List, Optional, Tuple
+
 def clean_json_string(s: str) -> str:
     """Helper to clean Markdown code blocks from JSON strings."""
     if "```json" in s:
         s = s.split("```json")[1].split("```")[0]
     elif "```" in s:
         s = s.split("```")[1].split("```")[0]
-    return s.strip()
\ No newline at end of file
+    return s.strip()
+
+def percentile(values, q: float) -> float:
+    """q-th percentile (0-100) with linear interpolation; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+# ---------------------------------------------------------------- tolerant JSON parsing
+# Model replies that should be JSON often are not quite: prose around the object, single
+# quotes, Python literals, bare words, unquoted keys, trailing commas, raw newlines in
+# strings, or a reply cut off mid-object. parse_json_lenient() tries strict parsing first,
+# then extracts the first balanced object (JSONScanner) and repairs it, reporting which
+# repairs were needed so callers can count them.
+
+class JSONRepairError(ValueError):
+    pass
+
+class JSONScanner:
+    """
+    Incremental scanner for the first balanced JSON object/array in a stream of text:
+    feed() chunks as they arrive; it returns the object's text once its closing bracket
+    is seen (None until then). Quotes of either kind are tracked, so brackets inside
+    strings do not count.
+    """
+    _CLOSERS = {"{": "}", "[": "]"}
+
+    def __init__(self, opening: str = "{["):
+        self.opening = opening
+        self.parts = []
+        self.stack = []
+        self.quote = None
+        self.escape = False
+        self.done = False
+
+    @property
+    def started(self) -> bool:
+        return bool(self.stack) or self.done
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.done:
+            return None
+        start = 0
+        if not self.stack:
+            positions = [i for i in (chunk.find(c) for c in self.opening) if i >= 0]
+            if not positions:
+                return None
+            start = min(positions)
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+            if self.quote is not None:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == self.quote:
+                    self.quote = None
+            elif ch in "\"'":
+                self.quote = ch
+            elif ch in "{[":
+                self.stack.append(self._CLOSERS[ch])
+            elif ch in "}]" and self.stack and ch == self.stack[-1]:
+                self.stack.pop()
+                if not self.stack:
+                    self.parts.append(chunk[start:i + 1])
+                    self.done = True
+                    return "".join(self.parts)
+        self.parts.append(chunk[start:])
+        return None
+
+    def partial(self) -> str:
+        """Text scanned so far when the stream ended before the object closed."""
+        return "".join(self.parts)
+
+_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null",
+             "NaN": "NaN", "Infinity": "Infinity"}
+
+def _read_string(text: str, i: int) -> Tuple[str, int, bool]:
+    """Read the quoted string starting at text[i]; returns (JSON string, next index, raw control chars seen)."""
+    quote = text[i]
+    out = ['"']
+    control = False
+    i += 1
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("'" if nxt == "'" else ch + nxt)
+            i += 2
+            continue
+        if ch == quote:
+            return "".join(out) + '"', i + 1, control
+        if ch == '"':
+            out.append('\\"')
+        elif ch in "\n\r\t":
+            out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch])
+            control = True
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out) + '"', i, control     # unterminated: closed here
+
+def _normalize(text: str) -> Tuple[str, List[str]]:
+    """One string-aware pass fixing the common defects; returns (text, repairs applied)."""
+    out = []
+    repairs = set()
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in "\"'":
+            if ch == "'":
+                repairs.add("single_quotes")
+            string, i, control = _read_string(text, i)
+            if control:
+                repairs.add("control_chars")
+            out.append(string)
+            continue
+        if (ch.isalpha() or ch == "_") and not (out and out[-1][-1:].isdigit()):     # not the "e" of 1e-5
+            j = i
+            while j < len(text) and (text[j].isalnum() or text[j] in "_-"):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < len(text) and text[k] in " \t":
+                k += 1
+            if k < len(text) and text[k] == ":":
+                out.append(json.dumps(word))
+                repairs.add("unquoted_keys")
+            elif word in _LITERALS:
+                out.append(_LITERALS[word])
+                if word != _LITERALS[word]:
+                    repairs.add("python_literals")
+            else:
+                out.append(json.dumps(word))
+                repairs.add("bare_words")
+            i = j
+            continue
+        if ch == ",":
+            k = i + 1
+            while k < len(text) and text[k] in " \t\r\n":
+                k += 1
+            if k < len(text) and text[k] in "}]":
+                repairs.add("trailing_commas")
+                i += 1
+                continue
+        out.append(ch)
+        i += 1
+    return "".join(out), sorted(repairs)
+
+def _close_truncated(text: str) -> str:
+    """Close the brackets left open by a reply that was cut off (dropping a dangling key or comma)."""
+    scanner = JSONScanner()
+    scanner.feed(text)
+    body = text.rstrip()
+    if scanner.quote is not None:
+        body += scanner.quote
+    body = body.rstrip().rstrip(",:")
+    if body.endswith('"') and body.rfind(":") < body.rfind(",") and scanner.stack and scanner.stack[-1] == "}":
+        body = body[:body.rfind(",")]     # a dangling key without its value
+    return body + "".join(reversed(scanner.stack))
+
+def parse_json_lenient(text: str, opening: str = "{[") -> Tuple[object, List[str]]:
+    """
+    Parse a model's JSON reply, repairing it if needed. Returns (value, repairs) where
+    `repairs` is empty for clean JSON; raises JSONRepairError if nothing parses.
+    """
+    cleaned = clean_json_string(text)
+    try:
+        return json.loads(cleaned), []
+    except json.JSONDecodeError:
+        pass
+    repairs = []
+    scanner = JSONScanner(opening)
+    candidate = scanner.feed(cleaned)
+    truncated = candidate is None
+    if truncated:
+        if not scanner.started:
+            raise JSONRepairError("No JSON object in reply")
+        candidate = scanner.partial()
+    if candidate.strip() != cleaned:
+        repairs.append("extracted")
+    candidate, fixes = _normalize(candidate)
+    repairs.extend(fixes)
+    if truncated:
+        candidate = _close_truncated(candidate)
+        repairs.append("truncated")
+    try:
+        return json.loads(candidate), repairs
+    except json.JSONDecodeError as e:
+        raise JSONRepairError(f"Unrepairable JSON ({', '.join(repairs) or 'no known defect'}): {e}")
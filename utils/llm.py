@@ -0,0 +1,341 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+from config import MODEL_NAME, RATE_LIMIT_MAX_WAITS, ESTIMATED_OUTPUT_TOKENS, MODEL_PRICING
+from backends.registry import get_backend
+from metrics.events import record_span
+from utils.cache import get_response_cache
+from utils.rate_limiter import get_scheduler, estimate_tokens, is_rate_limit_error, extract_retry_delay
+from utils.resilience import get_resilience, CircuitOpenError, DeadlineExceeded
+from utils.types import LLMResponse, CallRecord
+
+# Single entry point for every model call (executor, validator, planner).
+# The provider is whatever backend is selected in backends.registry.
+# 1. Identical (model, prompt, config) requests are answered from the response cache.
+# 2. Calls are paced by the shared RateLimitScheduler; a 429 pauses the model for all
+#    callers and is retried here up to RATE_LIMIT_MAX_WAITS times before it is raised,
+#    so rate limits no longer cost correction attempts.
+# 3. Each request runs under utils.resilience: a per-phase deadline, a hedged duplicate
+#    once it outlives the observed p95, and a per-model circuit breaker with fallback model.
+#    A hedge reserves its own quota; only one answer is used, so that reservation is
+#    refunded once the request settles.
+# 4. Every request (and cache hit) is reported as a CallRecord to the current context's
+#    call recorder - normally the workflow's MetricsLogger - and, when a tracer is
+#    attached (metrics.events), as "rate_limit_wait" and "model_call" spans.
+
+_call_counter = ContextVar("model_call_counter", default=None)
+_call_recorder = ContextVar("model_call_recorder", default=None)
+
+class CallCounter:
+    def __init__(self):
+        self.calls = 0
+
+def track_calls() -> CallCounter:
+    """Count model requests made from the current context (e.g. one asyncio task) from now on."""
+    counter = CallCounter()
+    _call_counter.set(counter)
+    return counter
+
+def set_call_recorder(recorder):
+    """Send CallRecords from the current context to `recorder.log_call()` (None to stop)."""
+    _call_recorder.set(recorder)
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing["input_per_million"] + output_tokens * pricing["output_per_million"]) / 1_000_000
+
+def _record_call(phase: str, model: str, queue_wait: float = 0.0, latency: float = 0.0,
+                 response: LLMResponse = None, cached: bool = False, rate_limited: bool = False,
+                 error: str = None, hedged: bool = False):
+    if queue_wait > 0:
+        record_span("rate_limit_wait", queue_wait, ended_ago=latency, model=model, phase=phase)
+    record_span("model_call", latency, phase=phase, model=model, cached=cached, error=error, hedged=hedged,
+                rate_limited=rate_limited, tokens=response.total_tokens if response else 0)
+    if not cached and error != "circuit_open":
+        counter = _call_counter.get()
+        if counter is not None:
+            counter.calls += 2 if hedged else 1
+    recorder = _call_recorder.get()
+    if recorder is None:
+        return
+    prompt_tokens = response.prompt_tokens if response else 0
+    output_tokens = response.output_tokens if response else 0
+    recorder.log_call(CallRecord(
+        phase=phase,
+        model=model,
+        queue_wait=queue_wait,
+        latency=latency,
+        prompt_tokens=prompt_tokens,
+        output_tokens=output_tokens,
+        total_tokens=response.total_tokens if response else 0,
+        cached=cached,
+        rate_limited=rate_limited,
+        error=error,
+        hedged=hedged,
+        cost_usd=0.0 if cached else estimate_cost(model, prompt_tokens, output_tokens),
+    ))
+
+class _HedgeReservation:
+    """can_hedge() for utils.resilience: takes quota for the hedged duplicate, refunded by release()."""
+
+    def __init__(self, scheduler, model: str, tokens: int):
+        self.scheduler = scheduler
+        self.model = model
+        self.tokens = tokens
+        self.reserved = False
+
+    def __call__(self) -> bool:
+        self.reserved = self.scheduler.try_acquire(self.model, self.tokens)
+        return self.reserved
+
+    def release(self):
+        if self.reserved:
+            self.scheduler.release(self.model, self.tokens)
+            self.reserved = False
+
+def _cache_lookup(prompt: str, model: str, config: dict, use_cache: bool):
+    """Returns (cache, key, cached_response); cache is None when bypassed or disabled."""
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+    key = cache.make_key(model, prompt, config)
+    return cache, key, cache.get(key)
+
+def _handle_call_error(e: Exception, scheduler, phase: str, model: str, estimated: int,
+                       queue_wait: float, latency: float, attempt: int):
+    """Record a failed request; re-raise unless it is a 429 the scheduler may still absorb."""
+    if not is_rate_limit_error(e):
+        scheduler.settle(model, estimated, 0)
+        _record_call(phase, model, queue_wait, latency, error=type(e).__name__)
+        raise e
+    # A rejected request used none of its tokens; a retry reserves them again
+    scheduler.release(model, estimated)
+    scheduler.report_rate_limit(model, extract_retry_delay(str(e)))
+    _record_call(phase, model, queue_wait, latency, rate_limited=True, error="rate_limit")
+    if attempt == RATE_LIMIT_MAX_WAITS:
+        raise e
+
+def _route(resilience, model: str, phase: str) -> str:
+    """The model the circuit breaker lets this call use; records and raises CircuitOpenError otherwise."""
+    try:
+        return resilience.route(model)
+    except CircuitOpenError:
+        _record_call(phase, model, error="circuit_open")
+        raise
+
+def generate(prompt: str, model: str = MODEL_NAME, config: dict = None, use_cache: bool = True,
+             phase: str = "execute") -> LLMResponse:
+    cache, key, cached = _cache_lookup(prompt, model, config, use_cache)
+    if cached is not None:
+        _record_call(phase, model, response=cached, cached=True)
+        return cached
+
+    scheduler = get_scheduler()
+    resilience = get_resilience()
+    estimated = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    backend = get_backend()
+
+    for attempt in range(RATE_LIMIT_MAX_WAITS + 1):
+        target = _route(resilience, model, phase)
+        queue_wait = scheduler.acquire(target, estimated)
+        start = time.perf_counter()
+        hedge = _HedgeReservation(scheduler, target, estimated)
+        try:
+            result, hedged = resilience.call(target, phase, lambda: backend.generate(target, prompt, config),
+                                             can_hedge=hedge)
+        except Exception as e:
+            hedge.release()
+            _handle_call_error(e, scheduler, phase, target, estimated, queue_wait,
+                               time.perf_counter() - start, attempt)
+            continue
+
+        _record_call(phase, target, queue_wait, time.perf_counter() - start, response=result, hedged=hedged)
+        scheduler.settle(target, estimated, result.total_tokens or estimated)
+        hedge.release()
+        # A fallback model's answer is not cached under the primary model's key
+        if cache is not None and target == model:
+            cache.put(key, result)
+        return result
+
+async def generate_async(prompt: str, model: str = MODEL_NAME, config: dict = None, use_cache: bool = True,
+                         phase: str = "execute") -> LLMResponse:
+    cache, key, cached = _cache_lookup(prompt, model, config, use_cache)
+    if cached is not None:
+        _record_call(phase, model, response=cached, cached=True)
+        return cached
+
+    scheduler = get_scheduler()
+    resilience = get_resilience()
+    estimated = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    backend = get_backend()
+
+    for attempt in range(RATE_LIMIT_MAX_WAITS + 1):
+        target = _route(resilience, model, phase)
+        queue_wait = await scheduler.acquire_async(target, estimated)
+        start = time.perf_counter()
+        hedge = _HedgeReservation(scheduler, target, estimated)
+        try:
+            result, hedged = await resilience.call_async(
+                target, phase, lambda: backend.generate_async(target, prompt, config), can_hedge=hedge)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (e.g. a losing speculative candidate): the request was
+            # sent, so it is counted and keeps its estimate; only a hedge's quota is returned
+            hedged = hedge.reserved
+            hedge.release()
+            scheduler.settle(target, estimated, estimated)
+            _record_call(phase, target, queue_wait, time.perf_counter() - start, error="cancelled", hedged=hedged)
+            raise
+        except Exception as e:
+            hedge.release()
+            _handle_call_error(e, scheduler, phase, target, estimated, queue_wait,
+                               time.perf_counter() - start, attempt)
+            continue
+
+        _record_call(phase, target, queue_wait, time.perf_counter() - start, response=result, hedged=hedged)
+        scheduler.settle(target, estimated, result.total_tokens or estimated)
+        hedge.release()
+        if cache is not None and target == model:
+            cache.put(key, result)
+        return result
+
+def _stream_response(model: str, prompt: str, chunks: list) -> LLMResponse:
+    """Usage estimate for streamed text (complete or aborted)."""
+    text = "".join(chunks)
+    prompt_tokens = estimate_tokens(prompt)
+    output_tokens = estimate_tokens(text) if text else 0
+    return LLMResponse(text=text, model=model, prompt_tokens=prompt_tokens,
+                       output_tokens=output_tokens, total_tokens=prompt_tokens + output_tokens)
+
+def _record_aborted_stream(scheduler, resilience, phase: str, model: str, prompt: str, estimated: int,
+                           queue_wait: float, start: float, chunks: list):
+    """The consumer closed the stream early (constraint abort or cancellation)."""
+    partial = _stream_response(model, prompt, chunks)
+    scheduler.settle(model, estimated, partial.total_tokens)
+    resilience.breaker(model).release()
+    _record_call(phase, model, queue_wait, time.perf_counter() - start, response=partial, error="aborted")
+
+def stream(prompt: str, model: str = MODEL_NAME, config: dict = None, use_cache: bool = True,
+           phase: str = "execute") -> Iterator[str]:
+    """
+    Yield response text as it arrives. A cache hit is yielded as a single chunk.
+    Streams go through the circuit breaker but are not hedged; the sync version has no deadline.
+    """
+    cache, key, cached = _cache_lookup(prompt, model, config, use_cache)
+    if cached is not None:
+        _record_call(phase, model, response=cached, cached=True)
+        yield cached.text
+        return
+
+    scheduler = get_scheduler()
+    resilience = get_resilience()
+    estimated = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    backend = get_backend()
+
+    for attempt in range(RATE_LIMIT_MAX_WAITS + 1):
+        target = _route(resilience, model, phase)
+        queue_wait = scheduler.acquire(target, estimated)
+        start = time.perf_counter()
+        chunks = []
+        outcome = "aborted"
+        chunk_stream = backend.stream(target, prompt, config)
+        try:
+            for chunk in chunk_stream:
+                chunks.append(chunk)
+                yield chunk
+            outcome = "completed"
+        except Exception as e:
+            outcome = "failed"
+            resilience.record(target, phase, error=e)
+            # A 429 can only be retried before any text has been handed out
+            if chunks:
+                scheduler.settle(target, estimated, 0)
+                _record_call(phase, target, queue_wait, time.perf_counter() - start,
+                             response=_stream_response(target, prompt, chunks), error=type(e).__name__)
+                raise
+            _handle_call_error(e, scheduler, phase, target, estimated, queue_wait,
+                               time.perf_counter() - start, attempt)
+            continue
+        finally:
+            chunk_stream.close()
+            if outcome == "aborted":
+                _record_aborted_stream(scheduler, resilience, phase, target, prompt, estimated,
+                                       queue_wait, start, chunks)
+
+        result = _stream_response(target, prompt, chunks)
+        resilience.record(target, phase, time.perf_counter() - start)
+        _record_call(phase, target, queue_wait, time.perf_counter() - start, response=result)
+        scheduler.settle(target, estimated, result.total_tokens)
+        if cache is not None and target == model:
+            cache.put(key, result)
+        return
+
+async def _next_chunk(chunk_stream, deadline: float, start: float, phase: str, model: str):
+    """Next chunk of an async stream, or DeadlineExceeded once the phase deadline has passed."""
+    if deadline is None:
+        return await chunk_stream.__anext__()
+    remaining = deadline - (time.perf_counter() - start)
+    try:
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(chunk_stream.__anext__(), remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{phase} stream from {model} exceeded its {deadline:g}s deadline")
+
+async def stream_async(prompt: str, model: str = MODEL_NAME, config: dict = None, use_cache: bool = True,
+                       phase: str = "execute") -> AsyncIterator[str]:
+    """Async version of stream(), with the phase deadline. Closing the generator early cancels the request."""
+    cache, key, cached = _cache_lookup(prompt, model, config, use_cache)
+    if cached is not None:
+        _record_call(phase, model, response=cached, cached=True)
+        yield cached.text
+        return
+
+    scheduler = get_scheduler()
+    resilience = get_resilience()
+    estimated = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    backend = get_backend()
+    deadline = resilience.deadline(phase)
+
+    for attempt in range(RATE_LIMIT_MAX_WAITS + 1):
+        target = _route(resilience, model, phase)
+        queue_wait = await scheduler.acquire_async(target, estimated)
+        start = time.perf_counter()
+        chunks = []
+        outcome = "aborted"
+        chunk_stream = backend.stream_async(target, prompt, config)
+        try:
+            while True:
+                try:
+                    chunk = await _next_chunk(chunk_stream, deadline, start, phase, target)
+                except StopAsyncIteration:
+                    break
+                chunks.append(chunk)
+                yield chunk
+            outcome = "completed"
+        except Exception as e:
+            outcome = "failed"
+            resilience.record(target, phase, error=e)
+            if chunks:
+                scheduler.settle(target, estimated, 0)
+                _record_call(phase, target, queue_wait, time.perf_counter() - start,
+                             response=_stream_response(target, prompt, chunks), error=type(e).__name__)
+                raise
+            _handle_call_error(e, scheduler, phase, target, estimated, queue_wait,
+                               time.perf_counter() - start, attempt)
+            continue
+        finally:
+            await chunk_stream.aclose()
+            if outcome == "aborted":
+                _record_aborted_stream(scheduler, resilience, phase, target, prompt, estimated,
+                                       queue_wait, start, chunks)
+
+        result = _stream_response(target, prompt, chunks)
+        resilience.record(target, phase, time.perf_counter() - start)
+        _record_call(phase, target, queue_wait, time.perf_counter() - start, response=result)
+        scheduler.settle(target, estimated, result.total_tokens)
+        if cache is not None and target == model:
+            cache.put(key, result)
+        return
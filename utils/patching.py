@@ -0,0 +1,95 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import List
+from utils.helpers import clean_json_string
+
+# Local application of the edits a delta retry returns instead of a full answer.
+# 1. Edit list (what the executor asks for): {"edits": [{"find": ..., "replace": ...}]};
+#    every `find` must occur exactly once in the previous output.
+# 2. Unified diff (accepted too, models like to emit them): hunks are located by their
+#    context lines, at the stated line number or anywhere else they match uniquely.
+# Anything that does not apply cleanly raises PatchError and the caller regenerates.
+
+class PatchError(Exception):
+    pass
+
+@dataclass
+class Edit:
+    find: str
+    replace: str
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+def parse_edits(text: str) -> List[Edit]:
+    try:
+        data = json.loads(clean_json_string(text))
+    except json.JSONDecodeError as e:
+        raise PatchError(f"Edit list is not JSON: {e}")
+    if isinstance(data, dict) and data.get("rewrite"):
+        raise PatchError("Model asked for a full rewrite")
+    raw = data.get("edits") if isinstance(data, dict) else data
+    if not isinstance(raw, list) or not raw:
+        raise PatchError("No edits")
+    edits = []
+    for item in raw:
+        if not isinstance(item, dict) or not isinstance(item.get("find"), str) or not item["find"]:
+            raise PatchError(f"Malformed edit {item!r}")
+        edits.append(Edit(item["find"], str(item.get("replace", ""))))
+    return edits
+
+def apply_edits(original: str, edits: List[Edit]) -> str:
+    text = original
+    for edit in edits:
+        count = text.count(edit.find)
+        if count != 1:
+            raise PatchError(f"Edit target {'not found' if count == 0 else 'is ambiguous'}: {edit.find[:60]!r}")
+        text = text.replace(edit.find, edit.replace, 1)
+    return text
+
+def _find_block(lines: List[str], block: List[str], hint: int) -> int:
+    if lines[hint:hint + len(block)] == block:
+        return hint
+    matches = [i for i in range(len(lines) - len(block) + 1) if lines[i:i + len(block)] == block]
+    if len(matches) != 1:
+        raise PatchError(f"Hunk context {'not found' if not matches else 'is ambiguous'} near line {hint + 1}")
+    return matches[0]
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    lines = original.split("\n")
+    hunks = []
+    for line in diff.split("\n"):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            hunks.append((int(header.group(1)), [], []))
+        elif hunks and line[:1] in (" ", "-", "+") and not line.startswith(("---", "+++")):
+            _, old, new = hunks[-1]
+            if line[0] in (" ", "-"):
+                old.append(line[1:])
+            if line[0] in (" ", "+"):
+                new.append(line[1:])
+        elif hunks and line == "":
+            _, old, new = hunks[-1]     # a blank context line whose leading space was stripped
+            old.append("")
+            new.append("")
+    if not hunks:
+        raise PatchError("No hunks in diff")
+
+    offset = 0
+    for start, old, new in hunks:
+        while old and new and old[-1] == "" and new[-1] == "":
+            old.pop()
+            new.pop()
+        if not old:
+            position = max(0, min(len(lines), start + offset))      # "-a,0": insert after line a
+        else:
+            position = _find_block(lines, old, max(0, start - 1 + offset))
+        lines[position:position + len(old)] = new
+        offset += len(new) - len(old)
+    return "\n".join(lines)
+
+def apply_patch(original: str, reply: str) -> str:
+    """Apply a delta reply (edit list or unified diff) to `original`; PatchError if it does not apply."""
+    if re.search(r"^@@ -\d", reply, re.MULTILINE):
+        return apply_unified_diff(original, clean_json_string(reply) if "```" in reply else reply)
+    return apply_edits(original, parse_edits(reply))
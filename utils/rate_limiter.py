@@ -0,0 +1,171 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Optional
+from config import (
+    MODEL_QUOTAS,
+    DEFAULT_MODEL_QUOTA,
+    RATE_LIMIT_JITTER,
+    RATE_LIMIT_BACKOFF_MULTIPLIER,
+    INITIAL_RATE_LIMIT_DELAY,
+)
+
+def is_rate_limit_error(error) -> bool:
+    """True if an exception (or its message) is a 429 / quota exhaustion."""
+    error_str = str(error)
+    return "429" in error_str or "Resource Exhausted" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+def extract_retry_delay(error_str: str) -> Optional[float]:
+    """Server retry hint in seconds, e.g. "retry in 51.630 seconds", or None if absent."""
+    delay_match = re.search(r'retry in (\d+\.\d+|\d+) second', error_str, re.IGNORECASE)
+    if delay_match:
+        return float(delay_match.group(1))
+    return None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used to pace against TPM quotas."""
+    return len(text) // 4 + 1
+
+class _ModelBucket:
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_rate_limits = 0
+
+    def refill(self, now: float):
+        elapsed = max(0.0, now - self.updated)
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60.0)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60.0)
+        self.updated = now
+
+class RateLimitScheduler:
+    """
+    Process-wide pacing for model calls. Every call acquires one request and an estimated
+    number of tokens from its model's RPM/TPM bucket before it is sent, so concurrent
+    workflows stay under quota instead of discovering it through 429s. A server retry hint
+    blocks the whole model, so every waiting caller backs off together.
+    Usable from threads (acquire) and from asyncio (acquire_async).
+    """
+
+    def __init__(self, quotas: dict = None, default_quota: dict = None, jitter: float = RATE_LIMIT_JITTER):
+        self.quotas = dict(MODEL_QUOTAS if quotas is None else quotas)
+        self.default_quota = default_quota or DEFAULT_MODEL_QUOTA
+        self.jitter = jitter
+        self.total_wait_seconds = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_quota(self, model: str, rpm: float, tpm: float):
+        with self._lock:
+            self.quotas[model] = {"rpm": rpm, "tpm": tpm}
+            self._buckets.pop(model, None)
+
+    def _bucket(self, model: str) -> _ModelBucket:
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            quota = self.quotas.get(model, self.default_quota)
+            bucket = _ModelBucket(quota["rpm"], quota["tpm"])
+            self._buckets[model] = bucket
+        return bucket
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        """Take one request + `tokens` if available (returns 0.0), else return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(model)
+            bucket.refill(now)
+
+            if now < bucket.blocked_until:
+                return bucket.blocked_until - now
+
+            tokens = min(tokens, bucket.tpm)  # a single oversized prompt must still fit eventually
+            if bucket.requests >= 1.0 and bucket.tokens >= tokens:
+                bucket.requests -= 1.0
+                bucket.tokens -= tokens
+                return 0.0
+
+            request_wait = max(0.0, (1.0 - bucket.requests) * 60.0 / bucket.rpm)
+            token_wait = max(0.0, (tokens - bucket.tokens) * 60.0 / bucket.tpm)
+            return max(request_wait, token_wait)
+
+    def try_acquire(self, model: str, tokens: int = 1) -> bool:
+        """Take one request + `tokens` only if available right now (e.g. for a hedged duplicate)."""
+        return self._reserve(model, tokens) <= 0
+
+    def _with_jitter(self, delay: float) -> float:
+        return delay * (1.0 + random.uniform(0.0, self.jitter))
+
+    def acquire(self, model: str, tokens: int = 1) -> float:
+        """Block the calling thread until the call may be sent. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            delay = self._reserve(model, tokens)
+            if delay <= 0:
+                self.total_wait_seconds += waited
+                return waited
+            delay = self._with_jitter(delay)
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, model: str, tokens: int = 1) -> float:
+        """Like acquire(), but yields to the event loop while waiting."""
+        waited = 0.0
+        while True:
+            delay = self._reserve(model, tokens)
+            if delay <= 0:
+                self.total_wait_seconds += waited
+                return waited
+            delay = self._with_jitter(delay)
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def settle(self, model: str, estimated_tokens: int, actual_tokens: int):
+        """Correct the TPM bucket once the real token usage of a call is known."""
+        with self._lock:
+            bucket = self._bucket(model)
+            bucket.tokens = min(bucket.tpm, bucket.tokens + estimated_tokens - actual_tokens)
+            bucket.consecutive_rate_limits = 0
+
+    def release(self, model: str, tokens: int):
+        """Return the tokens of a reservation whose call was discarded (e.g. the losing hedge)."""
+        with self._lock:
+            bucket = self._bucket(model)
+            bucket.tokens = min(bucket.tpm, bucket.tokens + tokens)
+
+    def report_rate_limit(self, model: str, retry_after: Optional[float] = None) -> float:
+        """
+        Record a 429 for `model` and pause every caller of that model. Uses the server's
+        retry hint when given, with exponential backoff for consecutive 429s.
+        Returns the pause in seconds.
+        """
+        with self._lock:
+            bucket = self._bucket(model)
+            base_delay = retry_after if retry_after is not None else INITIAL_RATE_LIMIT_DELAY
+            delay = base_delay * (RATE_LIMIT_BACKOFF_MULTIPLIER ** bucket.consecutive_rate_limits)
+            bucket.consecutive_rate_limits += 1
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+            bucket.requests = 0.0  # the server says the window is spent
+            return delay
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> RateLimitScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RateLimitScheduler()
+    return _scheduler
+
+def set_scheduler(scheduler: RateLimitScheduler):
+    """Replace the process-wide scheduler (e.g. with custom quotas)."""
+    global _scheduler
+    _scheduler = scheduler
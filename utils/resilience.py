@@ -0,0 +1,262 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from typing import Awaitable, Callable, Optional
+from config import (PHASE_DEADLINES, HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY,
+                    BREAKER_ERROR_THRESHOLD, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_OPEN_SECONDS,
+                    BREAKER_HALF_OPEN_PROBES, FALLBACK_MODELS)
+from utils.helpers import percentile
+from utils.rate_limiter import is_rate_limit_error
+
+# Tail-latency and outage protection for single model calls (used by utils.llm).
+# 1. Deadlines: every call has a per-phase deadline (PHASE_DEADLINES) instead of hanging forever.
+# 2. Hedging: once a call runs past the observed p95 latency for its (model, phase), one
+#    duplicate request is sent and whichever answers first wins; the loser is cancelled.
+# 3. Circuit breaker: per model, opens when the recent error rate crosses a threshold.
+#    While open, calls go to the FALLBACK_MODELS entry or fail fast with CircuitOpenError;
+#    after BREAKER_OPEN_SECONDS a few half-open probes decide whether to close it again.
+# 429s are the rate limiter's business and count neither for nor against the breaker.
+
+class CircuitOpenError(Exception):
+    pass
+
+class DeadlineExceeded(Exception):
+    pass
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: float = BREAKER_ERROR_THRESHOLD, window: int = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 half_open_probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)     # True = failure
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+            self.probes_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, failed: bool):
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if failed:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+            return
+        self.outcomes.append(failed)
+        if (self.state == self.CLOSED and len(self.outcomes) >= self.min_calls
+                and self.error_rate() >= self.threshold):
+            self._open()
+
+    def release(self):
+        """A call that ended without a verdict (429, cancellation) frees its half-open probe slot."""
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def stats(self) -> dict:
+        return {"state": self.state, "error_rate": self.error_rate(),
+                "times_opened": self.times_opened, "rejected": self.rejected}
+
+class ResilienceManager:
+    def __init__(self, deadlines: dict = None, hedging: bool = HEDGE_ENABLED, fallbacks: dict = None,
+                 breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+                 hedge_min_delay: float = HEDGE_MIN_DELAY):
+        self.deadlines = dict(PHASE_DEADLINES if deadlines is None else deadlines)
+        self.hedging = hedging
+        self.hedge_min_delay = hedge_min_delay
+        self.fallbacks = dict(FALLBACK_MODELS if fallbacks is None else fallbacks)
+        self.breaker_factory = breaker_factory
+        self.breakers = {}
+        self.latencies = {}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.deadlines_exceeded = 0
+        self.fallback_calls = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self.breakers:
+                self.breakers[model] = self.breaker_factory()
+            return self.breakers[model]
+
+    def route(self, model: str) -> str:
+        """The model to call: `model` if its breaker allows, else its healthy fallback."""
+        if self.breaker(model).allow():
+            return model
+        fallback = self.fallbacks.get(model)
+        if fallback and fallback != model and self.breaker(fallback).allow():
+            self.fallback_calls += 1
+            return fallback
+        raise CircuitOpenError(f"Circuit open for {model} (error rate {self.breaker(model).error_rate():.0%}), "
+                               f"no healthy fallback")
+
+    def deadline(self, phase: str) -> Optional[float]:
+        return self.deadlines.get(phase)
+
+    def hedge_delay(self, model: str, phase: str) -> Optional[float]:
+        """Seconds after which to send a hedge: the observed p95 (None until enough samples)."""
+        if not self.hedging:
+            return None
+        samples = self.latencies.get((model, phase))
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, percentile(list(samples), HEDGE_PERCENTILE))
+
+    def record(self, model: str, phase: str, latency: float = None, error: Exception = None):
+        if error is not None and is_rate_limit_error(error):
+            self.breaker(model).release()
+            return
+        if isinstance(error, DeadlineExceeded):
+            self.deadlines_exceeded += 1
+        self.breaker(model).record(failed=error is not None)
+        if error is None and latency is not None:
+            with self._lock:
+                self.latencies.setdefault((model, phase), deque(maxlen=200)).append(latency)
+
+    def _remaining(self, deadline: Optional[float], start: float) -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - (time.perf_counter() - start))
+
+    async def call_async(self, model: str, phase: str, make_call: Callable[[], Awaitable],
+                         can_hedge: Callable[[], bool] = lambda: True):
+        """Run make_call() under the phase deadline, hedging once past p95. Returns (result, hedged)."""
+        start = time.perf_counter()
+        deadline = self.deadline(phase)
+        hedge_after = self.hedge_delay(model, phase)
+        in_flight = {asyncio.ensure_future(make_call())}
+        hedge = None
+        error = None
+        try:
+            while in_flight:
+                timeout = self._remaining(deadline, start)
+                if hedge is None and hedge_after is not None:
+                    wait_hedge = max(0.0, hedge_after - (time.perf_counter() - start))
+                    timeout = wait_hedge if timeout is None else min(timeout, wait_hedge)
+                done, in_flight = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        hedged = hedge is not None
+                        if task is hedge:
+                            self.hedges_won += 1
+                        self.record(model, phase, time.perf_counter() - start)
+                        return task.result(), hedged
+                    error = task.exception()
+                if done:
+                    continue
+                if deadline is not None and time.perf_counter() - start >= deadline:
+                    raise DeadlineExceeded(f"{phase} call to {model} exceeded its {deadline:g}s deadline")
+                if hedge is None and hedge_after is not None and can_hedge():
+                    hedge = asyncio.ensure_future(make_call())
+                    in_flight.add(hedge)
+                    self.hedges_sent += 1
+                elif hedge is None:
+                    hedge_after = None      # no quota for a hedge; just wait for the deadline
+            raise error
+        except asyncio.CancelledError:
+            self.breaker(model).release()
+            raise
+        except Exception as e:
+            self.record(model, phase, error=e)
+            raise
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    def call(self, model: str, phase: str, make_call: Callable[[], object],
+             can_hedge: Callable[[], bool] = lambda: True):
+        """Thread-based call() for the sync API. Abandoned requests finish in the background."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="model-call")
+        start = time.perf_counter()
+        deadline = self.deadline(phase)
+        hedge_after = self.hedge_delay(model, phase)
+        in_flight = {self._pool.submit(make_call)}
+        hedge = None
+        error = None
+        try:
+            while in_flight:
+                timeout = self._remaining(deadline, start)
+                if hedge is None and hedge_after is not None:
+                    wait_hedge = max(0.0, hedge_after - (time.perf_counter() - start))
+                    timeout = wait_hedge if timeout is None else min(timeout, wait_hedge)
+                done, in_flight = wait_futures(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        hedged = hedge is not None
+                        if future is hedge:
+                            self.hedges_won += 1
+                        self.record(model, phase, time.perf_counter() - start)
+                        return future.result(), hedged
+                    error = future.exception()
+                if done:
+                    continue
+                if deadline is not None and time.perf_counter() - start >= deadline:
+                    raise DeadlineExceeded(f"{phase} call to {model} exceeded its {deadline:g}s deadline")
+                if hedge is None and hedge_after is not None and can_hedge():
+                    hedge = self._pool.submit(make_call)
+                    in_flight.add(hedge)
+                    self.hedges_sent += 1
+                elif hedge is None:
+                    hedge_after = None
+            raise error
+        except Exception as e:
+            self.record(model, phase, error=e)
+            raise
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "fallback_calls": self.fallback_calls,
+            "breakers": {model: breaker.stats() for model, breaker in self.breakers.items()},
+        }
+
+_resilience = None
+
+def get_resilience() -> ResilienceManager:
+    """Return the process-wide ResilienceManager, creating it on first use."""
+    global _resilience
+    if _resilience is None:
+        _resilience = ResilienceManager()
+    return _resilience
+
+def set_resilience(manager: ResilienceManager):
+    global _resilience
+    _resilience = manager
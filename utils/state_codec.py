@@ -0,0 +1,43 @@
+import marshal
+from typing import Iterable, List, Optional
+from utils.types import AgentState, ERROR_TYPES, ValidationResult
+
+# Binary AgentState serialization for shipping states between processes (e.g. a batch
+# worker pool or the analysis side of a run). A state becomes one tuple of primitives -
+# verdicts as (is_valid, score, error code, feedback, retry delay, tier) rows, error types
+# as small ints - written with marshal, which is C-fast and stores repeated strings once.
+# marshal data is only read back by the same Python version; durable files use the JSON
+# checkpoint format (utils.checkpoint) instead.
+
+CODEC_VERSION = 1
+
+def _state_tuple(state: AgentState) -> tuple:
+    return (CODEC_VERSION, state.task, state.attempt_count, state.current_result, list(state.history),
+            [(v.is_valid, v.score, v.error_code, v.feedback, v.retry_delay_seconds, v.validated_by)
+             for v in state.validation_log])
+
+def _from_tuple(data: tuple, log_limit: Optional[int]) -> AgentState:
+    version, task, attempt_count, current_result, history, rows = data
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported state codec version {version}")
+    state = AgentState.create(task, log_limit)
+    state.attempt_count = attempt_count
+    state.current_result = current_result
+    state.history.extend(history)
+    state.validation_log.extend(ValidationResult(is_valid, score, ERROR_TYPES[code], feedback, retry_delay, tier)
+                                for is_valid, score, code, feedback, retry_delay, tier in rows)
+    return state
+
+def dumps_state(state: AgentState) -> bytes:
+    return marshal.dumps(_state_tuple(state))
+
+def loads_state(data: bytes, log_limit: Optional[int] = None) -> AgentState:
+    """Inverse of dumps_state(); `log_limit` restores into ring buffers (see AgentState.create)."""
+    return _from_tuple(marshal.loads(data), log_limit)
+
+def dumps_states(states: Iterable[AgentState]) -> bytes:
+    """Many states in one buffer (one marshal call, strings shared across states)."""
+    return marshal.dumps([_state_tuple(state) for state in states])
+
+def loads_states(data: bytes, log_limit: Optional[int] = None) -> List[AgentState]:
+    return [_from_tuple(item, log_limit) for item in marshal.loads(data)]
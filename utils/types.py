@@ -1,6 +1,7 @@
+import sys
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Optional, Sequence
 
 class ErrorType(Enum):
     NONE = "none"
@@ -10,18 +11,87 @@ class ErrorType(Enum):
     HALLUCINATION = "hallucination"
     RATE_LIMIT = "rate_limit"   # API rate limiting (429 error)
 
-@dataclass
+# Small-int codes for ErrorType, used by the binary state codec (utils.state_codec)
+ERROR_TYPES = list(ErrorType)
+ERROR_CODES = {error_type: code for code, error_type in enumerate(ERROR_TYPES)}
+
+# States and verdicts are slotted (no per-instance __dict__), and the tier name is interned, so
+# the few distinct names held by many verdicts are stored once. Feedback is free-form judge text,
+# nearly always unique, and is not interned (interned strings are never freed on Python 3.12+).
+@dataclass(slots=True)
 class ValidationResult:
     is_valid: bool
     score: float                # usually interpreted as error distance ε ∈ [0,1]
     error_type: ErrorType
     feedback: str
     retry_delay_seconds: float = 0.0  # When rate limited, how long to wait before retry
+    validated_by: str = "llm"         # Tier that produced the verdict ("llm", "duplicate" or a local validator name)
+
+    def __post_init__(self):
+        if type(self.validated_by) is str:
+            self.validated_by = sys.intern(self.validated_by)
+
+    @property
+    def error_code(self) -> int:
+        return ERROR_CODES[self.error_type]
+
+class RingLog(list):
+    """A list that keeps only its latest `maxlen` items (a deque costs ~600 bytes even when nearly empty)."""
+    __slots__ = ("maxlen",)
+
+    def __init__(self, maxlen: int, items=()):
+        super().__init__()
+        self.maxlen = maxlen
+        self.extend(items)
+
+    def append(self, item):
+        super().append(item)
+        if len(self) > self.maxlen:
+            del self[0]
 
-@dataclass
+    def extend(self, items):
+        super().extend(items)
+        if len(self) > self.maxlen:
+            del self[:len(self) - self.maxlen]
+
+    def __reduce__(self):
+        return type(self), (self.maxlen, list(self))
+
+@dataclass(slots=True)
 class AgentState:
     task: str
-    history: List[dict] = field(default_factory=list)
+    history: Sequence[dict] = field(default_factory=list)
     attempt_count: int = 0
     current_result: Optional[str] = None
-    validation_log: List[ValidationResult] = field(default_factory=list)
\ No newline at end of file
+    validation_log: Sequence[ValidationResult] = field(default_factory=list)
+
+    @classmethod
+    def create(cls, task: str, log_limit: Optional[int] = None) -> "AgentState":
+        """A new state; with `log_limit`, history and validation_log keep only the latest entries (ring buffers)."""
+        if not log_limit:
+            return cls(task=task)
+        return cls(task=task, history=RingLog(log_limit), validation_log=RingLog(log_limit))
+
+@dataclass(slots=True)
+class LLMResponse:
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cached: bool = False        # served from the response cache, no model call made
+
+@dataclass(slots=True)
+class CallRecord:
+    phase: str                  # "execute", "validate" or "plan"
+    model: str
+    queue_wait: float           # seconds spent waiting on the rate-limit scheduler
+    latency: float              # seconds spent in the backend call itself
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cached: bool = False        # answered from the response cache
+    rate_limited: bool = False  # the request came back as a 429
+    error: Optional[str] = None # exception name, "rate_limit", "circuit_open", "aborted" (stream closed early) or "cancelled"
+    hedged: bool = False        # a duplicate request was sent because this one ran past p95
+    cost_usd: float = 0.0
@@ -0,0 +1,145 @@
+"""
+Validation Cascade Test - Cheap judge first, full validator only when uncertain
+
+This test shows how the agentic AI system now:
+1. Lets a cheap model with a short prompt decide clearly good and clearly bad outputs
+2. Escalates to the full validator inside the uncertainty band or on malformed JSON
+3. Measures per-tier agreement (band escalations and audits) and latency
+4. Counts each tier's JSON replies apart, so fast-tier parse failures do not skew the full validator's
+5. Uses the cascade inside the correction loop
+"""
+
+import asyncio
+import json
+from agents.validation_cascade import JudgeCascade
+from agents.validator import ValidatorAgent
+from backends.registry import set_backend
+from backends.stub import StubBackend
+from config import CASCADE_MODEL, MODEL_NAME
+from main import run_agentic_workflow_async
+from metrics.log_store import set_log_store
+from metrics.logger import MetricsLogger
+from utils.cache import set_response_cache
+from utils.llm import set_call_recorder
+from utils.rate_limiter import RateLimitScheduler, get_scheduler, set_scheduler
+
+set_log_store(None)
+
+# Fast-tier (score, error type) and full-validator (score, error type) per output
+VERDICTS = {
+    "perfect": ((0.0, "none"), (0.0, "none")),
+    "garbage": ((0.95, "semantic"), (0.9, "semantic")),
+    "borderline": ((0.25, "constraint"), (0.1, "none")),
+    "subtle": ((0.15, "none"), (0.6, "hallucination")),
+}
+
+
+def _responder(prompt):
+    output = prompt.split("Agent's output:\n", 1)[1].split("\n", 1)[0]
+    fast = "strict and precise" not in prompt
+    if fast and output == "malformed":
+        return "The output looks fine to me!"
+    score, error_type = VERDICTS.get(output, ((0.0, "none"), (0.0, "none")))[0 if fast else 1]
+    return json.dumps({"score": score, "error_type": error_type, "reasoning": f"{output} ({'fast' if fast else 'full'})"})
+
+
+def _setup():
+    previous_scheduler = get_scheduler()
+    set_scheduler(RateLimitScheduler(quotas={}, default_quota={"rpm": 10**9, "tpm": 10**12}))
+    set_response_cache(None)
+    set_backend(StubBackend(responder=_responder))
+    return previous_scheduler
+
+
+def test_cascade_routing():
+    """Test which cases the cheap judge decides and which are escalated."""
+    print("=" * 70)
+    print("TEST 1: Cascade Routing")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+    logger = MetricsLogger()
+    set_call_recorder(logger)
+    cascade = JudgeCascade(band=0.15, audit_rate=0.0)
+    validator = ValidatorAgent(cascade=cascade)
+
+    verdicts = {output: validator.validate("Some task", output)
+                for output in ["perfect", "garbage", "borderline", "subtle", "malformed"]}
+    for output, v in verdicts.items():
+        print(f"{output:>10}: valid={v.is_valid} score={v.score} by={v.validated_by} ({v.feedback})")
+    assert verdicts["perfect"].validated_by == "llm_fast" and verdicts["perfect"].is_valid
+    assert verdicts["garbage"].validated_by == "llm_fast" and not verdicts["garbage"].is_valid
+    assert verdicts["borderline"].validated_by == "llm" and verdicts["borderline"].is_valid, "In-band: full validator decides"
+    assert verdicts["subtle"].validated_by == "llm" and not verdicts["subtle"].is_valid
+    assert verdicts["malformed"].validated_by == "llm", "Malformed fast JSON escalates"
+
+    phases = [(c.phase, c.model) for c in logger.calls]
+    print(f"Calls: {phases}")
+    assert phases.count(("validate_fast", CASCADE_MODEL)) == 5
+    assert phases.count(("validate", MODEL_NAME)) == 3
+
+    stats = cascade.stats()
+    print(f"Stats: {json.dumps(stats)}")
+    assert stats["judged"] == 5 and stats["fast_decided"] == 2
+    assert stats["escalated"] == {"uncertain": 2, "malformed": 1, "audit": 0}
+    band = stats["agreement"]["uncertain"]
+    assert band["compared"] == 2 and band["verdict_agreement"] == 0.0, "Both in-band fast verdicts were wrong"
+
+    logger.log_judge_replies(validator)
+    replies, fast_replies = logger.summary["judge_replies"], logger.summary["fast_judge_replies"]
+    print(f"Replies: full {replies}, fast {fast_replies}")
+    assert fast_replies["replies"] == 5 and fast_replies["clean"] == 4 and fast_replies["failures"] == 1
+    assert replies["replies"] == 3 and replies["clean"] == 3 and replies["failures"] == 0
+    set_call_recorder(None)
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Only uncertain or malformed verdicts reach the full validator!\n")
+
+
+def test_audit_agreement():
+    """Test that audited confident verdicts measure the fast tier's agreement outside the band."""
+    print("=" * 70)
+    print("TEST 2: Audit Agreement")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+    cascade = JudgeCascade(band=0.15, audit_rate=1.0)
+    validator = ValidatorAgent(cascade=cascade)
+    for output in ["perfect", "garbage", "perfect"]:
+        asyncio.run(validator.validate_async("Some task", output))
+    audit = cascade.stats()["agreement"]["audit"]
+    print(f"Audit: {audit}")
+    assert cascade.escalated["audit"] == 3 and cascade.fast_decided == 0
+    assert audit["compared"] == 3 and audit["verdict_agreement"] == 1.0 and audit["error_type_agreement"] == 1.0
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: Audits measure agreement of confident fast verdicts!\n")
+
+
+def test_cascade_in_workflow():
+    """Test a correction loop judged through the cascade."""
+    print("=" * 70)
+    print("TEST 3: Cascade in the Correction Loop")
+    print("=" * 70)
+
+    previous_scheduler = _setup()
+
+    def responder(prompt):
+        if "QA Validator" in prompt:
+            return _responder(prompt)
+        return "borderline" if "garbage (fast)" in prompt else "garbage"
+
+    set_backend(StubBackend(responder=responder))
+    logger = MetricsLogger()
+    state = asyncio.run(run_agentic_workflow_async("Write something", logger=logger, verbose=False, cascade=True))
+    tiers = [v.validated_by for v in state.validation_log]
+    print(f"Attempts: {state.attempt_count}, tiers: {tiers}, phases: {[c.phase for c in logger.calls]}")
+    assert state.validation_log[-1].is_valid and tiers == ["llm_fast", "llm"]
+    assert sum(1 for c in logger.calls if c.phase == "validate") == 1
+    set_scheduler(previous_scheduler)
+    print("✅ PASSED: The loop uses the cheap judge for the easy case!\n")
+
+
+if __name__ == "__main__":
+    test_cascade_routing()
+    test_audit_agreement()
+    test_cascade_in_workflow()
+    print("ALL TESTS PASSED! ✅")
\ No newline at end of file